@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import Company, Profile, Contact
 from django.utils.html import format_html
+from config.admin import ExportAdminMixin
 
 # Register your models here.
 @admin.register(Company)
@@ -24,8 +25,9 @@ class CompanyAdmin(admin.ModelAdmin):
     preview_logo.short_description = 'logo'
 
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(ExportAdminMixin, admin.ModelAdmin):
     model = Profile
+    export_fields = ['id', 'user__username', 'name', 'phone', 'email', 'address']
     
     list_display = ['id', 'user', 'preview_avatar', 'phone', 'email', 'name']
     list_display_links = ['id', 'user']
@@ -44,8 +46,9 @@ class ProfileAdmin(admin.ModelAdmin):
     preview_avatar.short_description = 'avatar'
 
 @admin.register(Contact)
-class ContactAdmin(admin.ModelAdmin):
+class ContactAdmin(ExportAdminMixin, admin.ModelAdmin):
     model = Contact
+    export_fields = ['id', 'name', 'phone', 'email', 'message']
     
     list_display = ['id', 'name', 'phone', 'email', 'message']
     list_display_links = ['id', 'name']
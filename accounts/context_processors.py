@@ -1,6 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+from config.cache import CHROME_NAMESPACE, get_versioned
+from config.permissions import CachedPermWrapper
 from .models import Company
 
 def company_data(request):
     return {
-        'company_data': Company.objects.first()
-    }
\ No newline at end of file
+        'company_data': SimpleLazyObject(lambda: get_versioned(CHROME_NAMESPACE, 'company_data', Company.objects.first))
+    }
+
+def user_permissions(request):
+    return {
+        'perms': CachedPermWrapper(request.user)
+    }
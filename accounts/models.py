@@ -4,9 +4,10 @@ from phonenumber_field.modelfields import PhoneNumberField
 
 from services.upload_path import logo_upload_path, avatar_upload_path
 from services.image_validator import image_validation
+from config.models.mixins import TrackedFieldsMixin
 
 # Create your models here.
-class Company(models.Model):
+class Company(TrackedFieldsMixin, models.Model):
     name = models.CharField(max_length=200)
     logo = models.ImageField(upload_to=logo_upload_path, blank=True, null=True, validators=[image_validation])
     phone = PhoneNumberField(blank=True, null=True)
@@ -15,10 +16,12 @@ class Company(models.Model):
     description = models.TextField(blank=True, null=True)
     footer_text = models.TextField(help_text='Footer text', blank=True, null=True)
 
+    tracked_fields = ('logo',)
+
     def __str__(self):
         return self.name
 
-class Profile(models.Model):
+class Profile(TrackedFieldsMixin, models.Model):
     user = models.OneToOneField(User, related_name='profile', on_delete=models.CASCADE, blank=True, null=True)
     name = models.CharField(max_length=200)
     avatar = models.ImageField(upload_to=avatar_upload_path, blank=True, null=True, validators=[image_validation])
@@ -26,6 +29,8 @@ class Profile(models.Model):
     email = models.EmailField(unique=True, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
 
+    tracked_fields = ('avatar',)
+
     def __str__(self):
         return self.name
 
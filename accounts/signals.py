@@ -1,12 +1,13 @@
 
-from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
-from django.core.files.storage import default_storage
-from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Company, Profile
 from allauth.socialaccount.signals import social_account_added
 from django.core.files.base import ContentFile
+from config.cache import CHROME_NAMESPACE, bump_version
+from services.file_cleanup import delete_file_on_commit
+from services.image_derivatives import generate_derivatives_on_commit
 
 @receiver(social_account_added)
 def on_social_account_added(request, sociallogin, **kwargs):
@@ -31,26 +32,30 @@ def on_social_account_added(request, sociallogin, **kwargs):
                 save=True
             )
 
-def delete_file(file=None):
-    if not file:
-        return
-    
-    if default_storage.exists(file.name):
-        default_storage.delete(file.name)
-
 # Company
-@receiver(pre_save, sender=Company)
-def remove_old_logo_on_change(sender, instance, **kwargs):
-    if not instance.id:
+@receiver(post_save, sender=Company)
+def remove_old_logo_on_change(sender, instance, created, using, **kwargs):
+    if created:
         return
-    
-    old_obj = get_object_or_404(Company,pk=instance.id)
-    if old_obj.logo and instance.logo != old_obj.logo:
-        delete_file(old_obj.logo)
 
+    if instance.has_field_changed('logo'):
+        delete_file_on_commit(instance.get_original_value('logo'), instance.logo.storage, using)
+
+@receiver(post_delete, sender=Company)
+def remove_logo_on_delete(sender, instance, using, **kwargs):
+    delete_file_on_commit(getattr(instance, 'logo'), using=using)
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Profile)
+def generate_image_derivatives(sender, instance, using, **kwargs):
+    for name in instance.tracked_fields:
+        if instance.has_field_changed(name):
+            generate_derivatives_on_commit(getattr(instance, name), using)
+
+@receiver(post_save, sender=Company)
 @receiver(post_delete, sender=Company)
-def remove_logo_on_delete(sender, instance, **kwargs):
-    delete_file(getattr(instance, 'logo'))
+def invalidate_chrome_cache(sender, **kwargs):
+    bump_version(CHROME_NAMESPACE)
 
 # User
 @receiver(post_save, sender=User)
@@ -65,20 +70,17 @@ def delete_user_profile(sender, instance, **kwargs):
     profile = Profile.objects.filter(user=instance).first()
 
     if profile:
-        if profile.avatar:
-            delete_file(profile.avatar)
         profile.delete()
 
 # Profile
-@receiver(pre_save, sender=Profile)
-def remove_old_avatar(sender, instance, **kwargs):
-    if not instance.id:
+@receiver(post_save, sender=Profile)
+def remove_old_avatar(sender, instance, created, using, **kwargs):
+    if created:
         return
-    
-    old_obj = get_object_or_404(Profile, pk=instance.id)
-    if old_obj.avatar and old_obj.avatar != instance.avatar:
-        delete_file(old_obj.avatar)
+
+    if instance.has_field_changed('avatar'):
+        delete_file_on_commit(instance.get_original_value('avatar'), instance.avatar.storage, using)
 
 @receiver(post_delete, sender=Profile)
-def remove_profile_avatar(sender, instance, **kwargs):
-    delete_file(getattr(instance, 'avatar'))
+def remove_profile_avatar(sender, instance, using, **kwargs):
+    delete_file_on_commit(getattr(instance, 'avatar'), using=using)
@@ -1,11 +1,16 @@
 from django.contrib import admin
 from .models import Category, Tag, Comment, Article
 from django.utils.html import format_html
-from config.admin import AuditAdminMixin
+from config.admin import AuditAdminMixin, ExportAdminMixin
 from django.utils import timezone
+from config.signals import bulk_published
+from django.db import transaction
+from .counters import adjust_archive_for_articles, adjust_comment_counts
+from .page_cache import bump_article
+from blog.templatetags.image_tags import variant_url
 
 @admin.register(Article)
-class ArticleAdmin(AuditAdminMixin, admin.ModelAdmin):
+class ArticleAdmin(ExportAdminMixin, AuditAdminMixin, admin.ModelAdmin):
     model = Article
 
     list_display = ('id', 'preview_image', 'title', 'status',)
@@ -23,6 +28,8 @@ class ArticleAdmin(AuditAdminMixin, admin.ModelAdmin):
     raw_id_fields = ('author', 'created_by', 'updated_by', 'deleted_by')
     date_hierarchy = 'published_at'
     actions = ('published_articles', )
+    export_fields = ('id', 'title', 'slug', 'status', 'author__username', 'published_at', 'views', 'likes',
+                     'comment_count', 'is_deleted', 'created_at', 'updated_at')
 
     fieldsets = (
         ('Main Content', {
@@ -52,15 +59,20 @@ class ArticleAdmin(AuditAdminMixin, admin.ModelAdmin):
     def preview_image(self, obj):
         if obj.featured_image:
             return format_html(
-                '<img src={} style="width:50px;height=50px;">',
-                obj.featured_image.url
+                '<img src="{}" style="width:50px;height:50px;object-fit:cover;" loading="lazy">',
+                variant_url(obj.featured_image, 'thumb')
             )
         return '--'
     
     @admin.action(description='Published selected Articles')
     def published_articles(self, request, queryset):
         qs = queryset.exclude(status=Article.Status.PUBLISHED)
-        count = qs.update(status=Article.Status.PUBLISHED, published_at=timezone.now())
+        with transaction.atomic(using=qs.db):
+            newly_counted = list(qs.filter(is_deleted=False).values_list('pk', flat=True))
+            # archive months are discounted from the rows' old status, before the UPDATE
+            adjust_archive_for_articles(newly_counted, -1, qs.db)
+            count = qs.update(status=Article.Status.PUBLISHED, published_at=timezone.now())
+            bulk_published.send(sender=Article, pks=newly_counted, using=qs.db)
         self.message_user(request, f'{count} articles published successfully.')
     
 @admin.register(Category)
@@ -122,7 +134,7 @@ class TagAdmin(AuditAdminMixin, admin.ModelAdmin):
     )
 
 @admin.register(Comment)
-class CommentAdmin(AuditAdminMixin, admin.ModelAdmin):
+class CommentAdmin(ExportAdminMixin, AuditAdminMixin, admin.ModelAdmin):
     model = Comment
 
     list_display = ('id', 'short_text', 'article', 'user', 'is_approved')
@@ -132,6 +144,8 @@ class CommentAdmin(AuditAdminMixin, admin.ModelAdmin):
     search_fields = ('article__title', 'user__username', 'text')
     ordering = ('article',)
     actions = ('approve_comments',)
+    bulk_select_related = ('user', 'article')
+    export_fields = ('id', 'article__title', 'user__username', 'text', 'is_approved', 'is_deleted', 'created_at')
 
     fieldsets = (
         ('Main Content', {
@@ -149,4 +163,8 @@ class CommentAdmin(AuditAdminMixin, admin.ModelAdmin):
 
     @admin.display(description='Approve selected comments')
     def approve_comments(self, request, queryset):
-        queryset.update(is_approved=True)
\ No newline at end of file
+        qs = queryset.filter(is_approved=False)
+        with transaction.atomic():
+            newly_counted = list(qs.filter(is_deleted=False).values_list('pk', flat=True))
+            qs.update(is_approved=True)
+            bump_article(*adjust_comment_counts(newly_counted, 1))
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Async versions of the read-only views, wired in by blog.urls when
+BLOG_ASYNC_VIEWS is on. Under ASGI they fetch their rows with the async
+ORM instead of holding a worker thread for the whole request; rendering,
+context processors and the search backends' raw SQL stay synchronous and
+run in Django's thread executor.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from . import views
+from .page_cache import AsyncArticlePageCacheMixin
+from .pagination import AsyncKeysetPaginationMixin
+from .services import article_cards, comment_paginator
+from .view_counter import view_counter
+
+
+async def aget_object(view):
+    queryset = view.get_queryset()
+    slug = view.kwargs.get(view.slug_url_kwarg)
+    try:
+        return await queryset.aget(**{view.get_slug_field(): slug})
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.verbose_name} found matching the query')
+
+
+class ArticleListView(AsyncKeysetPaginationMixin, views.ArticleListView):
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        await self.apaginate_queryset(self.object_list, self.paginate_by)
+        return self.render_to_response(self.get_context_data())
+
+
+class ArticleDetailView(AsyncArticlePageCacheMixin, views.ArticleDetailView):
+    async def get(self, request, *args, **kwargs):
+        self.object = await aget_object(self)
+        context = self.get_context_data(
+            object=self.object,
+            comment_page=await comment_paginator(self.object.pk).aget_page(),
+            related_articles=[link.related async for link in self.get_related_links()],
+        )
+        view_counter.record(request, self.object.pk)
+        return self.render_to_response(context)
+
+
+class TaxonomyDetailMixin(AsyncKeysetPaginationMixin):
+    async def get(self, request, *args, **kwargs):
+        self.object = await aget_object(self)
+        article_list = article_cards(self.object.articles.filter(published_at__isnull=False))
+        await self.apaginate_queryset(article_list, self.paginate_by)
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+
+class CategoryDetailView(TaxonomyDetailMixin, views.CategoryDetailView):
+    pass
+
+
+class TagDetailView(TaxonomyDetailMixin, views.TagDetailView):
+    pass
+
+
+class SearchView(views.SearchView):
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        # the backends rank with raw SQL, which has no async API
+        context = await sync_to_async(self.get_context_data)()
+        return self.render_to_response(context)
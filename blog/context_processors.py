@@ -1,22 +1,17 @@
+from django.utils.functional import SimpleLazyObject
+from config.cache import CHROME_NAMESPACE, get_versioned
 from .models import Category
 
+def _navbar_categories():
+    return list(Category.alive_objects.filter(is_active=True).only('id', 'name', 'slug', 'published_article_count'))
+
 def navbar_categories(request):
-    categories = Category.alive_objects.filter(is_active=True)
+    categories = SimpleLazyObject(lambda: get_versioned(CHROME_NAMESPACE, 'navbar_categories', _navbar_categories))
     return{
         'navbar_categories': categories
     }
 
-from django.db.models.functions import TruncYear, TruncMonth, TruncDay
-from django.db.models import Count
-from .models import Article
+from .services import archive_months
 
 def archive_menu(request):
-    months = (
-        Article.alive_objects
-        .filter(status=Article.Status.ARCHIVE)
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(total=Count("id"))
-        .order_by("-month")
-    )
-    return {"archive_menu": months}
\ No newline at end of file
+    return {"archive_menu": SimpleLazyObject(archive_months)}
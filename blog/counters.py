@@ -0,0 +1,139 @@
+from collections import Counter
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import ArchiveMonth, Article, Category, Comment, Tag
+
+# Counted rows: an approved, alive comment adds to its article's
+# comment_count; an alive, published article adds to the
+# published_article_count of each of its categories and tags; an alive,
+# archived article adds to the ArchiveMonth of its published_at.
+
+def comment_is_counted(is_approved, is_deleted):
+    return bool(is_approved) and not is_deleted
+
+def article_is_counted(status, is_deleted):
+    return status == Article.Status.PUBLISHED and not is_deleted
+
+
+def adjust(model, field, deltas, using=None):
+    """Apply {pk: delta} to a counter column with one UPDATE, never below zero."""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+
+    return model._base_manager.using(using).filter(pk__in=deltas).update(**{
+        field: Greatest(
+            F(field) + Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+    })
+
+def _taxonomy(model):
+    relation = Article.categories if model is Category else Article.tags
+    return relation.through, f'{model._meta.model_name}_id'
+
+def adjust_comment_counts(comment_pks, sign, using=None):
+    """
+    Add sign for every approved comment in comment_pks to its article's
+    comment_count. Callers pass comments whose alive/approved state just
+    flipped. Returns the affected article pks.
+    """
+    rows = (
+        Comment._base_manager.using(using)
+        .filter(pk__in=comment_pks, is_approved=True)
+        .order_by().values('article').annotate(n=Count('pk'))
+    )
+    deltas = {row['article']: sign * row['n'] for row in rows}
+    adjust(Article, 'comment_count', deltas, using)
+    return list(deltas)
+
+def adjust_taxonomy_counts(article_pks, sign, using=None):
+    """
+    Add sign for every published article in article_pks to the
+    published_article_count of its categories and tags. Callers pass
+    articles whose alive/published state just flipped.
+    """
+    for model in (Category, Tag):
+        through, column = _taxonomy(model)
+        rows = (
+            through.objects.using(using)
+            .filter(article_id__in=article_pks, article__status=Article.Status.PUBLISHED)
+            .order_by().values(column).annotate(n=Count('pk'))
+        )
+        adjust(model, 'published_article_count', {row[column]: sign * row['n'] for row in rows}, using)
+
+def adjust_article_taxonomies(article_pk, sign, using=None, models=(Category, Tag)):
+    for model in models:
+        through, column = _taxonomy(model)
+        model._base_manager.using(using).filter(
+            pk__in=through.objects.using(using).filter(article_id=article_pk).values(column)
+        ).update(published_article_count=Greatest(F('published_article_count') + Value(sign), Value(0)))
+
+def taxonomy_membership_changed(model, instance, action, reverse, pk_set, using=None):
+    """
+    m2m_changed for Article.categories/tags. Links are counted as they are
+    added and uncounted before they are removed, so only rows that really
+    change are seen.
+    """
+    through, column = _taxonomy(model)
+
+    if not reverse:
+        if not article_is_counted(instance.status, instance.is_deleted):
+            return
+        if action == 'post_add':
+            adjust(model, 'published_article_count', {pk: 1 for pk in pk_set}, using)
+        elif action == 'pre_remove':
+            linked = through.objects.using(using).filter(article_id=instance.pk, **{f'{column}__in': pk_set})
+            adjust(model, 'published_article_count', {pk: -1 for pk in linked.values_list(column, flat=True)}, using)
+        elif action == 'pre_clear':
+            adjust_article_taxonomies(instance.pk, -1, using, models=(model,))
+        return
+
+    if action == 'post_clear':
+        model._base_manager.using(using).filter(pk=instance.pk).update(published_article_count=0)
+    elif action in ('post_add', 'pre_remove'):
+        linked = through.objects.using(using).filter(
+            article_id__in=pk_set, article__status=Article.Status.PUBLISHED, article__is_deleted=False,
+            **{column: instance.pk}
+        ).count()
+        adjust(model, 'published_article_count', {instance.pk: linked if action == 'post_add' else -linked}, using)
+
+
+def archive_key(status, is_deleted, published_at):
+    """The (year, month) an article is counted under, or None."""
+    if status != Article.Status.ARCHIVE or is_deleted or published_at is None:
+        return None
+    if timezone.is_aware(published_at):
+        published_at = timezone.localtime(published_at)
+    return published_at.year, published_at.month
+
+def adjust_archive(deltas, using=None):
+    manager = ArchiveMonth.objects.using(using)
+    for key, delta in deltas.items():
+        if key is None or not delta:
+            continue
+        year, month = key
+        if delta > 0:
+            manager.get_or_create(year=year, month=month)
+        manager.filter(year=year, month=month).update(count=Greatest(F('count') + Value(delta), Value(0)))
+
+    if any(delta < 0 for delta in deltas.values()):
+        manager.filter(count=0).delete()
+
+def adjust_archive_for_articles(article_pks, sign, using=None):
+    """
+    Add sign for every archived article in article_pks to its month.
+    Callers pass articles whose alive/archived state just flipped.
+    """
+    dates = (
+        Article._base_manager.using(using)
+        .filter(pk__in=article_pks, status=Article.Status.ARCHIVE, published_at__isnull=False)
+        .values_list('published_at', flat=True)
+    )
+    deltas = Counter(archive_key(Article.Status.ARCHIVE, False, published_at) for published_at in dates)
+    adjust_archive({key: sign * n for key, n in deltas.items()}, using)
@@ -0,0 +1,141 @@
+from functools import wraps
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.db.models import Case, F, TextField, Value, When
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from config.cache import CHROME_NAMESPACE, bump_version, get_versioned, get_versions
+from config.metrics import record_cache
+from config.replicas import use_primary
+from accounts.models import Company
+from .models import Article, Category, Tag
+from .rendering import EXCERPT_WORDS
+
+FEEDS_NAMESPACE = 'feeds'
+FEED_KEY = 'feed:{}-{}:{}:{}:{}'
+FEED_LENGTH = 20
+
+def bump_feeds():
+    bump_version(FEEDS_NAMESPACE)
+
+
+def cached_feed(feed):
+    """
+    Cache a feed view's rendered output per URL until a publish, edit or
+    delete bumps the feeds version (or a company change bumps chrome).
+    """
+    @wraps(feed)
+    def view(request, *args, **kwargs):
+        key = FEED_KEY.format(*get_versions(FEEDS_NAMESPACE, CHROME_NAMESPACE), request.scheme, request.get_host(), request.path)
+        entry = cache.get(key)
+        record_cache(entry is not None)
+        if entry is None:
+            # cached under the current version, so read what the primary has
+            with use_primary():
+                response = feed(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = {'content': response.content, 'content_type': response['Content-Type']}
+            cache.set(key, entry, settings.SYNDICATION_CACHE_TIMEOUT)
+        return HttpResponse(entry['content'], content_type=entry['content_type'])
+    return view
+
+
+class LatestArticlesFeed(Feed):
+    def company(self):
+        return get_versioned(CHROME_NAMESPACE, 'company_data', Company.objects.first)
+
+    def title(self):
+        company = self.company()
+        return company.name if company else 'MyBlog'
+
+    def description(self):
+        company = self.company()
+        return company.description if company else 'Blog Site'
+
+    def link(self):
+        return reverse('blog:home')
+
+    def get_queryset(self, obj):
+        return Article.alive_objects.filter(status=Article.Status.PUBLISHED, published_at__isnull=False)
+
+    def items(self, obj=None):
+        return (
+            self.get_queryset(obj)
+            .select_related('author').prefetch_related('categories')
+            .defer('content', 'body_html', 'json_ld')
+            # the source of the excerpt, only for rows not pre-rendered yet
+            .annotate(unrendered_content=Case(When(render_hash='', then=F('content')), default=Value(''), output_field=TextField()))
+            .order_by('-published_at', '-id')[:FEED_LENGTH]
+        )
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return (
+            item.meta_description or item.excerpt or
+            Truncator(strip_tags(item.unrendered_content)).words(EXCERPT_WORDS)
+        )
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.published_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_categories(self, item):
+        return [category.name for category in item.categories.all()]
+
+
+class LatestArticlesAtomFeed(LatestArticlesFeed):
+    feed_type = Atom1Feed
+
+
+class TaxonomyFeed(LatestArticlesFeed):
+    model = None
+    relation = None
+    url_name = None
+
+    def get_object(self, request, slug):
+        return get_object_or_404(self.model.alive_objects.filter(is_active=True), slug=slug)
+
+    def title(self, obj):
+        return f'{super().title()} | {obj.name}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse(self.url_name, args=[obj.slug])
+
+    def get_queryset(self, obj):
+        return super().get_queryset(obj).filter(**{self.relation: obj})
+
+
+class CategoryFeed(TaxonomyFeed):
+    model = Category
+    relation = 'categories'
+    url_name = 'blog:category'
+
+
+class CategoryAtomFeed(CategoryFeed):
+    feed_type = Atom1Feed
+
+
+class TagFeed(TaxonomyFeed):
+    model = Tag
+    relation = 'tags'
+    url_name = 'blog:tag'
+
+
+class TagAtomFeed(TagFeed):
+    feed_type = Atom1Feed
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from blog.models import ArchiveMonth, Article
+from config.cache import CHROME_NAMESPACE, bump_version
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ArchiveMonth rollup from the articles table.'
+
+    def handle(self, *args, **options):
+        rows = (
+            Article.alive_objects
+            .filter(status=Article.Status.ARCHIVE, published_at__isnull=False)
+            .annotate(month=TruncMonth('published_at'))
+            .order_by().values('month')
+            .annotate(total=Count('pk'))
+        )
+        months = [ArchiveMonth(year=row['month'].year, month=row['month'].month, count=row['total']) for row in rows]
+
+        with transaction.atomic():
+            ArchiveMonth.objects.all().delete()
+            ArchiveMonth.objects.bulk_create(months)
+        bump_version(CHROME_NAMESPACE)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {sum(month.count for month in months)} archived articles into {len(months)} months.'
+        ))
@@ -0,0 +1,189 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+from blog.models import Article, Category, Tag
+
+# (name, server interface, BLOG_ASYNC_VIEWS)
+MODES = (
+    ('wsgi+sync', 'wsgi', False),
+    ('asgi+sync', 'asgi', False),
+    ('asgi+async', 'asgi', True),
+)
+PAGES = ('home', 'article_detail', 'category', 'tag', 'search')
+
+
+def wsgi_request(handler, url):
+    path, _, query = url.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    status = []
+    started = time.perf_counter()
+    body = handler(environ, lambda line, headers, exc_info=None: status.append(int(line.split()[0])))
+    try:
+        for chunk in body:
+            pass
+    finally:
+        body.close()
+    return time.perf_counter() - started, status[0]
+
+
+async def asgi_request(handler, url):
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    received = asyncio.Event()
+    status = []
+
+    async def receive():
+        if received.is_set():
+            # nothing more to read; wait as a client that never disconnects
+            await asyncio.Future()
+        received.set()
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    started = time.perf_counter()
+    await handler(scope, receive, send)
+    return time.perf_counter() - started, status[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare request throughput of the read-only pages under WSGI with the sync views, ASGI with '
+        'the sync views and ASGI with the async views (BLOG_ASYNC_VIEWS). Each mode runs in its own '
+        'process and drives Django\'s handler in-process at the given concurrency, so the numbers '
+        'leave out the web server and the network; run it against a seeded database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per mode.')
+        parser.add_argument('--warmup', type=int, default=100)
+        parser.add_argument('--objects', type=int, default=50,
+                            help='Distinct articles, categories and tags to rotate through.')
+        parser.add_argument('--url', action='append', dest='pages', choices=PAGES, help='Only this page (default: all).')
+        parser.add_argument('--mode', action='append', dest='modes', choices=[name for name, *rest in MODES])
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+        parser.add_argument('--worker', choices=[name for name, *rest in MODES], help=argparse.SUPPRESS)
+
+    def urls(self, pages, objects):
+        samples = {
+            'home': [((), '')],
+            'search': [((), '?q=django'), ((), '?q=python')],
+            'article_detail': [
+                ((slug,), '') for slug in
+                Article.alive_objects.filter(status=Article.Status.PUBLISHED, published_at__isnull=False)
+                .order_by('-published_at').values_list('slug', flat=True)[:objects]
+            ],
+            'category': [((slug,), '') for slug in Category.alive_objects.filter(is_active=True).values_list('slug', flat=True)[:objects]],
+            'tag': [((slug,), '') for slug in Tag.alive_objects.filter(is_active=True).values_list('slug', flat=True)[:objects]],
+        }
+        urls = [
+            reverse(f'blog:{page}', args=args) + query
+            for page in pages for args, query in samples[page]
+        ]
+        if not urls:
+            raise CommandError('No sample pages; seed the database first (manage.py seed_blog).')
+        return urls
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be at least 1.')
+        if options['worker']:
+            return self.work(options)
+
+        results = {}
+        self.stdout.write(f'{"mode":<12}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+        for name, interface, async_views in MODES:
+            if options['modes'] and name not in options['modes']:
+                continue
+            result = results[name] = self.spawn(name, async_views, options)
+            self.stdout.write(
+                f'{name:<12}{result["rps"]:>10.1f}{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}'
+                f'{result["p99_ms"]:>10.2f}{result["errors"]:>8}'
+            )
+
+        if options['output']:
+            report = {'concurrency': options['concurrency'], 'requests': options['requests'], 'modes': results}
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}.'))
+
+    def spawn(self, name, async_views, options):
+        # BLOG_ASYNC_VIEWS is read once, when the URLconf is imported
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_asgi', '--worker', name,
+            '--concurrency', str(options['concurrency']), '--requests', str(options['requests']),
+            '--warmup', str(options['warmup']), '--objects', str(options['objects']),
+        ]
+        for page in options['pages'] or ():
+            command += ['--url', page]
+        env = {**os.environ, 'BLOG_ASYNC_VIEWS': str(async_views)}
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'{name} failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def work(self, options):
+        interface = next(interface for name, interface, async_views in MODES if name == options['worker'])
+        urls = self.urls(options['pages'] or PAGES, options['objects'])
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            run = self.run_wsgi if interface == 'wsgi' else self.run_asgi
+            run(urls, options['warmup'], options['concurrency'])
+            started = time.perf_counter()
+            samples = run(urls, options['requests'], options['concurrency'])
+            elapsed = time.perf_counter() - started
+
+        timings = sorted(duration * 1000 for duration, status in samples)
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+        self.stdout.write(json.dumps({
+            'rps': round(len(samples) / elapsed, 1),
+            'p50_ms': round(quantiles[49], 3),
+            'p95_ms': round(quantiles[94], 3),
+            'p99_ms': round(quantiles[98], 3),
+            'errors': sum(status != 200 for duration, status in samples),
+        }))
+
+    def run_wsgi(self, urls, count, concurrency):
+        handler = WSGIHandler()
+        with ThreadPoolExecutor(concurrency) as pool:
+            return list(pool.map(lambda i: wsgi_request(handler, urls[i % len(urls)]), range(count)))
+
+    def run_asgi(self, urls, count, concurrency):
+        handler = ASGIHandler()
+        pending = iter(range(count))
+        samples = []
+
+        async def client():
+            for i in pending:
+                samples.append(await asgi_request(handler, urls[i % len(urls)]))
+
+        async def main():
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+
+        asyncio.run(main())
+        return samples
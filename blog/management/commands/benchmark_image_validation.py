@@ -0,0 +1,105 @@
+import statistics
+import time
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from PIL import Image
+from services.image_validator import image_validation
+from services.sample_images import encode, png_bomb
+
+VALIDATORS = ('legacy', 'header', 'inline', 'pool')
+
+
+def legacy_validation(file):
+    # the validator as it was before header-only checks, kept for comparison
+    if file.size > 1024 * 1024 * 2:
+        raise ValidationError('Image file must be under 2MB.')
+    try:
+        im = Image.open(file)
+        im.verify()
+    except Exception:
+        raise ValidationError('Invalid or corrupted image file.')
+    if im.format not in {'JPEG', 'PNG', 'WEBP'}:
+        raise ValidationError('Unsupported image formate.')
+    file.seek(0)
+
+
+def build_corpus(bomb_side):
+    photo = Image.merge('RGB', [Image.effect_noise((1600, 1200), sigma) for sigma in (40, 60, 80)])
+    jpeg = encode(photo, 'JPEG', quality=70)
+    return [
+        ('valid jpeg 1600x1200', jpeg),
+        ('valid png 800x600', encode(photo.resize((800, 600)), 'PNG')),
+        ('valid webp 1600x1200', encode(photo, 'WEBP', quality=75)),
+        (f'png bomb {bomb_side}x{bomb_side}', png_bomb(bomb_side, bomb_side)),
+        ('truncated jpeg', jpeg[:len(jpeg) // 2]),
+        ('gif', encode(photo.resize((320, 240)).convert('P'), 'GIF')),
+        ('garbage', b'\x00not an image' * 512),
+    ]
+
+
+def read_status(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+
+def reset_peak_rss():
+    # Pillow allocates pixel buffers outside the Python allocator, so
+    # tracemalloc cannot see them; the kernel's RSS high-water mark can.
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return read_status('VmRSS')
+    except OSError:
+        return None
+
+def measure(validate, name, data, repeat):
+    timings, peaks = [], []
+    outcome = 'accepted'
+    for _ in range(repeat):
+        upload = SimpleUploadedFile(name, data)
+        baseline = reset_peak_rss()
+        started = time.perf_counter()
+        try:
+            validate(upload)
+        except ValidationError as e:
+            outcome = 'rejected: ' + e.messages[0][:38]
+        timings.append((time.perf_counter() - started) * 1000)
+        if baseline is not None:
+            peaks.append(read_status('VmHWM') - baseline)
+
+    peak = f'{max(peaks):>11}' if peaks else f'{"n/a":>11}'
+    return statistics.median(timings), peak, outcome
+
+
+class Command(BaseCommand):
+    help = (
+        'Time upload image validation over valid and malicious images and report how far '
+        'each upload raises the peak RSS of this process (Linux only).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--bomb-side', type=int, default=8000,
+                            help='Width and height of the decompression bomb.')
+        parser.add_argument('--validator', action='append', dest='validators', choices=VALIDATORS)
+
+    def handle(self, *args, **options):
+        corpus = build_corpus(options['bomb_side'])
+        validators = options['validators'] or VALIDATORS
+
+        self.stdout.write(f'{"image":<24}{"bytes":>10}  {"validator":<9}{"median ms":>11}{"peak KiB":>11}  outcome')
+        for validator in validators:
+            mode = {'legacy': 'off', 'header': 'off'}.get(validator, validator)
+            validate = legacy_validation if validator == 'legacy' else image_validation
+
+            with override_settings(IMAGE_VERIFY_MODE=mode):
+                if validator == 'pool':
+                    # start the workers before timing anything
+                    image_validation(SimpleUploadedFile('warmup.png', encode(Image.new('RGB', (8, 8)), 'PNG')))
+
+                for name, data in corpus:
+                    timing, peak, outcome = measure(validate, name, data, options['repeat'])
+                    self.stdout.write(f'{name:<24}{len(data):>10}  {validator:<9}{timing:>11.2f}{peak}  {outcome}')
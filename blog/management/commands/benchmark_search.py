@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from blog.models import Article
+from blog.search import get_search_backend
+from blog.search.base import IContainsSearchBackend
+
+WORDS = (
+    'django python search index query article content author blog cache database '
+    'performance server request response template view model field migration admin '
+    'signal storage image archive category tag comment feed sitemap paginate cursor '
+    'vector ranking snippet highlight token stem lexeme table scan latency throughput'
+).split()
+DEFAULT_QUERIES = ['django', 'search index', 'latency throughput', 'ranking snippet', 'zebra']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the indexed full-text search backend with the icontains lookup. '
+        'The synthetic corpus is created inside a transaction and rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=100_000)
+        parser.add_argument('--words', type=int, default=300, help='Words per article body.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--query', action='append', dest='queries')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        queries = options['queries'] or DEFAULT_QUERIES
+
+        with transaction.atomic():
+            self.seed(options)
+            indexed = get_search_backend()
+            backends = [('icontains', IContainsSearchBackend()), ('indexed', indexed)]
+
+            self.stdout.write(f'{"query":<22}{"backend":<12}{"hits":>8}{"median ms":>12}{"max ms":>10}')
+            for query in queries:
+                for name, backend in backends:
+                    hits, timings = self.measure(backend, query, options)
+                    self.stdout.write(
+                        f'{query:<22}{name:<12}{hits:>8}'
+                        f'{statistics.median(timings):>12.2f}{max(timings):>10.2f}'
+                    )
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        author, created = User.objects.get_or_create(
+            username='search-benchmark', defaults={'email': 'search-benchmark@example.invalid'}
+        )
+        backend = get_search_backend()
+        backend.create_index()
+        now = timezone.now()
+        started = time.monotonic()
+
+        total = options['articles']
+        batch_size = options['batch_size']
+        for offset in range(0, total, batch_size):
+            articles = [
+                Article(
+                    title=' '.join(random.choices(WORDS, k=6)).capitalize(),
+                    slug=f'search-benchmark-{i}',
+                    content=' '.join(random.choices(WORDS, k=options['words'])),
+                    status=Article.Status.PUBLISHED,
+                    author=author,
+                    published_at=now,
+                )
+                for i in range(offset, min(offset + batch_size, total))
+            ]
+            Article.objects.bulk_create(articles, batch_size=batch_size)
+
+        last_pk = 0
+        queryset = (
+            Article.objects.filter(author=author).order_by('pk')
+            .values('id', 'title', 'slug', 'content', 'status', 'is_deleted', 'author__username')
+        )
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not rows:
+                break
+            backend.index_rows(rows)
+            last_pk = rows[-1]['id']
+
+        self.stdout.write(f'Seeded and indexed {total} articles in {time.monotonic() - started:.1f}s.\n')
+
+    def measure(self, backend, query, options):
+        timings = []
+        hits = 0
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            results = backend.search(query)
+            hits = results.count()
+            list(results[:options['page_size']])
+            timings.append((time.perf_counter() - started) * 1000)
+        return hits, timings
@@ -0,0 +1,180 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from blog.models import ArchiveMonth, Article, Category, Tag
+
+NAMESPACES = ('blog', 'accounts')
+# pages that only accept POST or change data are not driven
+SKIP = {'blog:add_comment', 'blog:article_delete'}
+
+
+def percentile(quantiles, p):
+    return quantiles[p - 1] if quantiles else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every GET route of the blog and accounts apps through the test client and report '
+        'p50/p95/p99 latency, query counts and peak Python memory. --output writes a JSON baseline '
+        'and --compare prints the change against an earlier one.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--login', help='Username to request the pages as (default: anonymous).')
+        parser.add_argument('--url', action='append', dest='names', help='Only this URL name, e.g. blog:home.')
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+        parser.add_argument('--compare', help='A JSON file written by --output to diff against.')
+
+    def routes(self):
+        resolver = get_resolver()
+        for pattern in resolver.url_patterns:
+            if isinstance(pattern, URLResolver) and pattern.namespace in NAMESPACES:
+                for child in pattern.url_patterns:
+                    if isinstance(child, URLPattern) and child.name:
+                        yield f'{pattern.namespace}:{child.name}', str(child.pattern)
+
+    def sample_kwargs(self, name, route):
+        article = (
+            Article.alive_objects.filter(status=Article.Status.PUBLISHED, published_at__isnull=False)
+            .order_by('-published_at').only('slug').first()
+        )
+        month = ArchiveMonth.objects.first()
+        samples = {
+            'blog:archive': {'year': month.year, 'month': month.month} if month else None,
+            'blog:sitemap_shard': {'section': 'articles', 'shard': 0},
+        }
+        if name in samples:
+            return samples[name]
+        if '<slug:slug>' not in route:
+            return {}
+
+        model = Category if route.startswith('category/') else Tag if route.startswith('tag/') else None
+        row = model.alive_objects.filter(is_active=True).only('slug').first() if model else article
+        return {'slug': row.slug} if row else None
+
+    def measure(self, client, url, options):
+        for _ in range(options['warmup']):
+            client.get(url)
+
+        timings, queries = [], []
+        for _ in range(options['repeat']):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(ctx.captured_queries))
+
+        # a separate pass, since tracing allocations slows every request down
+        tracemalloc.start()
+        client.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        quantiles = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(quantiles, 50), 3),
+            'p95_ms': round(percentile(quantiles, 95), 3),
+            'p99_ms': round(percentile(quantiles, 99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+            'peak_kib': peak // 1024,
+        }
+
+    def git_revision(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+
+        client = Client()
+        if options['login']:
+            try:
+                client.force_login(User.objects.get(username=options['login']))
+            except User.DoesNotExist:
+                raise CommandError(f'No user named "{options["login"]}".')
+
+        results = {}
+        self.stdout.write(f'{"url name":<28}{"status":>7}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>9}{"peak KiB":>10}')
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, route in self.routes():
+                if name in SKIP or (options['names'] and name not in options['names']):
+                    continue
+                kwargs = self.sample_kwargs(name, route)
+                if kwargs is None:
+                    self.stdout.write(f'{name:<28}  skipped, no sample data')
+                    continue
+
+                result = results[name] = self.measure(client, reverse(name, kwargs=kwargs), options)
+                self.stdout.write(
+                    f'{name:<28}{result["status"]:>7}{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}'
+                    f'{result["p99_ms"]:>10.2f}{result["queries"]:>9}{result["peak_kib"]:>10}'
+                )
+
+        report = {
+            'meta': {
+                'revision': self.git_revision(),
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'articles': Article.objects.count(),
+                'repeat': options['repeat'],
+                'login': options['login'],
+            },
+            'urls': results,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}.'))
+
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+    def compare(self, report, path):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        self.stdout.write(f'\nAgainst {path} (revision {baseline["meta"].get("revision")}):')
+        self.stdout.write(f'{"url name":<28}{"p50":>10}{"p95":>10}{"p99":>10}{"queries":>9}')
+        for name, result in report['urls'].items():
+            before = baseline['urls'].get(name)
+            if before is None:
+                self.stdout.write(f'{name:<28}  new')
+                continue
+
+            def change(key):
+                if not before[key]:
+                    return 'n/a'
+                return f'{(result[key] - before[key]) / before[key] * 100:+.0f}%'
+
+            self.stdout.write(
+                f'{name:<28}{change("p50_ms"):>10}{change("p95_ms"):>10}{change("p99_ms"):>10}'
+                f'{result["queries"] - before["queries"]:>+9}'
+            )
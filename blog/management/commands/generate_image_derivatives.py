@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models
+from services.image_derivatives import FIELD_VARIANTS, derivatives_ready, generate_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Generate missing resized variants for every uploaded image.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist.')
+        parser.add_argument('--workers', type=int, default=settings.IMAGE_DERIVATIVE_WORKERS or 1,
+                            help='Images rendered at the same time.')
+
+    def image_fields(self):
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if isinstance(field, models.ImageField) and field.name in FIELD_VARIANTS:
+                    yield model, field
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = 0
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for model, field in self.image_fields():
+                variants = FIELD_VARIANTS[field.name]
+                queryset = (
+                    model._base_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+                    .order_by('pk').only('pk', field.name)
+                )
+                last_pk = None
+                while True:
+                    batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                    rows = list(batch[:options['batch_size']])
+                    if not rows:
+                        break
+
+                    files = [(row.pk, getattr(row, field.name)) for row in rows]
+                    futures = {
+                        executor.submit(generate_derivatives, file.name, file.storage, variants, model, pk): file
+                        for pk, file in files if options['force'] or not derivatives_ready(file)
+                    }
+                    for future in as_completed(futures):
+                        try:
+                            future.result()
+                            total += 1
+                        except Exception as e:
+                            self.stderr.write(f'{model._meta.label}.{field.name} {futures[future].name}: {e}')
+
+                    last_pk = rows[-1].pk
+                self.stdout.write(f'{model._meta.label}.{field.name} done, {total} images so far...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants for {total} images in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,373 @@
+import csv
+import json
+import os
+import time
+from functools import partial
+from itertools import islice
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import slug_re
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+from django.utils.timezone import is_naive, make_aware
+from services.image_derivatives import generate_derivatives_on_commit
+from services.upload_path import article_upload_path
+from blog.feeds import bump_feeds
+from blog.models import Article, Category, Comment, Tag
+from blog.page_cache import bump_taxonomy
+from blog.sitemaps import bump_sitemap
+from config.cache import CHROME_NAMESPACE, bump_version
+from .seed_blog import REBUILD_COMMANDS
+
+# CSV cells holding several categories or tags separate their slugs with this
+LIST_SEPARATOR = '|'
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path, fmt):
+    """Yield (line number, row dict) from a JSONL or CSV file, one line at a time."""
+    with open(path, newline='', encoding='utf-8') as source:
+        if fmt == 'csv':
+            reader = csv.DictReader(source)
+            for row in reader:
+                for key in ('categories', 'tags'):
+                    row[key] = [slug for slug in (row.get(key) or '').split(LIST_SEPARATOR) if slug]
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(source, 1):
+                if line.strip():
+                    try:
+                        yield number, json.loads(line)
+                    except ValueError as exc:
+                        yield number, RowError(f'invalid JSON: {exc}')
+
+
+def parse_date(value, field):
+    """An ISO 8601 date from the file, made aware in the current time zone."""
+    try:
+        parsed = parse_datetime(value)
+    except (ValueError, TypeError):
+        # well-formed but impossible dates raise, non-strings too
+        parsed = None
+    if parsed is None:
+        raise RowError(f'invalid {field} "{value}"')
+    return make_aware(parsed) if is_naive(parsed) else parsed
+
+
+def article_slug(row):
+    slug = row.get('slug')
+    return slug if isinstance(slug, str) and slug else slugify(str(row.get('title') or ''))
+
+
+def comment_entries(row):
+    comments = row.get('comments') or ()
+    return [comment for comment in comments if isinstance(comment, dict)] if isinstance(comments, list) else []
+
+
+def taxonomy_entry(value):
+    """A category or tag given as a slug or as {"slug": ..., "name": ...}."""
+    if isinstance(value, str):
+        value = {'slug': value}
+    if not isinstance(value, dict):
+        raise RowError('categories and tags must be slugs or objects')
+    name = value.get('name') or ''
+    if not isinstance(name, str):
+        raise RowError(f'invalid category or tag name "{name}"')
+    slug = value.get('slug') or slugify(name)
+    # the <slug:...> URL patterns cannot reverse an empty or free-form slug
+    if not isinstance(slug, str) or not slug_re.match(slug):
+        raise RowError(f'invalid category or tag slug "{slug}"')
+    return slug, name or slug.replace('-', ' ').title()
+
+
+STATUSES = {
+    key.lower(): status
+    for status in Article.Status
+    for key in (status.value, status.name, status.label)
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Import articles with their categories, tags and comments from a JSONL or CSV file. Rows are '
+        'read one batch at a time and inserted with bulk_create; categories and tags are matched by '
+        'slug and created when missing, and articles whose slug already exists are skipped. After '
+        'every committed batch the line reached is written to a checkpoint file, so an interrupted '
+        'import picks up where it stopped. Per-save signals do not run; the derived tables are '
+        'rebuilt at the end unless --skip-rebuild is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL (one article object per line) or CSV file.')
+        parser.add_argument('--format', choices=('jsonl', 'csv'), help='Default: from the file extension.')
+        parser.add_argument('--images', help='Directory that featured_image paths are relative to.')
+        parser.add_argument('--default-author', help='Username for rows whose author is missing or unknown.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--checkpoint', help='Default: <path>.checkpoint')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint.')
+        parser.add_argument('--skip-rebuild', action='store_true', help='Leave counters and indexes stale.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        if not os.path.exists(path):
+            raise CommandError(f'No such file: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        self.images = options['images']
+        self.stored_images = {}
+        self.pending_images = {}
+        self.users = {}
+        self.default_author = None
+        if options['default_author']:
+            self.default_author = self.user_pk(options['default_author'])
+            if self.default_author is None:
+                raise CommandError(f'No user named "{options["default_author"]}".')
+
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        resume_after = 0 if options['restart'] else self.read_checkpoint(checkpoint, path)
+        if resume_after:
+            self.stdout.write(f'Resuming after line {resume_after} from {checkpoint}.')
+
+        rows = ((number, row) for number, row in read_rows(path, fmt) if number > resume_after)
+        started = time.monotonic()
+        seen = imported = skipped = 0
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+
+            created, rejected = self.import_batch(batch)
+            self.write_checkpoint(checkpoint, path, batch[-1][0])
+            seen += len(batch)
+            imported += created
+            skipped += rejected
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'Line {batch[-1][0]}: {imported} imported, {skipped} skipped, {seen / elapsed:.0f} rows/s...'
+            )
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if imported:
+            bump_version(CHROME_NAMESPACE)
+            bump_taxonomy()
+            bump_feeds()
+            if not options['skip_rebuild']:
+                for name, kwargs in REBUILD_COMMANDS:
+                    call_command(name, stdout=self.stdout, stderr=self.stderr, **kwargs)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} articles ({skipped} rows skipped) in {elapsed:.1f}s, '
+            f'{seen / elapsed if elapsed else 0:.0f} rows/s.'
+        ))
+
+    def read_checkpoint(self, checkpoint, path):
+        try:
+            with open(checkpoint) as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return 0
+        if state.get('path') != os.path.abspath(path):
+            raise CommandError(f'{checkpoint} belongs to {state.get("path")}; pass --restart to ignore it.')
+        return state['line']
+
+    def write_checkpoint(self, checkpoint, path, line):
+        # written beside the target and renamed, so a crash never leaves half a file
+        with open(f'{checkpoint}.tmp', 'w') as checkpoint_file:
+            json.dump({'path': os.path.abspath(path), 'line': line}, checkpoint_file)
+        os.replace(f'{checkpoint}.tmp', checkpoint)
+
+    def warn(self, number, message):
+        self.stderr.write(f'Line {number}: {message}, skipped.')
+
+    def user_pk(self, username):
+        if username not in self.users:
+            self.users[username] = User.objects.filter(username=username).values_list('pk', flat=True).first()
+        return self.users[username]
+
+    def load_users(self, rows):
+        usernames = [row.get('author') for number, row in rows]
+        usernames += [comment.get('user') for number, row in rows for comment in comment_entries(row)]
+        missing = {name for name in usernames if isinstance(name, str) and name and name not in self.users}
+        found = dict(User.objects.filter(username__in=missing).values_list('username', 'pk'))
+        self.users.update({name: found.get(name) for name in missing})
+
+    def upsert_taxonomy(self, model, entries):
+        """Map slug -> pk for entries, creating the missing ones."""
+        pks = dict(model.objects.filter(slug__in=entries).order_by('pk').values_list('slug', 'pk'))
+        missing = [model(slug=slug, name=name, description=name) for slug, name in entries.items() if slug not in pks]
+        if missing:
+            model.objects.bulk_create(missing)
+            pks.update((row.slug, row.pk) for row in missing)
+        return pks
+
+    def image_name(self, relative):
+        """The storage name for an image; the file is copied once its batch commits."""
+        if relative in self.stored_images:
+            return self.stored_images[relative]
+        if relative not in self.pending_images:
+            source = os.path.join(self.images, relative)
+            if not os.path.isfile(source):
+                raise RowError(f'no image at {source}')
+            # the uuid in the name keeps save() from picking another one
+            self.pending_images[relative] = article_upload_path(None, os.path.basename(relative))
+        return self.pending_images[relative]
+
+    def store_images(self, pending):
+        for relative, name in pending.items():
+            with open(os.path.join(self.images, relative), 'rb') as image:
+                default_storage.save(name, File(image))
+            self.stored_images[relative] = name
+
+    def build_article(self, row):
+        """The unsaved Article for a row with its categories and tags as slug -> name."""
+        if not isinstance(row, dict):
+            raise RowError('expected a JSON object')
+
+        title, content = row.get('title'), row.get('content')
+        if not isinstance(title, str) or not title.strip() or not isinstance(content, str) or not content:
+            raise RowError('title and content are required')
+        title = title.strip()
+
+        author = row.get('author')
+        author = (self.users.get(author) if isinstance(author, str) else None) or self.default_author
+        if author is None:
+            raise RowError(f'unknown author "{row.get("author")}"')
+
+        status = STATUSES.get(str(row.get('status') or 'draft').lower())
+        if status is None:
+            raise RowError(f'unknown status "{row["status"]}"')
+
+        slug = article_slug(row)
+        if not slug_re.match(slug):
+            raise RowError(f'invalid slug "{slug}"')
+
+        published_at = parse_date(row['published_at'], 'published_at') if row.get('published_at') else None
+
+        taxonomy = []
+        for key in ('categories', 'tags'):
+            values = row.get(key) or []
+            if not isinstance(values, list):
+                raise RowError(f'{key} must be a list of slugs or objects')
+            taxonomy.append(dict(taxonomy_entry(value) for value in values))
+
+        comments = row.get('comments') or []
+        if not isinstance(comments, list) or not all(isinstance(comment, dict) for comment in comments):
+            raise RowError('comments must be a list of objects')
+        for comment in comments:
+            if comment.get('created_at'):
+                parse_date(comment['created_at'], 'comment created_at')
+
+        image = row.get('featured_image')
+        if image and not self.images:
+            raise RowError('featured_image given without --images')
+
+        article = Article(
+            title=title,
+            slug=slug,
+            content=content,
+            status=status,
+            author_id=author,
+            published_at=published_at,
+            featured_image=self.image_name(image) if image else None,
+            meta_description=row.get('meta_description') or '',
+            meta_keywords=row.get('meta_keywords') or '',
+        )
+        return article, *taxonomy
+
+    def import_batch(self, batch):
+        """Insert one batch in one transaction; returns (articles created, rows skipped)."""
+        rows = []
+        for number, row in batch:
+            if isinstance(row, RowError):
+                self.warn(number, row)
+            elif not isinstance(row, dict):
+                self.warn(number, 'expected a JSON object')
+            else:
+                rows.append((number, row))
+        self.load_users(rows)
+        self.pending_images = {}
+
+        slugs = [article_slug(row) for number, row in rows]
+        existing = set(Article.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+
+        articles, categories, tags = [], {}, {}
+        for (number, row), slug in zip(rows, slugs):
+            if slug in existing:
+                self.warn(number, f'an article with slug "{slug}" already exists')
+                continue
+            try:
+                article, row_categories, row_tags = self.build_article(row)
+            except RowError as exc:
+                self.warn(number, exc)
+                continue
+            articles.append((row, article, row_categories, row_tags))
+            categories.update(row_categories)
+            tags.update(row_tags)
+            existing.add(slug)
+
+        category_links = Article.categories.through
+        tag_links = Article.tags.through
+
+        with transaction.atomic():
+            category_pks = self.upsert_taxonomy(Category, categories)
+            tag_pks = self.upsert_taxonomy(Tag, tags)
+            Article.objects.bulk_create([article for row, article, *taxonomy in articles])
+
+            category_links.objects.bulk_create([
+                category_links(article_id=article.pk, category_id=category_pks[slug])
+                for row, article, row_categories, row_tags in articles
+                for slug in row_categories
+            ])
+            tag_links.objects.bulk_create([
+                tag_links(article_id=article.pk, tag_id=tag_pks[slug])
+                for row, article, row_categories, row_tags in articles
+                for slug in row_tags
+            ])
+            self.import_comments([(row, article) for row, article, *taxonomy in articles])
+
+            # a rolled back batch leaves no files behind; the copies are
+            # queued ahead of the derivatives that read them
+            transaction.on_commit(partial(self.store_images, self.pending_images))
+            for row, article, *taxonomy in articles:
+                if article.featured_image:
+                    generate_derivatives_on_commit(article.featured_image)
+        if articles:
+            bump_sitemap(Article, *(article.pk for row, article, *taxonomy in articles))
+        return len(articles), len(batch) - len(articles)
+
+    def import_comments(self, articles):
+        comments, created_at = [], []
+        for row, article in articles:
+            # build_article has checked the shape of every comment and its date
+            for comment in comment_entries(row):
+                user = comment.get('user')
+                user = self.users.get(user) if isinstance(user, str) else None
+                if user is None or not comment.get('text'):
+                    continue
+                comments.append(Comment(
+                    article_id=article.pk, user_id=user, text=str(comment['text']),
+                    is_approved=bool(comment.get('is_approved', True)),
+                ))
+                created_at.append(parse_date(comment['created_at'], 'created_at') if comment.get('created_at') else None)
+
+        Comment.objects.bulk_create(comments)
+        # bulk_create stamps auto_now_add fields with the import time; put
+        # the original dates back, which bulk_update writes as given
+        dated = []
+        for comment, value in zip(comments, created_at):
+            if value is not None:
+                comment.created_at = value
+                dated.append(comment)
+        if dated:
+            Comment.objects.bulk_update(dated, ['created_at'])
@@ -0,0 +1,34 @@
+import time
+from django.conf import settings
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+from blog.models import RelatedArticle
+from blog.related import FeatureIndex, compute, store
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related articles of every article from one in-memory index of categories and tags.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        index = FeatureIndex()
+        self.stdout.write(
+            f'Indexed {len(index.features)} articles over {len(index.postings)} categories and tags '
+            f'in {time.monotonic() - started:.1f}s.'
+        )
+
+        # articles that lost every feature or were unpublished still need their rows dropped
+        pks = sorted(set(index.features) | set(RelatedArticle.objects.values_list('article_id', flat=True).distinct()))
+        decay = index.decay(timezone.now(), settings.RELATED_ARTICLES_HALF_LIFE_DAYS)
+        changed = 0
+        for start in range(0, len(pks), options['batch_size']):
+            batch = pks[start:start + options['batch_size']]
+            changed += len(store(compute(index, batch, decay)))
+            self.stdout.write(f'{start + len(batch)}/{len(pks)} articles, {changed} changed...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Related articles rebuilt for {len(pks)} articles ({changed} changed) in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from blog.models import Article
+from blog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the article full-text search index in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        backend = get_search_backend(options['database'])
+        started = time.monotonic()
+
+        backend.create_index()
+        backend.clear()
+
+        queryset = (
+            Article.alive_objects.using(options['database'])
+            .filter(status=Article.Status.PUBLISHED)
+            .order_by('pk')
+            .values('id', 'title', 'slug', 'content', 'status', 'is_deleted', 'author__username')
+        )
+
+        total = 0
+        last_pk = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not rows:
+                break
+
+            with transaction.atomic(using=options['database']):
+                backend.index_rows(rows)
+
+            total += len(rows)
+            last_pk = rows[-1]['id']
+            self.stdout.write(f'Indexed {total} articles...')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} articles with {backend.__class__.__name__} in {elapsed:.1f}s.'
+        ))
@@ -0,0 +1,58 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from blog.models import Article, Category, Comment, Tag
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized comment and published article counters in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def counted(self, queryset, group_by):
+        return Coalesce(
+            Subquery(queryset.order_by().values(group_by).annotate(n=Count('pk')).values('n'), output_field=IntegerField()),
+            Value(0),
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        comments = Comment._base_manager.filter(article=OuterRef('pk'), is_approved=True, is_deleted=False)
+        self.reconcile(Article, 'comment_count', self.counted(comments, 'article'), options['batch_size'])
+
+        for model in (Category, Tag):
+            through = (Article.categories if model is Category else Article.tags).through
+            column = f'{model._meta.model_name}_id'
+            links = through.objects.filter(
+                article__status=Article.Status.PUBLISHED, article__is_deleted=False, **{column: OuterRef('pk')}
+            )
+            self.reconcile(model, 'published_article_count', self.counted(links, column), options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Counters reconciled in {time.monotonic() - started:.1f}s.'))
+
+    def reconcile(self, model, field, expression, batch_size):
+        pks = model._base_manager.order_by('pk').values_list('pk', flat=True)
+        last_pk = None
+        checked = fixed = 0
+        while True:
+            batch = list((pks if last_pk is None else pks.filter(pk__gt=last_pk))[:batch_size])
+            if not batch:
+                break
+
+            with transaction.atomic():
+                drifted = list(
+                    model._base_manager.filter(pk__in=batch).annotate(expected=expression)
+                    .exclude(**{field: F('expected')}).values_list('pk', flat=True)
+                )
+                if drifted:
+                    model._base_manager.filter(pk__in=drifted).update(**{field: expression})
+
+            checked += len(batch)
+            fixed += len(drifted)
+            last_pk = batch[-1]
+
+        self.stdout.write(f'{model._meta.label}.{field}: checked {checked}, fixed {fixed}.')
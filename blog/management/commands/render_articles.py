@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from blog import rendering
+from blog.models import Article
+from blog.page_cache import bump_article
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfill the pre-rendered body, excerpt, reading time and JSON-LD of every article in batches. '
+        'Articles whose source fields still match their render_hash are skipped unless --force is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--force', action='store_true', help='Re-render articles whose hash is current too.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        started = time.monotonic()
+        queryset = Article.objects.using(using).only('id', 'render_hash', *rendering.SOURCE_FIELDS).order_by('pk')
+
+        total = rendered = 0
+        last_pk = 0
+        while True:
+            articles = list(queryset.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not articles:
+                break
+
+            changed = [article for article in articles if rendering.render(article, force=options['force'])]
+            if changed:
+                with transaction.atomic(using=using):
+                    Article.objects.using(using).bulk_update(changed, rendering.RENDERED_FIELDS)
+                bump_article(*(article.pk for article in changed))
+
+            total += len(articles)
+            rendered += len(changed)
+            last_pk = articles[-1].pk
+            self.stdout.write(f'Checked {total} articles, rendered {rendered}...')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} of {total} articles in {elapsed:.1f}s.'))
@@ -0,0 +1,168 @@
+import io
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from accounts.models import Profile
+from blog.models import Article, Category, Comment, Tag
+
+WORDS = (
+    'django python search index query article content author blog cache database '
+    'performance server request response template view model field migration admin '
+    'signal storage image archive category tag comment feed sitemap paginate cursor '
+    'vector ranking snippet highlight token stem lexeme table scan latency throughput'
+).split()
+
+# derived tables bulk_create bypasses; rebuilt once the corpus is in
+REBUILD_COMMANDS = (
+    ('render_articles', {}),
+    ('reconcile_counters', {}),
+    ('backfill_archive_months', {}),
+    ('rebuild_search_index', {}),
+    ('rebuild_related_articles', {}),
+)
+
+
+def sentence(k):
+    return ' '.join(random.choices(WORDS, k=k)).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic corpus of users, profiles, categories, tags, articles, comments and images '
+        'with bulk inserts, then rebuild the counters, archive months, search index and related '
+        'articles. Seeded articles share a small set of image files; use a throwaway database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--articles', type=int, default=10_000)
+        parser.add_argument('--comments', type=int, default=3, help='Average comments per article.')
+        parser.add_argument('--tags-per-article', type=int, default=3)
+        parser.add_argument('--months', type=int, default=36, help='Spread published dates over this many months.')
+        parser.add_argument('--archived', type=float, default=0.2, help='Share of articles in the archive.')
+        parser.add_argument('--drafts', type=float, default=0.05)
+        parser.add_argument('--images', type=int, default=10, help='Distinct image files to create.')
+        parser.add_argument('--image-ratio', type=float, default=0.3, help='Share of articles with a featured image.')
+        parser.add_argument('--words', type=int, default=300, help='Words per article body.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='seed', help='Prefix for usernames and slugs; must be new.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--skip-rebuild', action='store_true', help='Leave counters and indexes stale.')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        prefix = options['prefix']
+        if options['users'] < 1:
+            raise CommandError('Articles and comments need at least one user.')
+        if User.objects.filter(username__startswith=f'{prefix}-user-').exists():
+            raise CommandError(f'Users prefixed "{prefix}" already exist; pass another --prefix.')
+
+        started = time.monotonic()
+        users = self.seed_users(options)
+        categories = self.seed_taxonomy(Category, options['categories'], options)
+        tags = self.seed_taxonomy(Tag, options['tags'], options)
+        images = self.seed_images(options)
+        self.stdout.write(f'Seeded {len(users)} users, {len(categories)} categories, {len(tags)} tags.')
+
+        self.seed_articles(options, users, categories, tags, images)
+        self.stdout.write(self.style.SUCCESS(f'Seeded the corpus in {time.monotonic() - started:.1f}s.'))
+
+        if not options['skip_rebuild']:
+            for name, kwargs in REBUILD_COMMANDS:
+                call_command(name, stdout=self.stdout, stderr=self.stderr, **kwargs)
+
+    def seed_users(self, options):
+        prefix = options['prefix']
+        password = make_password('password')
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}-user-{i}', email=f'{prefix}-user-{i}@example.invalid', password=password,
+                 first_name='Seed', last_name=f'User {i}')
+            for i in range(options['users'])
+        ], batch_size=options['batch_size'])
+        Profile.objects.bulk_create([
+            Profile(user=user, name=f'{user.first_name} {user.last_name}', email=user.email) for user in users
+        ], batch_size=options['batch_size'])
+        return [user.pk for user in users]
+
+    def seed_taxonomy(self, model, count, options):
+        name = model._meta.model_name
+        rows = model.objects.bulk_create([
+            model(name=f'{sentence(2)} {i}', slug=f'{options["prefix"]}-{name}-{i}', description=sentence(12))
+            for i in range(count)
+        ], batch_size=options['batch_size'])
+        return [row.pk for row in rows]
+
+    def seed_images(self, options):
+        names = []
+        for i in range(options['images']):
+            color = tuple(random.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new('RGB', (1280, 720), color).save(buffer, 'JPEG', quality=80)
+            names.append(default_storage.save(f'article/{options["prefix"]}-{i}.jpg', ContentFile(buffer.getvalue())))
+        return names
+
+    def seed_articles(self, options, users, categories, tags, images):
+        total = options['articles']
+        batch_size = options['batch_size']
+        now = timezone.now()
+        span = timedelta(days=30 * options['months']).total_seconds()
+        category_links = Article.categories.through
+        tag_links = Article.tags.through
+        started = time.monotonic()
+        comments = 0
+
+        for offset in range(0, total, batch_size):
+            articles = []
+            for i in range(offset, min(offset + batch_size, total)):
+                roll = random.random()
+                status = (
+                    Article.Status.DRAFT if roll < options['drafts'] else
+                    Article.Status.ARCHIVE if roll < options['drafts'] + options['archived'] else
+                    Article.Status.PUBLISHED
+                )
+                title = sentence(6)
+                articles.append(Article(
+                    title=title,
+                    slug=f'{options["prefix"]}-{i}',
+                    content=sentence(options['words']),
+                    status=status,
+                    author_id=random.choice(users),
+                    published_at=None if status == Article.Status.DRAFT else now - timedelta(seconds=random.uniform(0, span)),
+                    featured_image=random.choice(images) if images and random.random() < options['image_ratio'] else None,
+                    meta_description=title,
+                ))
+
+            with transaction.atomic():
+                Article.objects.bulk_create(articles, batch_size=batch_size)
+                category_links.objects.bulk_create([
+                    category_links(article_id=article.pk, category_id=category_pk)
+                    for article in articles for category_pk in random.sample(categories, min(len(categories), random.randint(1, 2)))
+                ], batch_size=batch_size)
+                tag_links.objects.bulk_create([
+                    tag_links(article_id=article.pk, tag_id=tag_pk)
+                    for article in articles for tag_pk in random.sample(tags, min(len(tags), options['tags_per_article']))
+                ], batch_size=batch_size)
+                batch_comments = [
+                    Comment(article_id=article.pk, user_id=random.choice(users), text=sentence(20),
+                            is_approved=random.random() < 0.9)
+                    for article in articles if article.status != Article.Status.DRAFT
+                    for _ in range(random.randint(0, 2 * options['comments']))
+                ]
+                Comment.objects.bulk_create(batch_comments, batch_size=batch_size)
+                comments += len(batch_comments)
+
+            done = offset + len(articles)
+            self.stdout.write(
+                f'{done}/{total} articles, {comments} comments, {done / (time.monotonic() - started):.0f} articles/s...'
+            )
@@ -1,3 +1,4 @@
+from datetime import date
 from django.db import models
 from django.db.models import Q
 from django.utils.text import slugify
@@ -7,13 +8,18 @@ from django.contrib.auth.models import User
 from django.urls import reverse_lazy
 from django.core.validators import MinLengthValidator
 from config.models.mixins import AuditSoftDeleteMixin as SoftDeleteMixin
-from config.models.mixins import SEOMixin
+from config.models.mixins import SEOMixin, TrackedFieldsMixin
+from config.models.indexes import DescNullsLastIndex
+from . import rendering
 
-class Category(SoftDeleteMixin, SEOMixin, models.Model):
+class Category(TrackedFieldsMixin, SoftDeleteMixin, SEOMixin, models.Model):
     name = models.CharField(max_length=200, validators=[MinLengthValidator(3)])
     slug = models.SlugField(max_length=200, validators=[MinLengthValidator(3)])
     description = models.TextField(help_text='Short description')
     is_active = models.BooleanField(default=True)
+    published_article_count = models.PositiveIntegerField(default=0, editable=False)
+
+    tracked_fields = ('og_image', 'twitter_image')
 
     class Meta:
         verbose_name_plural = 'Categories'
@@ -23,7 +29,10 @@ class Category(SoftDeleteMixin, SEOMixin, models.Model):
         ]
         indexes = [
             models.Index(fields=['is_active', 'name']),
-            models.Index(fields=['is_active', 'slug'])
+            models.Index(fields=['is_active', 'slug']),
+            # alive_objects detail lookups by slug; the navbar's active rows by
+            # name are read in order from the partial unique_name_slug index
+            models.Index(fields=['slug'], condition=Q(is_deleted=False), name='blog_category_alive_slug_idx'),
         ]
 
     def __str__(self):
@@ -37,11 +46,14 @@ class Category(SoftDeleteMixin, SEOMixin, models.Model):
             self.slug = slugify(self.name)
         return super().save(*args, **kwargs)
 
-class Tag(SoftDeleteMixin, SEOMixin, models.Model):
+class Tag(TrackedFieldsMixin, SoftDeleteMixin, SEOMixin, models.Model):
     name = models.CharField(max_length=200, validators=[MinLengthValidator(3)])
     slug = models.SlugField(max_length=200, validators=[MinLengthValidator(3)])
     description = models.TextField(help_text='Short description')
     is_active = models.BooleanField(default=True)
+    published_article_count = models.PositiveIntegerField(default=0, editable=False)
+
+    tracked_fields = ('og_image', 'twitter_image')
 
     class Meta:
         verbose_name_plural = 'Tags'
@@ -51,7 +63,10 @@ class Tag(SoftDeleteMixin, SEOMixin, models.Model):
         ]
         indexes = [
             models.Index(fields=['is_active', 'name']),
-            models.Index(fields=['is_active', 'slug'])
+            models.Index(fields=['is_active', 'slug']),
+            # alive_objects detail lookups by slug; the navbar's active rows by
+            # name are read in order from the partial unique_name_slug index
+            models.Index(fields=['slug'], condition=Q(is_deleted=False), name='blog_tag_alive_slug_idx'),
         ]
 
     def __str__(self):
@@ -65,7 +80,7 @@ class Tag(SoftDeleteMixin, SEOMixin, models.Model):
             self.slug = slugify(self.name)
         return super().save(*args, **kwargs)
     
-class Article(SoftDeleteMixin, SEOMixin, models.Model):
+class Article(TrackedFieldsMixin, SoftDeleteMixin, SEOMixin, models.Model):
     class Status(models.TextChoices):
         DRAFT = 'DR', 'Draft'
         PUBLISHED = 'PB', 'Published'
@@ -85,6 +100,17 @@ class Article(SoftDeleteMixin, SEOMixin, models.Model):
 
     views = models.PositiveIntegerField(default=0)
     likes = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # rendered from title, content and meta_description on save (blog.rendering)
+    body_html = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=0, editable=False)
+    json_ld = models.TextField(blank=True, editable=False)
+    render_hash = models.CharField(max_length=64, blank=True, editable=False)
+
+    tracked_fields = ('featured_image', 'og_image', 'twitter_image', 'status', 'is_deleted', 'published_at', 'title', 'slug')
 
     class Meta:
         verbose_name_plural = 'Articles'
@@ -95,7 +121,13 @@ class Article(SoftDeleteMixin, SEOMixin, models.Model):
         ]
         indexes = [
             models.Index(fields=['status', 'title']),
-            models.Index(fields=['status', 'slug'])
+            models.Index(fields=['status', 'slug']),
+            # the keyset feed over alive_objects, newest first
+            DescNullsLastIndex(fields=['-published_at', '-id'], condition=Q(is_deleted=False), name='blog_article_alive_feed_idx'),
+            # detail pages: slug among alive rows, status and date checked from the index
+            models.Index(fields=['slug', 'status', 'published_at'], condition=Q(is_deleted=False), name='blog_article_alive_slug_idx'),
+            # month archives: alive rows of one status within a date range
+            models.Index(fields=['status', '-published_at'], condition=Q(is_deleted=False), name='blog_article_alive_status_idx'),
         ]
 
     def __str__(self):
@@ -104,20 +136,73 @@ class Article(SoftDeleteMixin, SEOMixin, models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or not set(update_fields).isdisjoint(rendering.SOURCE_FIELDS):
+            if rendering.render(self) and update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *rendering.RENDERED_FIELDS}
         return super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse_lazy("blog:article_detail", args=[self.slug])
+
+    def get_reading_time(self):
+        # rows render_articles has not backfilled yet have no reading_time
+        if self.render_hash:
+            return self.reading_time
+        return rendering.reading_time(len(self.content.split()))
     
-class Comment(SoftDeleteMixin, models.Model):
+class Comment(TrackedFieldsMixin, SoftDeleteMixin, models.Model):
     article = models.ForeignKey(Article, related_name='comments', on_delete=models.CASCADE)
     user = models.ForeignKey(User, related_name='blog_comments', on_delete=models.CASCADE)
     text = models.TextField(max_length=500)
     is_approved = models.BooleanField(default=False, db_index=True)
 
+    tracked_fields = ('article', 'is_approved', 'is_deleted')
+
     class Meta:
         verbose_name_plural = 'Comments'
         ordering = ['-created_at']
+        indexes = [
+            # an article's visible comments in keyset order, newest first
+            models.Index(fields=['article', '-created_at', '-id'], condition=Q(is_deleted=False, is_approved=True), name='blog_comment_visible_idx'),
+        ]
+
+    def __str__(self):
+        return f'Comment by {self.user.username} on {self.article.title}'
+
+class ArchiveMonth(models.Model):
+    # alive archived articles per month of published_at, kept up to date by
+    # blog.signals so the archive menu never aggregates the articles table
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'month'], name='%(app_label)s_%(class)s_unique_year_month'),
+        ]
+
+    def __str__(self):
+        return f'{self.year}-{self.month:02d}'
+
+    @property
+    def first_day(self):
+        return date(self.year, self.month, 1)
+
+class RelatedArticle(models.Model):
+    # the top neighbours of each published article by shared categories and
+    # tags, maintained by blog.related so detail pages read one index range
+    article = models.ForeignKey(Article, related_name='related_links', on_delete=models.CASCADE)
+    related = models.ForeignKey(Article, related_name='+', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['article', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'rank'], name='%(app_label)s_%(class)s_unique_article_rank'),
+        ]
 
     def __str__(self):
-        return f'Comment by {self.user.username} on {self.article.title}'
\ No newline at end of file
+        return f'{self.article_id} -> {self.related_id} ({self.score:.3f})'
@@ -0,0 +1,150 @@
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from config.cache import CHROME_NAMESPACE, bump_version, get_versions
+from config.metrics import record_cache
+from config.replicas import use_primary
+from .view_counter import view_counter
+
+TAXONOMY_NAMESPACE = 'taxonomy'
+SLUG_KEY = 'article:slug:{}'
+PAGE_KEY = 'page:article:{}:{}:{}'
+
+def article_namespace(pk):
+    return f'article:{pk}'
+
+def bump_article(*pks):
+    for pk in pks:
+        bump_version(article_namespace(pk))
+
+def bump_taxonomy():
+    bump_version(TAXONOMY_NAMESPACE)
+
+def article_etag(pk):
+    versions = get_versions(article_namespace(pk), TAXONOMY_NAMESPACE, CHROME_NAMESPACE)
+    return '"{}-{}"'.format(pk, '-'.join(str(version) for version in versions))
+
+
+class ArticlePageCacheMixin:
+    """
+    Full-page cache and conditional GET for anonymous readers. Pages are
+    keyed by the article's content version, so bumping any of the article,
+    taxonomy or chrome versions retires them; 304s and cache hits never
+    touch the database or the template engine. Misses render from the
+    primary, since a replica may predate the write behind the version.
+    """
+
+    page_cache_timeout = None
+
+    def get_page_cache_timeout(self):
+        if self.page_cache_timeout is not None:
+            return self.page_cache_timeout
+        return settings.ARTICLE_PAGE_CACHE_TIMEOUT
+
+    def is_page_cacheable(self, request):
+        if request.method not in ('GET', 'HEAD') or request.GET:
+            return False
+        if request.user.is_authenticated:
+            return False
+        return len(get_messages(request)) == 0
+
+    def page_key(self, request, etag):
+        return PAGE_KEY.format(request.scheme, request.get_host(), etag)
+
+    def finalize(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    def cached_page(self, request, slug):
+        """Return (response, pk, etag); response is set on a 304 or a cache hit."""
+        pk = cache.get(SLUG_KEY.format(slug))
+        etag = article_etag(pk) if pk is not None else None
+        if etag is None:
+            return None, pk, etag
+
+        entry = cache.get(self.page_key(request, etag))
+        record_cache(entry is not None)
+        last_modified = entry['last_modified'] if entry else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None and entry is not None:
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        if response is not None:
+            view_counter.record(request, pk)
+            response = self.finalize(response, etag, last_modified)
+        return response, pk, etag
+
+    def cache_page(self, request, slug, response, pk, etag):
+        if response.status_code != 200:
+            return response
+
+        # the version must be read before the page's data was; on the first
+        # request for a slug we only learn its pk, the next one is cached
+        cache.set(SLUG_KEY.format(slug), self.object.pk, self.get_page_cache_timeout())
+        if etag is None or pk != self.object.pk:
+            return response
+
+        if hasattr(response, 'render'):
+            response.render()
+        if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+            # the page carries this visitor's CSRF token, and a replay would
+            # neither share it safely nor set the cookie it belongs to
+            return response
+
+        last_modified = int(time.time())
+        cache.set(
+            self.page_key(request, etag),
+            {'content': response.content, 'content_type': response['Content-Type'], 'last_modified': last_modified},
+            self.get_page_cache_timeout(),
+        )
+        return self.finalize(response, etag, last_modified)
+
+    def dispatch_uncached(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_page_cacheable(request):
+            return self.dispatch_uncached(request, *args, **kwargs)
+
+        slug = kwargs.get(self.slug_url_kwarg)
+        cached, pk, etag = self.cached_page(request, slug)
+        if cached is not None:
+            return cached
+
+        with use_primary():
+            response = self.dispatch_uncached(request, *args, **kwargs)
+            # render here so the template's queries are pinned too
+            if hasattr(response, 'render'):
+                response.render()
+            return self.cache_page(request, slug, response, pk, etag)
+
+
+class AsyncArticlePageCacheMixin:
+    """
+    ArticlePageCacheMixin for async views. The session, the cache and
+    rendering are synchronous, so each step runs in one thread hop.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        if not await sync_to_async(self.is_page_cacheable)(request):
+            return await self.dispatch_uncached(request, *args, **kwargs)
+
+        slug = kwargs.get(self.slug_url_kwarg)
+        cached, pk, etag = await sync_to_async(self.cached_page)(request, slug)
+        if cached is not None:
+            return cached
+
+        with use_primary():
+            response = await self.dispatch_uncached(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                await sync_to_async(response.render)()
+            return await sync_to_async(self.cache_page)(request, slug, response, pk, etag)
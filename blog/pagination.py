@@ -0,0 +1,164 @@
+import base64
+import binascii
+import json
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class KeysetPage:
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Seek pagination ordered by (-<date_field> NULLS LAST, -id). Pages are
+    addressed by opaque cursors instead of numbers, so fetching any page
+    costs one indexed range scan and no COUNT(*).
+    """
+
+    def __init__(self, queryset, per_page, date_field='published_at'):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.date_field = date_field
+
+    def encode_cursor(self, obj, direction):
+        value = getattr(obj, self.date_field)
+        payload = [direction, value.isoformat() if value else None, obj.pk]
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        if not cursor:
+            return None
+
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, value, pk = json.loads(raw)
+            value = parse_datetime(value) if value else None
+            pk = int(pk)
+        except (binascii.Error, ValueError, TypeError):
+            return None
+
+        if direction not in (NEXT, PREVIOUS):
+            return None
+        return direction, value, pk
+
+    @staticmethod
+    def cursor_key(cursor):
+        """Cursor as a cache key part; cursors that don't decode name the first page."""
+        position = KeysetPaginator.decode_cursor(cursor)
+        if position is None:
+            return ''
+        direction, value, pk = position
+        return f'{direction}:{value.isoformat() if value else ""}:{pk}'
+
+    def forward_ordering(self):
+        return [F(self.date_field).desc(nulls_last=True), F('pk').desc()]
+
+    def backward_ordering(self):
+        return [F(self.date_field).asc(nulls_first=True), F('pk').asc()]
+
+    def after(self, value, pk):
+        field = self.date_field
+        if value is None:
+            return Q(**{f'{field}__isnull': True, 'pk__lt': pk})
+        return (
+            Q(**{f'{field}__lt': value}) |
+            Q(**{field: value, 'pk__lt': pk}) |
+            Q(**{f'{field}__isnull': True})
+        )
+
+    def before(self, value, pk):
+        field = self.date_field
+        if value is None:
+            return Q(**{f'{field}__isnull': False}) | Q(**{f'{field}__isnull': True, 'pk__gt': pk})
+        return Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+
+    def page_queryset(self, position):
+        limit = self.per_page + 1
+        if position is None:
+            return self.queryset.order_by(*self.forward_ordering())[:limit]
+
+        direction, value, pk = position
+        if direction == NEXT:
+            return self.queryset.filter(self.after(value, pk)).order_by(*self.forward_ordering())[:limit]
+        return self.queryset.filter(self.before(value, pk)).order_by(*self.backward_ordering())[:limit]
+
+    def build_page(self, rows, position):
+        if position is None:
+            has_next, has_previous = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        elif position[0] == NEXT:
+            has_next, has_previous = len(rows) > self.per_page, True
+            rows = rows[:self.per_page]
+        else:
+            has_previous, has_next = len(rows) > self.per_page, True
+            rows = rows[:self.per_page][::-1]
+
+        if not rows:
+            return KeysetPage([])
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], NEXT) if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], PREVIOUS) if has_previous else None,
+        )
+
+    def get_page(self, cursor=None):
+        position = self.decode_cursor(cursor)
+        return self.build_page(list(self.page_queryset(position)), position)
+
+    async def aget_page(self, cursor=None):
+        position = self.decode_cursor(cursor)
+        return self.build_page([row async for row in self.page_queryset(position)], position)
+
+
+class KeysetPaginationMixin:
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class AsyncKeysetPaginationMixin(KeysetPaginationMixin):
+    """
+    For async views: apaginate_queryset() fetches the page with the async
+    ORM up front, and paginate_queryset() hands it to get_context_data().
+    """
+
+    async def apaginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size)
+        page = await paginator.aget_page(self.request.GET.get(self.cursor_kwarg))
+        self.prefetched_page = (paginator, page, page.object_list, page.has_other_pages())
+        return self.prefetched_page
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.prefetched_page
@@ -0,0 +1,172 @@
+import heapq
+import math
+from collections import defaultdict
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import Article, RelatedArticle
+from .page_cache import bump_article
+
+# Each published article is a sparse vector over its categories and tags.
+# A feature shared by few articles says more than one shared by hundreds,
+# so it is weighted by the inverse log of its posting size; two articles
+# score the weighted overlap of their vectors, decayed by the candidate's
+# age. Scoring walks the postings of an article's own features only, which
+# is the sparse product A @ A.T one row at a time.
+FEATURES = (
+    (Article.categories.through, 'category_id', 1.0),
+    (Article.tags.through, 'tag_id', 1.5),
+)
+# A feature on more articles than BROAD_POSTING (a catch-all category) is not
+# walked: it only lifts candidates found through rarer features, plus its
+# newest articles, which are the ones decay favours among its members.
+# Incremental refreshes do not fan out through broad features either; the
+# rebuild command catches those lists up.
+BROAD_POSTING = 500
+BROAD_CANDIDATES = 50
+
+
+def published_articles(using=None):
+    return Article.alive_objects.using(using).filter(status=Article.Status.PUBLISHED, published_at__isnull=False)
+
+
+class FeatureIndex:
+    """
+    Postings of published articles. With article_pks, only the features of
+    those articles are loaded, which is all their neighbours can share; the
+    posting of a broad feature then holds just its newest members and the
+    candidates found through narrower ones, all neighbours() reads from it.
+    """
+
+    def __init__(self, using=None, article_pks=None):
+        self.features = defaultdict(list)
+        self.postings = defaultdict(list)
+        self.sizes = {}
+        self.published_at = {}
+        self.weights = {}
+
+        broad = []
+        for through, column, weight in FEATURES:
+            self.weights[column] = weight
+            links = through.objects.using(using).filter(article__in=published_articles(using))
+            if article_pks is None:
+                self.load(links, column)
+                continue
+
+            own = through.objects.using(using).filter(article_id__in=article_pks).values(column)
+            sizes = dict(
+                links.filter(**{f'{column}__in': own}).order_by().values(column).annotate(n=Count('pk')).values_list(column, 'n')
+            )
+            self.sizes.update(((column, feature_pk), n) for feature_pk, n in sizes.items())
+            self.load(links.filter(**{f'{column}__in': [pk for pk, n in sizes.items() if n <= BROAD_POSTING]}), column)
+            broad.append((links, column, [pk for pk, n in sizes.items() if n > BROAD_POSTING]))
+
+        candidates = set(self.published_at).union(article_pks or ())
+        for links, column, feature_pks in broad:
+            if not feature_pks:
+                continue
+            self.load(links.filter(**{f'{column}__in': feature_pks, 'article_id__in': candidates}), column)
+            for feature_pk in feature_pks:
+                newest = links.filter(**{column: feature_pk}).exclude(article_id__in=candidates)
+                self.load(newest.order_by('-article__published_at')[:BROAD_CANDIDATES], column)
+
+        for feature, posting in self.postings.items():
+            self.sizes.setdefault(feature, len(posting))
+            posting.sort(key=self.published_at.__getitem__, reverse=True)
+        self._members = {}
+
+    def load(self, links, column):
+        for article_pk, feature_pk, published_at in links.values_list('article_id', column, 'article__published_at').iterator(chunk_size=5000):
+            feature = (column, feature_pk)
+            self.features[article_pk].append(feature)
+            self.postings[feature].append(article_pk)
+            self.published_at[article_pk] = published_at
+
+    def members(self, feature):
+        if feature not in self._members:
+            self._members[feature] = set(self.postings[feature])
+        return self._members[feature]
+
+    def decay(self, now, half_life):
+        return {
+            pk: 0.5 ** (max((now - published_at).total_seconds() / 86400, 0) / half_life)
+            for pk, published_at in self.published_at.items()
+        }
+
+    def neighbours(self, pk, limit, decay):
+        scores = defaultdict(float)
+        broad = []
+        for feature in self.features.get(pk, ()):
+            size = self.sizes[feature]
+            if size < 2:
+                continue
+            weight = self.weights[feature[0]] / math.log2(1 + size)
+            if size > BROAD_POSTING:
+                broad.append((feature, weight))
+                continue
+            for other in self.postings[feature]:
+                scores[other] += weight
+
+        for feature, weight in broad:
+            members = self.members(feature)
+            lifted = {other for other in scores if other in members}
+            lifted.update(self.postings[feature][:BROAD_CANDIDATES])
+            for other in lifted:
+                scores[other] += weight
+        scores.pop(pk, None)
+
+        return heapq.nlargest(
+            limit, ((score * decay[other], other) for other, score in scores.items()),
+            key=lambda item: (item[0], -item[1]),
+        )
+
+
+def compute(index, article_pks, decay=None):
+    if decay is None:
+        decay = index.decay(timezone.now(), settings.RELATED_ARTICLES_HALF_LIFE_DAYS)
+    limit = settings.RELATED_ARTICLES_LIMIT
+    return {pk: index.neighbours(pk, limit, decay) for pk in article_pks}
+
+def store(results, using=None):
+    """Replace the stored neighbours of results' articles; returns the pks whose list changed."""
+    current = defaultdict(list)
+    for article_pk, related_pk in (
+        RelatedArticle.objects.using(using).filter(article__in=list(results)).values_list('article_id', 'related_id')
+    ):
+        current[article_pk].append(related_pk)
+
+    changed = [pk for pk, rows in results.items() if current[pk] != [other for score, other in rows]]
+    if not changed:
+        return changed
+
+    with transaction.atomic(using=using):
+        RelatedArticle.objects.using(using).filter(article__in=changed).delete()
+        RelatedArticle.objects.using(using).bulk_create([
+            RelatedArticle(article_id=pk, related_id=other, rank=rank, score=score)
+            for pk in changed for rank, (score, other) in enumerate(results[pk])
+        ], batch_size=1000)
+    bump_article(*changed)
+    return changed
+
+
+def affected_articles(article_pks, using=None):
+    """The articles whose neighbour lists article_pks can enter or leave."""
+    affected = set(article_pks)
+    affected.update(RelatedArticle.objects.using(using).filter(related__in=article_pks).values_list('article_id', flat=True))
+    for through, column, weight in FEATURES:
+        links = through.objects.using(using)
+        narrow = (
+            links.filter(**{f'{column}__in': links.filter(article_id__in=article_pks).values(column)})
+            .order_by().values(column).annotate(n=Count('pk')).filter(n__lte=BROAD_POSTING).values(column)
+        )
+        affected.update(links.filter(**{f'{column}__in': narrow}).values_list('article_id', flat=True))
+    return affected
+
+def refresh(article_pks, using=None):
+    affected = affected_articles(list(article_pks), using)
+    return store(compute(FeatureIndex(using, affected), affected), using)
+
+def refresh_on_commit(article_pks, using=None):
+    transaction.on_commit(partial(refresh, list(article_pks), using), using=using)
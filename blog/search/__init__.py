@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+from .base import BaseSearchBackend, IContainsSearchBackend, SearchResults
+
+BACKENDS = {
+    'sqlite': 'blog.search.sqlite.SQLiteFTSBackend',
+    'postgresql': 'blog.search.postgres.PostgresSearchBackend',
+}
+
+def get_search_backend(using='default'):
+    path = getattr(settings, 'BLOG_SEARCH_BACKEND', 'auto')
+    if path == 'auto':
+        path = BACKENDS.get(connections[using].vendor, 'blog.search.base.IContainsSearchBackend')
+    return import_string(path)(using=using)
@@ -0,0 +1,130 @@
+import re
+from django.db import connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from blog.models import Article
+from blog.services import article_cards
+
+HIGHLIGHT_START = '{{{hl}}}'
+HIGHLIGHT_STOP = '{{{/hl}}}'
+MAX_QUERY_TERMS = 16
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '')[:MAX_QUERY_TERMS]
+
+def render_snippet(snippet):
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+    return mark_safe(html)
+
+
+class SearchResults:
+    """Lazy, paginator-friendly sequence of ranked search hits."""
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[0:self.count()])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        if stop <= start:
+            return []
+
+        hits = self.backend.ranked(self.query, start, stop - start)
+        articles = article_cards(
+            Article.alive_objects.filter(status=Article.Status.PUBLISHED)
+        ).in_bulk([pk for pk, snippet in hits])
+
+        results = []
+        for pk, snippet in hits:
+            article = articles.get(pk)
+            if article is None:
+                continue
+            article.search_snippet = render_snippet(snippet)
+            results.append(article)
+        return results
+
+
+class BaseSearchBackend:
+    using = 'default'
+
+    def __init__(self, using=None):
+        if using:
+            self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def is_indexable(self, row):
+        return not row['is_deleted'] and row['status'] == Article.Status.PUBLISHED
+
+    def create_index(self):
+        pass
+
+    def clear(self):
+        pass
+
+    def index_rows(self, rows):
+        pass
+
+    def remove(self, pks):
+        pass
+
+    def update_articles(self, pks):
+        pks = list(pks)
+        if not pks:
+            return
+
+        rows = list(
+            Article.objects.using(self.using)
+            .filter(pk__in=pks)
+            .values('id', 'title', 'slug', 'content', 'status', 'is_deleted', 'author__username')
+        )
+        self.index_rows([row for row in rows if self.is_indexable(row)])
+
+        indexed = {row['id'] for row in rows if self.is_indexable(row)}
+        self.remove([pk for pk in pks if pk not in indexed])
+
+    def search(self, query):
+        return SearchResults(self, query)
+
+    def count(self, query):
+        raise NotImplementedError
+
+    def ranked(self, query, offset, limit):
+        raise NotImplementedError
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """The original unindexed lookup; needs no index and returns no snippets."""
+
+    def search(self, query):
+        if not query:
+            return Article.alive_objects.none()
+
+        return article_cards(Article.alive_objects.filter(
+            Q(title__icontains=query) |
+            Q(slug__icontains=query) |
+            Q(author__username__icontains=query) |
+            Q(content__icontains=query),
+            status=Article.Status.PUBLISHED
+        ))
@@ -0,0 +1,86 @@
+from django.conf import settings
+from .base import BaseSearchBackend, HIGHLIGHT_START, HIGHLIGHT_STOP, search_terms
+
+TABLE = 'blog_article_search'
+HEADLINE_OPTIONS = f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_STOP}", MaxWords=35, MinWords=15'
+DOCUMENT = (
+    "setweight(to_tsvector(%(config)s, %(title)s), 'A') || "
+    "setweight(to_tsvector(%(config)s, %(slug)s), 'B') || "
+    "setweight(to_tsvector(%(config)s, %(author)s), 'C') || "
+    "setweight(to_tsvector(%(config)s, %(content)s), 'D')"
+)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Weighted tsvector documents in a side table with a GIN index."""
+
+    @property
+    def config(self):
+        return getattr(settings, 'BLOG_SEARCH_CONFIG', 'english')
+
+    def create_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+                'article_id bigint PRIMARY KEY REFERENCES blog_article (id) ON DELETE CASCADE, '
+                'document tsvector NOT NULL)'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {TABLE}_document_idx ON {TABLE} USING GIN (document)')
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {TABLE}')
+
+    def index_rows(self, rows):
+        if not rows:
+            return
+
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (article_id, document) VALUES (%(id)s, {DOCUMENT}) '
+                'ON CONFLICT (article_id) DO UPDATE SET document = EXCLUDED.document',
+                [
+                    {
+                        'id': row['id'],
+                        'config': self.config,
+                        'title': row['title'],
+                        'slug': row['slug'].replace('-', ' '),
+                        'author': row['author__username'] or '',
+                        'content': row['content'],
+                    }
+                    for row in rows
+                ],
+            )
+
+    def remove(self, pks):
+        if not pks:
+            return
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE article_id = ANY(%s)', [list(pks)])
+
+    def count(self, query):
+        if not search_terms(query):
+            return 0
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {TABLE} WHERE document @@ websearch_to_tsquery(%s, %s)',
+                [self.config, query],
+            )
+            return cursor.fetchone()[0]
+
+    def ranked(self, query, offset, limit):
+        if not search_terms(query):
+            return []
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT s.article_id, ts_headline(%s, a.content, q, %s) '
+                f'FROM {TABLE} s JOIN blog_article a ON a.id = s.article_id, '
+                'websearch_to_tsquery(%s, %s) q '
+                'WHERE s.document @@ q '
+                'ORDER BY ts_rank_cd(s.document, q) DESC, s.article_id DESC LIMIT %s OFFSET %s',
+                [self.config, HEADLINE_OPTIONS, self.config, query, limit, offset],
+            )
+            return cursor.fetchall()
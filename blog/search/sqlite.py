@@ -0,0 +1,68 @@
+from .base import BaseSearchBackend, HIGHLIGHT_START, HIGHLIGHT_STOP, search_terms
+
+TABLE = 'blog_article_fts'
+# bm25 column weights: title, slug, author, content
+RANK = f'bm25({TABLE}, 10.0, 4.0, 2.0, 1.0)'
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """SQLite FTS5 index keyed by article id (the FTS rowid)."""
+
+    def create_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+                "title, slug, author, content, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+
+    def index_rows(self, rows):
+        if not rows:
+            return
+
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(row['id'],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, title, slug, author, content) VALUES (%s, %s, %s, %s, %s)',
+                [
+                    (row['id'], row['title'], row['slug'], row['author__username'] or '', row['content'])
+                    for row in rows
+                ],
+            )
+
+    def remove(self, pks):
+        if not pks:
+            return
+
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    def match_expression(self, query):
+        # every term must match, as a prefix, in any column
+        terms = search_terms(query)
+        return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+    def count(self, query):
+        match = self.match_expression(query)
+        if not match:
+            return 0
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {TABLE} WHERE {TABLE} MATCH %s', [match])
+            return cursor.fetchone()[0]
+
+    def ranked(self, query, offset, limit):
+        match = self.match_expression(query)
+        if not match:
+            return []
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, snippet({TABLE}, 3, %s, %s, %s, 24) FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s ORDER BY {RANK}, rowid DESC LIMIT %s OFFSET %s',
+                [HIGHLIGHT_START, HIGHLIGHT_STOP, '…', match, limit, offset],
+            )
+            return cursor.fetchall()
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from config.cache import CHROME_NAMESPACE, get_versioned
+from .models import ArchiveMonth, Article, Category, Comment, Tag
+from .pagination import KeysetPaginator
+
+CARD_DEFERRED_FIELDS = (
+    'content', 'meta_description', 'meta_keywords', 'og_description', 'twitter_description',
+    'body_html', 'excerpt', 'json_ld',
+)
+
+def article_cards(queryset=None):
+    if queryset is None:
+        queryset = Article.alive_objects.all()
+
+    return (
+        queryset
+        .select_related('author')
+        .defer(*CARD_DEFERRED_FIELDS)
+        .prefetch_related(
+            Prefetch('categories', queryset=Category.alive_objects.only('id', 'name', 'slug')),
+            Prefetch('tags', queryset=Tag.alive_objects.only('id', 'name', 'slug')),
+        )
+    )
+
+def _archive_months():
+    return [
+        {'month': row.first_day, 'total': row.count}
+        for row in ArchiveMonth.objects.filter(count__gt=0)
+    ]
+
+def archive_months():
+    return get_versioned(CHROME_NAMESPACE, 'archive_menu', _archive_months)
+
+def article_comments(article_pk):
+    # user and avatar come in the same query; the article is never loaded
+    return (
+        Comment.alive_objects.filter(article_id=article_pk, is_approved=True)
+        .select_related('user__profile')
+        .only('id', 'text', 'created_at', 'article_id', 'user__username', 'user__profile__avatar')
+    )
+
+def comment_paginator(article_pk):
+    return KeysetPaginator(article_comments(article_pk), settings.COMMENTS_PER_PAGE, date_field='created_at')
+
+def comment_page(article_pk, cursor=None):
+    return comment_paginator(article_pk).get_page(cursor)
@@ -1,25 +1,257 @@
-from django.shortcuts import get_object_or_404
-from django.core.files.storage import default_storage
-from django.db.models.signals import pre_save, post_delete
+from functools import partial
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed, post_migrate
+from django.db import router, transaction
 from django.dispatch import receiver
-from .models import Article
+from config.cache import CHROME_NAMESPACE, bump_version
+from config.signals import bulk_soft_deleted, bulk_restored, bulk_published, derivatives_generated
+from config.models.mixins import NOT_LOADED
+from services.file_cleanup import delete_file_on_commit
+from services.image_derivatives import FIELD_VARIANTS, generate_derivatives_on_commit
+from .models import Article, Category, Tag, Comment, RelatedArticle
+from . import counters, related
+from .sitemaps import bump_sitemap
+from .feeds import bump_feeds
+from .page_cache import bump_article, bump_taxonomy
+from .search import get_search_backend
 
-def delete_file(file=None):
-    if not file:
-        return
-    
-    if default_storage.exists(file.name):
-        default_storage.delete(file.name)
+@receiver(post_save, sender=Article)
+def delete_old_image_on_change(sender, instance, created, using, **kwargs):
+    # queued once the UPDATE has run (in autocommit on_commit fires at once);
+    # the snapshot still holds the old name until save() returns
+    if not created and instance.has_field_changed('featured_image'):
+        delete_file_on_commit(instance.get_original_value('featured_image'), instance.featured_image.storage, using)
+
+@receiver(post_delete, sender=Article)
+def delete_image_on_delete(sender, instance, using, **kwargs):
+    delete_file_on_commit(getattr(instance, 'featured_image', None), using=using)
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+def generate_image_derivatives(sender, instance, using, **kwargs):
+    for name in instance.tracked_fields:
+        if name in FIELD_VARIANTS and instance.has_field_changed(name):
+            generate_derivatives_on_commit(getattr(instance, name), using)
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(bulk_soft_deleted, sender=Article)
+@receiver(bulk_restored, sender=Article)
+@receiver(bulk_soft_deleted, sender=Category)
+@receiver(bulk_restored, sender=Category)
+@receiver(bulk_published, sender=Article)
+def invalidate_chrome_cache(sender, **kwargs):
+    bump_version(CHROME_NAMESPACE)
+
+@receiver(post_migrate)
+def create_search_index(sender, using, **kwargs):
+    # the FTS side table lives outside the model migrations; it is created
+    # with the schema so queries never have to check for it
+    if sender.name == 'blog' and router.allow_migrate_model(using, Article):
+        get_search_backend(using).create_index()
+
+@receiver(post_save, sender=Article)
+def update_search_index(sender, instance, using, **kwargs):
+    backend = get_search_backend(using)
+    transaction.on_commit(partial(backend.update_articles, [instance.pk]), using=using)
+
+@receiver(post_delete, sender=Article)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    backend = get_search_backend(using)
+    transaction.on_commit(partial(backend.remove, [instance.pk]), using=using)
 
-@receiver(pre_save, sender=Article)
-def delete_old_image_on_change(sender, instance, **kwargs):
-    if not instance.pk:
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_article_page(sender, instance, **kwargs):
+    bump_article(instance.pk)
+
+@receiver(post_save, sender=Article)
+def invalidate_listing_article_pages(sender, instance, using, **kwargs):
+    # other articles' related lists show this one's title, slug and date
+    if any(instance.has_field_changed(name) for name in ('title', 'slug', 'published_at')):
+        bump_article(*RelatedArticle.objects.using(using).filter(related=instance).values_list('article_id', flat=True))
+
+@receiver(derivatives_generated, sender=Article)
+def invalidate_article_page_on_derivatives(sender, pk, **kwargs):
+    # the page was cached with the original image while the variants were missing
+    bump_article(pk)
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_article_page_on_comment(sender, instance, **kwargs):
+    bump_article(instance.article_id)
+
+@receiver(m2m_changed, sender=Article.categories.through)
+@receiver(m2m_changed, sender=Article.tags.through)
+def invalidate_article_page_on_taxonomy(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
         return
-    
-    old_obj = get_object_or_404(Article, pk=instance.pk)
-    if old_obj.featured_image and old_obj.featured_image != instance.featured_image:
-        delete_file(old_obj.featured_image)
+    if not reverse:
+        bump_article(instance.pk)
+    elif pk_set:
+        bump_article(*pk_set)
+    else:
+        bump_taxonomy()
 
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(bulk_soft_deleted, sender=Category)
+@receiver(bulk_restored, sender=Category)
+@receiver(bulk_soft_deleted, sender=Tag)
+@receiver(bulk_restored, sender=Tag)
+def invalidate_taxonomy_pages(sender, **kwargs):
+    bump_taxonomy()
+
+@receiver(bulk_soft_deleted, sender=Article)
+@receiver(bulk_restored, sender=Article)
+@receiver(bulk_published, sender=Article)
+def articles_bulk_changed(sender, pks, using, **kwargs):
+    bump_article(*pks)
+    backend = get_search_backend(using)
+    transaction.on_commit(partial(backend.update_articles, pks), using=using)
+
+@receiver(post_save, sender=Article)
 @receiver(post_delete, sender=Article)
-def delete_image_on_delete(sender, instance, **kwargs):
-    delete_file(getattr(instance,'featured_image', None))
\ No newline at end of file
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_syndication(sender, instance, **kwargs):
+    # only the sitemap shard holding this row is rebuilt
+    bump_sitemap(sender, instance.pk)
+    bump_feeds()
+
+@receiver(bulk_soft_deleted, sender=Article)
+@receiver(bulk_restored, sender=Article)
+@receiver(bulk_soft_deleted, sender=Category)
+@receiver(bulk_restored, sender=Category)
+@receiver(bulk_soft_deleted, sender=Tag)
+@receiver(bulk_restored, sender=Tag)
+@receiver(bulk_published, sender=Article)
+def invalidate_syndication_in_bulk(sender, pks, **kwargs):
+    bump_sitemap(sender, *pks)
+    bump_feeds()
+
+@receiver(m2m_changed, sender=Article.categories.through)
+@receiver(m2m_changed, sender=Article.tags.through)
+def invalidate_feeds_on_taxonomy(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump_feeds()
+
+@receiver(bulk_soft_deleted, sender=Comment)
+@receiver(bulk_restored, sender=Comment)
+def comments_bulk_changed(sender, pks, using, **kwargs):
+    bump_article(*Comment.objects.using(using).filter(pk__in=pks).order_by().values_list('article_id', flat=True).distinct())
+
+# Denormalized counters
+def _original(instance, name):
+    # a field that was deferred when the row was loaded cannot have changed
+    value = instance.get_original_value(name)
+    return getattr(instance, instance._meta.get_field(name).attname) if value is NOT_LOADED else value
+
+@receiver(post_save, sender=Comment)
+def update_comment_count(sender, instance, created, using, **kwargs):
+    deltas = {}
+    if not created and counters.comment_is_counted(_original(instance, 'is_approved'), _original(instance, 'is_deleted')):
+        deltas[_original(instance, 'article')] = -1
+    if counters.comment_is_counted(instance.is_approved, instance.is_deleted):
+        deltas[instance.article_id] = deltas.get(instance.article_id, 0) + 1
+    counters.adjust(Article, 'comment_count', deltas, using)
+
+@receiver(post_delete, sender=Comment)
+def discount_deleted_comment(sender, instance, using, **kwargs):
+    if counters.comment_is_counted(instance.is_approved, instance.is_deleted):
+        counters.adjust(Article, 'comment_count', {instance.article_id: -1}, using)
+
+@receiver(bulk_soft_deleted, sender=Comment)
+def discount_bulk_deleted_comments(sender, pks, using, **kwargs):
+    counters.adjust_comment_counts(pks, -1, using)
+
+@receiver(bulk_restored, sender=Comment)
+def count_bulk_restored_comments(sender, pks, using, **kwargs):
+    counters.adjust_comment_counts(pks, 1, using)
+
+@receiver(post_save, sender=Article)
+def update_taxonomy_counts(sender, instance, created, using, **kwargs):
+    if created or not (instance.has_field_changed('status') or instance.has_field_changed('is_deleted')):
+        return
+
+    was_counted = counters.article_is_counted(_original(instance, 'status'), _original(instance, 'is_deleted'))
+    is_counted = counters.article_is_counted(instance.status, instance.is_deleted)
+    if was_counted != is_counted:
+        counters.adjust_article_taxonomies(instance.pk, 1 if is_counted else -1, using)
+
+@receiver(post_save, sender=Article)
+def update_archive_months(sender, instance, created, using, **kwargs):
+    old = None if created else counters.archive_key(
+        _original(instance, 'status'), _original(instance, 'is_deleted'), _original(instance, 'published_at')
+    )
+    new = counters.archive_key(instance.status, instance.is_deleted, instance.published_at)
+    if old != new:
+        counters.adjust_archive({old: -1, new: 1}, using)
+
+@receiver(pre_delete, sender=Article)
+def discount_deleted_article(sender, instance, using, **kwargs):
+    if counters.article_is_counted(instance.status, instance.is_deleted):
+        counters.adjust_article_taxonomies(instance.pk, -1, using)
+    counters.adjust_archive({counters.archive_key(instance.status, instance.is_deleted, instance.published_at): -1}, using)
+
+@receiver(bulk_soft_deleted, sender=Article)
+def discount_bulk_deleted_articles(sender, pks, using, **kwargs):
+    counters.adjust_taxonomy_counts(pks, -1, using)
+    counters.adjust_archive_for_articles(pks, -1, using)
+
+@receiver(bulk_restored, sender=Article)
+def count_bulk_restored_articles(sender, pks, using, **kwargs):
+    counters.adjust_taxonomy_counts(pks, 1, using)
+    counters.adjust_archive_for_articles(pks, 1, using)
+
+@receiver(bulk_published, sender=Article)
+def count_bulk_published_articles(sender, pks, using, **kwargs):
+    # the action discounted their archive months before the UPDATE
+    counters.adjust_taxonomy_counts(pks, 1, using)
+
+@receiver(m2m_changed, sender=Article.categories.through)
+def update_category_counts(sender, instance, action, reverse, pk_set, using, **kwargs):
+    counters.taxonomy_membership_changed(Category, instance, action, reverse, pk_set, using)
+    # the sidebar shows category counts from the chrome cache
+    if action.startswith('post_'):
+        bump_version(CHROME_NAMESPACE)
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def update_tag_counts(sender, instance, action, reverse, pk_set, using, **kwargs):
+    counters.taxonomy_membership_changed(Tag, instance, action, reverse, pk_set, using)
+
+# Related articles
+@receiver(m2m_changed, sender=Article.categories.through)
+@receiver(m2m_changed, sender=Article.tags.through)
+def refresh_related_on_taxonomy(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            related.refresh_on_commit([instance.pk], using)
+    elif action == 'pre_clear':
+        column = f'{instance._meta.model_name}_id'
+        related.refresh_on_commit(sender.objects.using(using).filter(**{column: instance.pk}).values_list('article_id', flat=True), using)
+    elif action in ('post_add', 'post_remove'):
+        related.refresh_on_commit(pk_set, using)
+
+@receiver(post_save, sender=Article)
+def refresh_related_on_publish(sender, instance, created, using, **kwargs):
+    if any(instance.has_field_changed(name) for name in ('status', 'is_deleted', 'published_at')):
+        related.refresh_on_commit([instance.pk], using)
+
+@receiver(pre_delete, sender=Article)
+def refresh_related_on_delete(sender, instance, using, **kwargs):
+    # the cascade drops the links; the articles that listed this one need a new neighbour
+    listing = RelatedArticle.objects.using(using).filter(related=instance).values_list('article_id', flat=True)
+    related.refresh_on_commit(listing, using)
+
+@receiver(bulk_soft_deleted, sender=Article)
+@receiver(bulk_restored, sender=Article)
+@receiver(bulk_published, sender=Article)
+def refresh_related_in_bulk(sender, pks, using, **kwargs):
+    related.refresh_on_commit(pks, using)
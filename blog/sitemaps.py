@@ -0,0 +1,129 @@
+import gzip
+from xml.sax.saxutils import escape
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from config.cache import get_version, bump_version
+from config.metrics import record_cache
+from config.replicas import use_primary
+from .models import Article, Category, Tag
+
+# the sitemap protocol allows 50k URLs per file; shards are pk ranges of
+# that size, so an edited row only ever invalidates its own shard
+SHARD_SIZE = 50_000
+CHUNK_SIZE = 2000
+SLUG_PLACEHOLDER = 'sitemap-slug-placeholder'
+SHARD_KEY = 'sitemap:{}:{}:{}:{}'
+CONTENT_TYPE = 'application/xml; charset=utf-8'
+
+URLSET_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_FOOTER = '</urlset>\n'
+
+
+class SitemapSection:
+    def __init__(self, name, model, url_name, changefreq, priority):
+        self.name = name
+        self.model = model
+        self.url_name = url_name
+        self.changefreq = changefreq
+        self.priority = priority
+
+    def get_queryset(self):
+        if self.model is Article:
+            return Article.alive_objects.filter(status=Article.Status.PUBLISHED, published_at__isnull=False)
+        return self.model.alive_objects.filter(is_active=True)
+
+    def shard_count(self):
+        last_pk = self.get_queryset().aggregate(last_pk=Max('pk'))['last_pk']
+        return 0 if last_pk is None else last_pk // SHARD_SIZE + 1
+
+    def iter_urls(self, shard, location):
+        rows = (
+            self.get_queryset()
+            .filter(pk__gte=shard * SHARD_SIZE, pk__lt=(shard + 1) * SHARD_SIZE)
+            .order_by('pk').values_list('slug', 'updated_at')
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+        for slug, updated_at in rows:
+            yield (
+                f'<url><loc>{escape(location.replace(SLUG_PLACEHOLDER, slug))}</loc>'
+                f'<lastmod>{updated_at.date().isoformat()}</lastmod>'
+                f'<changefreq>{self.changefreq}</changefreq><priority>{self.priority}</priority></url>\n'
+            )
+
+
+SECTIONS = {
+    section.name: section for section in (
+        SitemapSection('articles', Article, 'blog:article_detail', 'weekly', '0.8'),
+        SitemapSection('categories', Category, 'blog:category', 'daily', '0.5'),
+        SitemapSection('tags', Tag, 'blog:tag', 'daily', '0.4'),
+    )
+}
+MODEL_SECTIONS = {section.model: section.name for section in SECTIONS.values()}
+
+
+def shard_namespace(section, shard):
+    return f'sitemap:{section}:{shard}'
+
+def bump_sitemap(model, *pks):
+    section = MODEL_SECTIONS[model]
+    for shard in {pk // SHARD_SIZE for pk in pks}:
+        bump_version(shard_namespace(section, shard))
+
+
+def render_shard(section, shard, location):
+    yield URLSET_HEADER
+    buffer = []
+    # the shard is cached under its current version, so it is read from the primary
+    with use_primary():
+        for url in section.iter_urls(shard, location):
+            buffer.append(url)
+            if len(buffer) == CHUNK_SIZE:
+                yield ''.join(buffer)
+                buffer = []
+    yield ''.join(buffer) + URLSET_FOOTER
+
+def stream_and_cache(chunks, key):
+    # stream to the client as rows arrive and keep a gzipped copy for the
+    # next crawler; 50k URLs compress to a few hundred KB
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, gzip.compress(''.join(parts).encode()), settings.SITEMAP_CACHE_TIMEOUT)
+
+def cached_response(request, content):
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(content, content_type=CONTENT_TYPE)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(content), content_type=CONTENT_TYPE)
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def index(request):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+    for name, section in SECTIONS.items():
+        for shard in range(section.shard_count()):
+            location = request.build_absolute_uri(reverse('blog:sitemap_shard', args=[name, shard]))
+            lines.append(f'<sitemap><loc>{escape(location)}</loc></sitemap>\n')
+    lines.append('</sitemapindex>\n')
+    return HttpResponse(''.join(lines), content_type=CONTENT_TYPE)
+
+def shard(request, section, shard):
+    section = SECTIONS.get(section)
+    if section is None:
+        raise Http404('No such sitemap section.')
+
+    location = request.build_absolute_uri(reverse(section.url_name, args=[SLUG_PLACEHOLDER]))
+    key = SHARD_KEY.format(section.name, shard, get_version(shard_namespace(section.name, shard)), request.get_host())
+    content = cache.get(key)
+    record_cache(content is not None)
+    if content is not None:
+        return cached_response(request, content)
+
+    return StreamingHttpResponse(stream_and_cache(render_shard(section, shard, location), key), content_type=CONTENT_TYPE)
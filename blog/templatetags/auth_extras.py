@@ -1,9 +1,9 @@
 from django import template
+from config.permissions import has_any_group as user_has_any_group
 
 register = template.Library()
 
 
 @register.filter
 def has_any_group(user, group_names):
-    groups = [g.strip() for g in group_names.split(",")]
-    return user.groups.filter(name__in=groups).exists()
+    return user_has_any_group(user, group_names)
@@ -0,0 +1,48 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from services.image_derivatives import VARIANTS, derivative_name, derivatives_ready
+
+register = template.Library()
+
+def _url(file, variant, ext):
+    return file.storage.url(derivative_name(file.name, variant, ext))
+
+@register.simple_tag
+def variant_url(file, variant, ext='jpg'):
+    if not file:
+        return ''
+    if not derivatives_ready(file):
+        return file.url
+    return _url(file, variant, ext)
+
+@register.simple_tag
+def srcset(file, *variants, ext='webp'):
+    if not file or not derivatives_ready(file):
+        return ''
+    return ', '.join(f'{_url(file, variant, ext)} {VARIANTS[variant][0]}w' for variant in variants)
+
+@register.simple_tag
+def responsive_image(file, *variants, sizes='100vw', alt='', **attrs):
+    """
+    {% responsive_image article.featured_image 'card' 'card-2x' sizes='33vw' alt=article.title class='...' %}
+    renders a <picture> with a WebP source and a JPEG fallback, or the
+    original upload until its variants have been generated.
+    """
+    if not file:
+        return ''
+
+    extra = format_html_join('', ' {}="{}"', ((name.replace('_', '-'), value) for name, value in attrs.items()))
+    if not variants or not derivatives_ready(file):
+        return format_html('<img src="{}" alt="{}" loading="lazy"{}>', file.url, alt, extra)
+
+    width, height, crop = VARIANTS[variants[0]]
+    if crop:
+        # cropped variants have a known box, so the browser can reserve it
+        extra = format_html(' width="{}" height="{}"{}', width, height, extra)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="lazy" decoding="async"{}></picture>',
+        srcset(file, *variants, ext='webp'), sizes,
+        _url(file, variants[0], 'jpg'), srcset(file, *variants, ext='jpg'), sizes,
+        alt, extra,
+    )
@@ -1,3 +1,1349 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import Article, Category, Comment, Tag
+from . import views
+from .pagination import KeysetPaginator
+from .view_counter import ViewCounter, view_counter
 
-# Create your tests here.
+
+class QueryBudgetMixin:
+    def assertQueryBudget(self, url, budget, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        queries = len(ctx.captured_queries)
+        self.assertLessEqual(
+            queries, budget,
+            f'{url} ran {queries} queries, budget is {budget}:\n' +
+            '\n'.join(q['sql'] for q in ctx.captured_queries)
+        )
+        return queries
+
+
+class ArticleCardQueryBudgetTests(QueryBudgetMixin, TestCase):
+    # paginator count + page + categories + tags + navbar + archive menu + company
+    LIST_BUDGET = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.editor = User.objects.create_user('editor', 'editor@example.com', 'password')
+        cls.editor.groups.add(Group.objects.create(name='Editor'))
+        cls.category = Category.objects.create(name='Python', slug='python', description='Python')
+        cls.tag = Tag.objects.create(name='Django', slug='django', description='Django')
+        published_at = datetime(2024, 5, 10, tzinfo=dt_timezone.utc)
+
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.create_articles(published_at)
+
+    @classmethod
+    def create_articles(cls, published_at):
+        for i in range(25):
+            article = Article.objects.create(
+                title=f'Article number {i}',
+                slug=f'article-number-{i}',
+                content='Lorem ipsum dolor sit amet. ' * 20,
+                status=Article.Status.ARCHIVE if i % 2 else Article.Status.PUBLISHED,
+                author=cls.author,
+                published_at=published_at,
+            )
+            article.categories.add(cls.category)
+            article.tags.add(cls.tag)
+
+    def setUp(self):
+        cache.clear()
+
+    def listing_urls(self):
+        return [
+            (views.ArticleListView, reverse('blog:home'), None, self.LIST_BUDGET),
+            (views.CategoryDetailView, reverse('blog:category', args=[self.category.slug]), None, self.LIST_BUDGET + 1),
+            (views.TagDetailView, reverse('blog:tag', args=[self.tag.slug]), None, self.LIST_BUDGET + 1),
+            # full-text count + ranked ids instead of a single paginator count
+            (views.SearchView, reverse('blog:search'), {'q': 'Article'}, self.LIST_BUDGET + 1),
+            # month checks and next/previous months come from the cached archive rollup
+            (views.ArticleMonthArchiveView, reverse('blog:archive', args=[2024, 5]), None, self.LIST_BUDGET),
+        ]
+
+    def test_listing_pages_stay_within_budget(self):
+        for view_class, url, data, budget in self.listing_urls():
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, budget, data)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for view_class, url, data, budget in self.listing_urls():
+            with self.subTest(url=url):
+                self.client.get(url, data)
+                small = self.assertQueryBudget(url, budget, data)
+                original = view_class.paginate_by
+                view_class.paginate_by = 20
+                try:
+                    large = self.assertQueryBudget(url, budget, data)
+                finally:
+                    view_class.paginate_by = original
+                self.assertEqual(small, large)
+
+    def test_group_and_permission_checks_are_resolved_once(self):
+        self.client.force_login(self.editor)
+        url = reverse('blog:home')
+        # session + user + groups + user permissions + group permissions
+        budget = self.LIST_BUDGET + 5
+        self.client.get(url)
+        small = self.assertQueryBudget(url, budget)
+        original = views.ArticleListView.paginate_by
+        views.ArticleListView.paginate_by = 20
+        try:
+            large = self.assertQueryBudget(url, budget)
+        finally:
+            views.ArticleListView.paginate_by = original
+        self.assertEqual(small, large)
+
+    def test_chrome_context_is_cached_between_requests(self):
+        url = reverse('blog:home')
+        self.assertQueryBudget(url, self.LIST_BUDGET)
+        # navbar categories, archive menu and company come from the cache now
+        self.assertQueryBudget(url, self.LIST_BUDGET - 3)
+
+        Category.objects.create(name='Rust', slug='rust', description='Rust')
+        response = self.client.get(url)
+        self.assertContains(response, 'Rust')
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author', 'author@example.com', 'password')
+        same_time = datetime(2024, 5, 10, tzinfo=dt_timezone.utc)
+        for i in range(12):
+            Article.objects.create(
+                title=f'Article number {i}',
+                slug=f'article-number-{i}',
+                content='Lorem ipsum',
+                author=author,
+                # ties on published_at and drafts without one must still page cleanly
+                published_at=None if i < 3 else same_time if i < 7 else datetime(2024, 1, i, tzinfo=dt_timezone.utc),
+            )
+
+    def expected_order(self):
+        articles = list(Article.objects.all())
+        dated = sorted((a for a in articles if a.published_at), key=lambda a: (a.published_at, a.pk), reverse=True)
+        undated = sorted((a for a in articles if not a.published_at), key=lambda a: a.pk, reverse=True)
+        return [a.pk for a in dated + undated]
+
+    def test_walks_forward_and_back_without_gaps(self):
+        paginator = KeysetPaginator(Article.objects.all(), 5)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+
+        self.assertEqual([a.pk for page in pages for a in page], self.expected_order())
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([a.pk for a in back], [a.pk for a in pages[-2]])
+        self.assertTrue(back.has_next())
+
+    def test_each_page_is_one_query(self):
+        paginator = KeysetPaginator(Article.objects.all(), 5)
+        page = paginator.get_page()
+        with self.assertNumQueries(1):
+            paginator.get_page(page.next_cursor)
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Article.objects.all(), 5)
+        first = [a.pk for a in paginator.get_page()]
+        self.assertEqual([a.pk for a in paginator.get_page('not-a-cursor')], first)
+
+
+class SearchBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+
+    def create(self, slug, title, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Article.objects.create(
+                title=title, slug=slug, content=content, author=self.author,
+                status=Article.Status.PUBLISHED, published_at=timezone.now(),
+            )
+
+    def search(self, query):
+        from .search import get_search_backend
+        return list(get_search_backend().search(query))
+
+    def test_title_matches_rank_first_with_highlighted_snippets(self):
+        self.create('in-the-body', 'Notes from the field', 'We finally saw a zephyr over the hills today.')
+        self.create('in-the-title', 'Zephyr sightings', 'Notes on a quiet afternoon.')
+        self.create('elsewhere', 'Unrelated article', 'Nothing to see here.')
+
+        results = self.search('zephyr')
+        self.assertEqual([article.slug for article in results], ['in-the-title', 'in-the-body'])
+        self.assertIn('<mark>zephyr</mark>', results[1].search_snippet)
+
+    def test_index_follows_save_soft_delete_and_restore(self):
+        article = self.create('moving-target', 'Moving target', 'Lorem ipsum.')
+        self.assertEqual(self.search('quokka'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.content = 'A quokka appears.'
+            article.save()
+        self.assertEqual([a.slug for a in self.search('quokka')], ['moving-target'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.delete()
+        self.assertEqual(self.search('quokka'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.restore()
+        self.assertEqual([a.slug for a in self.search('quokka')], ['moving-target'])
+
+
+class ArticlePageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.article = Article.objects.create(
+            title='Cached article',
+            slug='cached-article',
+            content='Lorem ipsum',
+            status=Article.Status.PUBLISHED,
+            author=cls.author,
+            published_at=datetime(2024, 5, 10, tzinfo=dt_timezone.utc),
+        )
+        cls.url = reverse('blog:article_detail', args=[cls.article.slug])
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        # write buffered hits inside the test transaction rather than at interpreter exit
+        view_counter.flush()
+
+    def warm(self):
+        self.client.get(self.url)
+        return self.client.get(self.url)
+
+    def test_anonymous_hits_skip_the_database(self):
+        response = self.warm()
+        self.assertTrue(response.has_header('ETag'))
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.content, response.content)
+
+    def test_matching_etag_answers_not_modified(self):
+        etag = self.warm()['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_comment_retires_the_cached_page(self):
+        etag = self.warm()['ETag']
+        Comment.objects.create(article=self.article, user=self.author, text='First!', is_approved=True)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'First!')
+
+    def test_logged_in_readers_are_not_cached(self):
+        self.warm()
+        self.client.force_login(self.author)
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_cached_pages_carry_no_csrf_token(self):
+        response = self.warm()
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+        self.assertContains(response, 'to leave a comment')
+
+    def test_pages_that_render_a_csrf_token_are_not_cached(self):
+        from unittest import mock
+        from django.middleware.csrf import get_token
+
+        render = views.ArticleDetailView.get_context_data
+
+        def with_token(view, **kwargs):
+            get_token(view.request)
+            return render(view, **kwargs)
+
+        with mock.patch.object(views.ArticleDetailView, 'get_context_data', with_token):
+            response = self.warm()
+        self.assertFalse(response.has_header('ETag'))
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_generated_derivatives_retire_the_cached_page(self):
+        from config.signals import derivatives_generated
+
+        etag = self.warm()['ETag']
+        derivatives_generated.send(sender=Article, pk=self.article.pk, name='articles/cover.jpg')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_renaming_a_related_article_retires_the_pages_listing_it(self):
+        from .models import RelatedArticle
+
+        other = Article.objects.create(
+            title='Neighbour article', slug='neighbour-article', content='Lorem ipsum', author=self.author,
+            status=Article.Status.PUBLISHED, published_at=datetime(2024, 5, 9, tzinfo=dt_timezone.utc),
+        )
+        RelatedArticle.objects.create(article=self.article, related=other, rank=0, score=1.0)
+        etag = self.warm()['ETag']
+
+        other.title = 'Renamed neighbour'
+        other.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Renamed neighbour')
+
+
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.articles = [
+            Article.objects.create(title=f'Counted article {i}', slug=f'counted-article-{i}', content='Lorem ipsum.', author=author)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.counter = ViewCounter(dedupe_window=60, batch_size=2)
+
+    def visit(self, article, agent='reader'):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_USER_AGENT=agent)
+        self.counter.record(request, article.pk)
+
+    def test_repeat_visits_within_the_window_count_once(self):
+        first, second = self.articles[:2]
+        self.visit(first)
+        self.visit(first)
+        self.visit(first, agent='another reader')
+        self.visit(second)
+        self.assertEqual(self.counter.pending(), {first.pk: 2, second.pk: 1})
+
+    def test_flush_writes_one_update_per_batch(self):
+        for i, article in enumerate(self.articles):
+            for visitor in range(i + 1):
+                self.visit(article, agent=f'reader {visitor}')
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.counter.flush(), 3)
+        self.assertEqual(self.counter.pending(), {})
+        self.assertEqual(
+            list(Article.objects.order_by('pk').values_list('views', flat=True)), [1, 2, 3]
+        )
+        with self.assertNumQueries(0):
+            self.counter.flush()
+
+    def test_no_background_flusher_while_testing(self):
+        self.visit(self.articles[0])
+        self.assertIsNone(self.counter._flusher)
+
+
+class FeaturedImageCleanupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.article = Article.objects.create(
+            title='Article with image', slug='article-with-image', content='Lorem ipsum dolor sit amet.',
+            author=author, featured_image='articles/old.jpg',
+        )
+
+    def save_and_capture(self, **changes):
+        article = Article.objects.get(pk=self.article.pk)
+        for name, value in changes.items():
+            setattr(article, name, value)
+
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as ctx:
+            article.save()
+        return article, callbacks, ctx.captured_queries
+
+    def test_replacing_image_reads_no_row_and_waits_for_commit(self):
+        untouched, baseline, queries = self.save_and_capture(title='Renamed')
+        article, callbacks, queries = self.save_and_capture(featured_image='articles/new.jpg')
+
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT')])
+        # delete the old file, render variants of the new one
+        self.assertEqual(len(callbacks), len(baseline) + 2)
+        self.assertFalse(article.has_field_changed('featured_image'))
+
+    def test_failed_update_keeps_the_old_image(self):
+        from django.db import IntegrityError
+
+        article = Article.objects.get(pk=self.article.pk)
+        article.featured_image = 'articles/new.jpg'
+        article.views = -1
+        with self.captureOnCommitCallbacks() as callbacks, self.assertRaises(IntegrityError):
+            article.save()
+        self.assertEqual(callbacks, [])
+
+
+class ImageDerivativeTests(TestCase):
+    def test_variants_are_rendered_in_both_formats(self):
+        from io import BytesIO
+        from PIL import Image
+        from services.image_derivatives import VARIANTS, render_variants
+
+        buffer = BytesIO()
+        Image.new('RGBA', (2000, 1500), (200, 30, 30, 128)).save(buffer, 'PNG')
+        rendered = render_variants(buffer.getvalue(), ('card', 'logo'))
+
+        self.assertEqual(set(rendered), {('card', 'webp'), ('card', 'jpg'), ('logo', 'webp'), ('logo', 'jpg')})
+        with Image.open(BytesIO(rendered['card', 'jpg'])) as card:
+            self.assertEqual((card.format, card.size), ('JPEG', VARIANTS['card'][:2]))
+        with Image.open(BytesIO(rendered['logo', 'webp'])) as logo:
+            self.assertEqual((logo.format, logo.size), ('WEBP', (107, 80)))
+
+    def test_tag_falls_back_to_the_original_until_variants_exist(self):
+        from django.template import Context, Template
+
+        cache.clear()
+        article = Article(featured_image='article/missing.jpg')
+        html = Template(
+            "{% load image_tags %}{% responsive_image article.featured_image 'card' 'card-2x' alt='x' %}"
+        ).render(Context({'article': article}))
+
+        self.assertIn('src="/media/article/missing.jpg"', html)
+        self.assertNotIn('srcset', html)
+
+
+@override_settings(IMAGE_VERIFY_MODE='inline', IMAGE_MAX_PIXELS=1_000_000)
+class ImageValidationTests(TestCase):
+    def upload(self, data, name='upload.png'):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return SimpleUploadedFile(name, data)
+
+    def test_oversized_dimensions_are_rejected_from_the_header(self):
+        from django.core.exceptions import ValidationError
+        from services.sample_images import png_bomb
+        from services.image_validator import image_validation
+
+        with self.assertRaisesMessage(ValidationError, '4000x4000 pixels'):
+            image_validation(self.upload(png_bomb(4000, 4000)))
+
+    def test_truncated_image_fails_full_verification(self):
+        from django.core.exceptions import ValidationError
+        from services.sample_images import encode
+        from PIL import Image
+        from services.image_validator import image_validation
+
+        data = encode(Image.effect_noise((600, 400), 60).convert('RGB'), 'JPEG')
+        image_validation(self.upload(data, 'ok.jpg'))
+        with self.assertRaisesMessage(ValidationError, 'Invalid or corrupted'):
+            image_validation(self.upload(data[:len(data) // 2], 'broken.jpg'))
+
+
+class BulkAdminActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        Article.objects.bulk_create(
+            Article(title=f'Bulk {i}', slug=f'bulk-{i}', content='Lorem ipsum dolor sit amet.', author=cls.admin_user)
+            for i in range(25)
+        )
+
+    def setUp(self):
+        from django.contrib import admin
+        from django.contrib.messages.storage.fallback import FallbackStorage
+        from django.test import RequestFactory
+
+        self.model_admin = admin.site._registry[Article]
+        self.model_admin.bulk_chunk_size = 10
+        self.request = RequestFactory().post('/admin/blog/article/')
+        self.request.user = self.admin_user
+        self.request.session = {}
+        self.request._messages = FallbackStorage(self.request)
+
+    def tearDown(self):
+        del self.model_admin.bulk_chunk_size
+
+    def test_soft_delete_and_restore_run_per_chunk(self):
+        from django.contrib.admin.models import LogEntry
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.model_admin.delete_queryset(self.request, Article.objects.all())
+        self.assertEqual(Article.alive_objects.count(), 0)
+        self.assertEqual(LogEntry.objects.count(), 25)
+        # the statement count grows with the number of chunks, not rows
+        self.assertLess(len(ctx.captured_queries), 30)
+        self.assertTrue(all(a.deleted_by_id == self.admin_user.pk for a in Article.objects.all()))
+
+        self.model_admin.restore_selected(self.request, Article.objects.all())
+        self.assertEqual(Article.alive_objects.count(), 25)
+        self.assertEqual(LogEntry.objects.count(), 50)
+
+    def test_hard_delete_removes_rows(self):
+        self.model_admin.hard_delete(self.request, Article.objects.filter(slug__startswith='bulk-1'))
+        self.assertEqual(Article.objects.count(), 14)
+
+    def test_publish_action_retires_sitemaps_and_feeds(self):
+        cache.clear()
+        shard = reverse('blog:sitemap_shard', args=['articles', 0])
+        self.assertNotIn(b'bulk-3', b''.join(self.client.get(shard).streaming_content))
+        self.assertNotIn(b'Bulk 3', self.client.get(reverse('blog:feed_rss')).content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.model_admin.published_articles(self.request, Article.objects.filter(slug__in=['bulk-3', 'bulk-4']))
+        self.assertIn(b'/post/bulk-3/', b''.join(self.client.get(shard).streaming_content))
+        self.assertIn(b'Bulk 3', self.client.get(reverse('blog:feed_rss')).content)
+
+
+class HotQueryIndexTests(TestCase):
+    """
+    EXPLAIN the queries behind the listing, detail, archive, comment and
+    navbar paths and check that each one is answered from the index meant
+    for it rather than a table scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.article = Article.objects.create(title='Indexed article', slug='indexed-article', content='Lorem ipsum.', author=author)
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # tiny test tables would otherwise always be scanned sequentially
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f'{index_name} not used:\n{plan}\n{queryset.query}')
+
+    def assertOrderedByIndex(self, queryset):
+        # the planner may pick any index that yields the rows in order; what
+        # matters is that none of them needs a sort
+        plan = queryset.explain()
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Sort', plan, plan)
+            self.assertIn('Index', plan, plan)
+        else:
+            self.assertNotIn('TEMP B-TREE', plan, plan)
+            self.assertIn('USING', plan, plan)
+
+    def test_hot_queries_use_their_indexes(self):
+        from .pagination import KeysetPaginator
+
+        feed = KeysetPaginator(Article.alive_objects.all(), 10)
+        self.assertUsesIndex(
+            Article.alive_objects.order_by(*feed.forward_ordering())[:11], 'blog_article_alive_feed_idx'
+        )
+        self.assertUsesIndex(
+            # DetailView's get() drops the default ordering
+            Article.alive_objects.filter(status=Article.Status.PUBLISHED, published_at__isnull=False, slug='indexed-article').order_by(),
+            'blog_article_alive_slug_idx',
+        )
+        self.assertUsesIndex(
+            Article.alive_objects.filter(
+                status=Article.Status.ARCHIVE,
+                published_at__gte=datetime(2024, 5, 1, tzinfo=dt_timezone.utc),
+                published_at__lt=datetime(2024, 6, 1, tzinfo=dt_timezone.utc),
+            ).order_by('-published_at'),
+            'blog_article_alive_status_idx',
+        )
+        self.assertUsesIndex(self.article.comments.filter(is_approved=True, is_deleted=False), 'blog_comment_visible_idx')
+        self.assertUsesIndex(Category.alive_objects.filter(slug='python'), 'blog_category_alive_slug_idx')
+        self.assertUsesIndex(Tag.alive_objects.filter(slug='django'), 'blog_tag_alive_slug_idx')
+        self.assertOrderedByIndex(Category.alive_objects.filter(is_active=True).order_by('name'))
+        self.assertOrderedByIndex(Tag.alive_objects.filter(is_active=True).order_by('name'))
+        # auto-created through tables lead their unique and FK indexes with article_id
+        self.assertUsesIndex(
+            Article.categories.through.objects.filter(article_id=self.article.pk), 'blog_article_categories_article_id'
+        )
+        self.assertUsesIndex(Article.tags.through.objects.filter(article_id=self.article.pk), 'blog_article_tags_article_id')
+
+
+class DenormalizedCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.category = Category.objects.create(name='Python', slug='python', description='Python')
+        cls.tag = Tag.objects.create(name='Django', slug='django', description='Django')
+
+    def counts(self, article):
+        self.category.refresh_from_db()
+        self.tag.refresh_from_db()
+        article.refresh_from_db()
+        return article.comment_count, self.category.published_article_count, self.tag.published_article_count
+
+    def test_counters_follow_publication_membership_and_moderation(self):
+        article = Article.objects.create(title='Counted article', slug='counted-article', content='Lorem ipsum.', author=self.author)
+        article.categories.add(self.category)
+        article.tags.add(self.tag)
+        self.assertEqual(self.counts(article), (0, 0, 0))
+
+        article.status = Article.Status.PUBLISHED
+        article.save()
+        self.assertEqual(self.counts(article), (0, 1, 1))
+
+        comment = Comment.objects.create(article=article, user=self.author, text='Nice')
+        self.assertEqual(self.counts(article)[0], 0)
+        comment.is_approved = True
+        comment.save()
+        self.assertEqual(self.counts(article)[0], 1)
+        comment.delete()
+        self.assertEqual(self.counts(article)[0], 0)
+        comment.restore()
+        self.assertEqual(self.counts(article)[0], 1)
+
+        article.categories.remove(self.category)
+        self.category.articles.add(article)
+        self.tag.articles.clear()
+        self.assertEqual(self.counts(article), (1, 1, 0))
+
+        article.delete()
+        self.assertEqual(self.counts(article), (1, 0, 0))
+
+    def test_reconcile_repairs_drift(self):
+        from django.core.management import call_command
+        from io import StringIO
+
+        article = Article.objects.create(
+            title='Drifted article', slug='drifted-article', content='Lorem ipsum.', author=self.author,
+            status=Article.Status.PUBLISHED,
+        )
+        article.categories.add(self.category)
+        Comment.objects.create(article=article, user=self.author, text='Nice', is_approved=True)
+        Article.objects.update(comment_count=7)
+        Category.objects.update(published_article_count=0)
+
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.counts(article), (1, 1, 0))
+
+
+class ArchiveMonthRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+
+    def create(self, slug, published_at, status=Article.Status.ARCHIVE):
+        return Article.objects.create(
+            title=f'Article {slug}', slug=slug, content='Lorem ipsum.', author=self.author,
+            status=status, published_at=published_at,
+        )
+
+    def rollup(self):
+        from .models import ArchiveMonth
+        return {(row.year, row.month): row.count for row in ArchiveMonth.objects.all()}
+
+    def test_rollup_follows_archive_status_dates_and_deletion(self):
+        may = datetime(2024, 5, 10, 12, tzinfo=dt_timezone.utc)
+        june = datetime(2024, 6, 10, 12, tzinfo=dt_timezone.utc)
+        first = self.create('first-archived', may)
+        second = self.create('second-archived', may)
+        self.create('published-one', may, status=Article.Status.PUBLISHED)
+        self.assertEqual(self.rollup(), {(2024, 5): 2})
+
+        second.published_at = june
+        second.save()
+        self.assertEqual(self.rollup(), {(2024, 5): 1, (2024, 6): 1})
+
+        first.delete()
+        self.assertEqual(self.rollup(), {(2024, 6): 1})
+        first.restore()
+        second.status = Article.Status.PUBLISHED
+        second.save()
+        self.assertEqual(self.rollup(), {(2024, 5): 1})
+
+    def test_backfill_and_month_navigation(self):
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import ArchiveMonth
+
+        self.create('march', datetime(2024, 3, 1, 12, tzinfo=dt_timezone.utc))
+        self.create('may', datetime(2024, 5, 1, 12, tzinfo=dt_timezone.utc))
+        ArchiveMonth.objects.all().delete()
+        call_command('backfill_archive_months', stdout=StringIO())
+        self.assertEqual(self.rollup(), {(2024, 3): 1, (2024, 5): 1})
+
+        response = self.client.get(reverse('blog:archive', args=[2024, 5]))
+        self.assertEqual(response.context['previous_month'].month, 3)
+        self.assertIsNone(response.context['next_month'])
+        self.assertEqual(self.client.get(reverse('blog:archive', args=[2024, 4])).status_code, 404)
+
+
+class SyndicationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.category = Category.objects.create(name='Python', slug='python', description='Python')
+        cls.article = Article.objects.create(
+            title='Shipping sitemaps', slug='shipping-sitemaps', content='Lorem ipsum.', author=cls.author,
+            status=Article.Status.PUBLISHED, published_at=datetime(2024, 5, 10, tzinfo=dt_timezone.utc),
+        )
+        cls.article.categories.add(cls.category)
+
+    def setUp(self):
+        cache.clear()
+
+    def shard(self, **headers):
+        response = self.client.get(reverse('blog:sitemap_shard', args=['articles', 0]), **headers)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_index_lists_shards_and_shard_is_cached(self):
+        index = self.client.get(reverse('blog:sitemap')).content.decode()
+        self.assertIn('sitemap-articles-0.xml', index)
+        self.assertIn('sitemap-categories-0.xml', index)
+
+        first = b''.join(self.shard().streaming_content).decode()
+        self.assertIn('/post/shipping-sitemaps/', first)
+        with self.assertNumQueries(0):
+            cached = self.shard()
+        self.assertEqual(cached.content.decode(), first)
+        self.assertEqual(self.shard(HTTP_ACCEPT_ENCODING='gzip')['Content-Encoding'], 'gzip')
+
+    def test_edits_retire_cached_shard_and_feeds(self):
+        b''.join(self.shard().streaming_content)
+        self.assertIn(b'Shipping sitemaps', self.client.get(reverse('blog:feed_rss')).content)
+        self.assertIn(b'Shipping sitemaps', self.client.get(reverse('blog:category_feed_atom', args=['python'])).content)
+
+        self.article.slug = 'streamed-sitemaps'
+        self.article.title = 'Streamed sitemaps'
+        self.article.save()
+        self.assertIn('/post/streamed-sitemaps/', b''.join(self.shard().streaming_content).decode())
+        self.assertIn(b'Streamed sitemaps', self.client.get(reverse('blog:feed_rss')).content)
+
+        self.article.delete()
+        self.assertNotIn(b'streamed-sitemaps', b''.join(self.shard().streaming_content))
+        self.assertNotIn(b'Streamed sitemaps', self.client.get(reverse('blog:category_feed_rss', args=['python'])).content)
+
+
+class RelatedArticleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.python = Category.objects.create(name='Python', slug='python', description='Python')
+        cls.django = Tag.objects.create(name='Django', slug='django', description='Django')
+        cls.orm = Tag.objects.create(name='ORM', slug='orm-tag', description='ORM')
+
+    def create(self, slug, days_ago=1):
+        return Article.objects.create(
+            title=f'Article {slug}', slug=slug, content='Lorem ipsum.', author=self.author,
+            status=Article.Status.PUBLISHED, published_at=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def related(self, article):
+        return list(article.related_links.values_list('related__slug', flat=True))
+
+    def test_neighbours_follow_taxonomy_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            base = self.create('base-article')
+            base.categories.add(self.python)
+            base.tags.add(self.django, self.orm)
+            close = self.create('close-article')
+            close.tags.add(self.django, self.orm)
+            loose = self.create('loose-article')
+            loose.categories.add(self.python)
+            self.create('unrelated-article')
+        self.assertEqual(self.related(base), ['close-article', 'loose-article'])
+        self.assertEqual(self.related(loose), ['base-article'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            close.tags.clear()
+        self.assertEqual(self.related(base), ['loose-article'])
+        self.assertEqual(self.related(close), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            loose.status = Article.Status.DRAFT
+            loose.save()
+        self.assertEqual(self.related(base), [])
+
+        response = self.client.get(reverse('blog:article_detail', args=['base-article']))
+        self.assertEqual(response.context['related_articles'], [])
+
+    def test_rebuild_matches_incremental_and_detail_reads_it(self):
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import RelatedArticle
+
+        with self.captureOnCommitCallbacks(execute=True):
+            old = self.create('old-article', days_ago=900)
+            new = self.create('new-article')
+            base = self.create('base-article')
+            for article in (old, new, base):
+                article.tags.add(self.django)
+        expected = self.related(base)
+        self.assertEqual(expected, ['new-article', 'old-article'])
+
+        RelatedArticle.objects.all().delete()
+        call_command('rebuild_related_articles', stdout=StringIO())
+        self.assertEqual(self.related(base), expected)
+
+        response = self.client.get(reverse('blog:article_detail', args=['base-article']))
+        self.assertEqual([article.slug for article in response.context['related_articles']], expected)
+
+    def test_incremental_index_reads_only_the_head_of_broad_features(self):
+        from unittest import mock
+        from .related import FeatureIndex, compute
+
+        with self.captureOnCommitCallbacks(execute=True):
+            articles = [self.create(f'broad-article-{i}', days_ago=i + 1) for i in range(8)]
+            for article in articles:
+                article.categories.add(self.python)
+            for article in articles[5:]:
+                article.tags.add(self.django)
+        base = articles[-1]
+
+        with mock.patch('blog.related.BROAD_POSTING', 4), mock.patch('blog.related.BROAD_CANDIDATES', 2):
+            full = FeatureIndex()
+            incremental = FeatureIndex(article_pks=[base.pk])
+            decay = full.decay(timezone.now(), 30)
+            self.assertEqual(compute(incremental, [base.pk], decay), compute(full, [base.pk], decay))
+        feature = ('category_id', self.python.pk)
+        self.assertEqual(len(full.postings[feature]), 8)
+        self.assertEqual(len(incremental.postings[feature]), 5)
+        self.assertEqual(incremental.sizes[feature], 8)
+
+
+@override_settings(METRICS_TOKEN='scrape-token')
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        Article.objects.create(
+            title='Measured article', slug='measured-article', content='Lorem ipsum.', author=cls.author,
+            status=Article.Status.PUBLISHED, published_at=datetime(2024, 5, 10, tzinfo=dt_timezone.utc),
+        )
+
+    def setUp(self):
+        from config.metrics import registry
+        registry.clear()
+        cache.clear()
+
+    def scrape(self, **headers):
+        return self.client.get(reverse('metrics'), **headers)
+
+    def test_metrics_are_recorded_per_route(self):
+        self.client.get(reverse('blog:home'))
+        self.client.get(reverse('blog:home'))
+        self.client.get('/no-such-page/')
+
+        body = self.scrape(HTTP_AUTHORIZATION='Bearer scrape-token').content.decode()
+        self.assertIn('django_http_request_duration_seconds_count{route="blog:home"} 2', body)
+        self.assertIn('django_http_responses_total{route="blog:home",status="2xx"} 2', body)
+        self.assertIn('django_http_request_duration_seconds_bucket{route="blog:home",le="+Inf"} 2', body)
+        self.assertRegex(body, r'django_db_queries_total\{route="blog:home"\} [1-9]')
+        self.assertRegex(body, r'django_template_render_seconds_total\{route="blog:home"\} 0\.\d*[1-9]')
+        self.assertRegex(body, r'django_cache_hits_total\{route="blog:home"\} [1-9]')
+        self.assertIn('status="4xx"', body)
+
+    async def test_queries_are_counted_under_asgi(self):
+        from asgiref.sync import sync_to_async
+
+        response = await self.async_client.get(reverse('blog:home'))
+        self.assertEqual(response.status_code, 200)
+        body = (await sync_to_async(self.scrape)(HTTP_AUTHORIZATION='Bearer scrape-token')).content.decode()
+        self.assertRegex(body, r'django_db_queries_total\{route="blog:home"\} [1-9]')
+
+    def test_endpoint_requires_token_or_superuser(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.assertEqual(self.scrape().status_code, 200)
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def test_seeded_corpus_drives_every_route(self):
+        import json
+        import tempfile
+        from django.core.management import call_command
+        from io import StringIO
+        from .models import ArchiveMonth
+
+        call_command('seed_blog', users=3, categories=2, tags=4, articles=40, images=0, batch_size=15, stdout=StringIO())
+        self.assertEqual(Article.objects.count(), 40)
+        self.assertEqual(Article.categories.through.objects.values('article').distinct().count(), 40)
+        self.assertTrue(ArchiveMonth.objects.exists())
+        article = Article.alive_objects.filter(status=Article.Status.PUBLISHED).exclude(comments=None).first()
+        self.assertEqual(article.comment_count, article.comments.filter(is_approved=True).count())
+
+        with tempfile.NamedTemporaryFile('r', suffix='.json') as output:
+            call_command('benchmark_urls', repeat=2, warmup=0, output=output.name, stdout=StringIO())
+            report = json.load(output)
+        self.assertEqual(report['urls']['blog:home']['status'], 200)
+        self.assertEqual(report['urls']['blog:article_detail']['status'], 200)
+        self.assertIn('blog:sitemap_shard', report['urls'])
+        self.assertIn('accounts:contact', report['urls'])
+
+
+@override_settings(COMMENTS_PER_PAGE=10)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.article = Article.objects.create(
+            title='Busy article', slug='busy-article', content='Lorem ipsum.', author=cls.author,
+            status=Article.Status.PUBLISHED, published_at=datetime(2024, 5, 10, tzinfo=dt_timezone.utc),
+        )
+        for i in range(25):
+            Comment.objects.create(article=cls.article, user=cls.author, text=f'Comment {i}', is_approved=True)
+        cls.url = reverse('blog:article_comments', args=[cls.article.slug])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_inline_and_rest_from_endpoint(self):
+        response = self.client.get(reverse('blog:article_detail', args=[self.article.slug]))
+        page = response.context['comment_page']
+        self.assertEqual([comment.text for comment in page], [f'Comment {i}' for i in range(24, 14, -1)])
+        self.assertContains(response, 'data-comments-next')
+
+        seen = []
+        url = f'{self.url}?format=json'
+        while url:
+            with self.assertNumQueries(2):
+                data = self.client.get(url).json()
+            seen += [comment['text'] for comment in data['comments']]
+            url = data['next']
+        self.assertEqual(seen, [f'Comment {i}' for i in range(24, -1, -1)])
+
+    def test_pages_are_cached_until_a_comment_changes(self):
+        first = self.client.get(self.url)
+        self.assertContains(first, 'Comment 24')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).content, first.content)
+
+        Comment.objects.create(article=self.article, user=self.author, text='Fresh comment', is_approved=True)
+        self.assertContains(self.client.get(self.url), 'Fresh comment')
+        self.assertEqual(self.client.get(reverse('blog:article_comments', args=['missing-article'])).status_code, 404)
+
+    def test_invalid_cursors_share_the_first_page_entry(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            for cursor in ('junk', 'not-base64!', 'WyJ4IiwgbnVsbCwgMV0'):
+                self.assertEqual(self.client.get(self.url, {'cursor': cursor}).content, first.content)
+
+
+class AsyncReadViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.category = Category.objects.create(name='Python', slug='python', description='Python')
+        cls.tag = Tag.objects.create(name='Django', slug='django', description='Django')
+        for i in range(7):
+            article = Article.objects.create(
+                title=f'Async article {i}', slug=f'async-article-{i}', content='Lorem ipsum.', author=cls.author,
+                status=Article.Status.PUBLISHED, published_at=datetime(2024, 5, 10 + i, tzinfo=dt_timezone.utc),
+            )
+            article.categories.add(cls.category)
+            article.tags.add(cls.tag)
+            Comment.objects.create(article=article, user=cls.author, text=f'Comment {i}', is_approved=True)
+
+    def setUp(self):
+        cache.clear()
+
+    async def get(self, view, path, **kwargs):
+        from asgiref.sync import sync_to_async
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import AsyncRequestFactory
+
+        request = AsyncRequestFactory().get(path)
+        request.user = AnonymousUser()
+        response = await view.as_view()(request, **kwargs)
+        await sync_to_async(response.render)()
+        return response
+
+    async def test_async_views_render_the_same_pages(self):
+        from . import async_views
+
+        pages = (
+            (async_views.ArticleListView, reverse('blog:home'), {}, 'article_list'),
+            (async_views.CategoryDetailView, reverse('blog:category', args=['python']), {'slug': 'python'}, 'article_list'),
+            (async_views.TagDetailView, reverse('blog:tag', args=['django']), {'slug': 'django'}, 'article_list'),
+        )
+        for view, path, kwargs, key in pages:
+            response = await self.get(view, path, **kwargs)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                [article.slug for article in response.context_data[key]],
+                [f'async-article-{i}' for i in range(6, 1, -1)],
+            )
+            self.assertTrue(response.context_data['page_obj'].has_next())
+
+        response = await self.get(async_views.ArticleDetailView, '/post/async-article-3/', slug='async-article-3')
+        self.assertEqual([comment.text for comment in response.context_data['comment_page']], ['Comment 3'])
+        self.assertContains(response, 'Async article 3')
+
+        with self.assertRaises(Http404):
+            await self.get(async_views.TagDetailView, '/tag/missing/', slug='missing')
+
+
+class AuditStampingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.editor = User.objects.create_superuser('editor', 'editor@example.com', 'password')
+        cls.article = Article.objects.create(
+            title='Stamped', slug='stamped', content='Lorem ipsum.', author=cls.editor,
+            status=Article.Status.PUBLISHED, published_at=timezone.now(),
+        )
+
+    def request(self, user=None):
+        from django.test import RequestFactory
+        from django.utils.functional import SimpleLazyObject
+
+        request = RequestFactory().get('/')
+        request.user = SimpleLazyObject(lambda: self.fail('request.user was loaded'))
+        if user is not None:
+            request._cached_user = user
+        return request
+
+    def test_requests_stamp_what_they_create(self):
+        self.client.force_login(self.editor)
+        self.client.post(reverse('blog:add_comment', args=['stamped']), {'text': 'Nice post'})
+        comment = Comment.objects.get()
+        self.assertEqual((comment.created_by, comment.updated_by), (self.editor, self.editor))
+
+    def test_unloaded_and_anonymous_users_are_not_stamped(self):
+        from django.contrib.auth.models import AnonymousUser
+        from config.middleware import get_current_user, request_context
+
+        for request in (self.request(), self.request(AnonymousUser())):
+            with request_context(request), self.assertNumQueries(1):
+                self.assertIsNone(get_current_user())
+                category = Category.objects.create(name='Go', slug=f'go-{id(request)}', description='Go')
+            self.assertIsNone(category.created_by)
+        self.assertIsNone(get_current_user())
+
+    def test_bulk_delete_and_restore_are_stamped(self):
+        from config.managers import AuditSoftDeleteQueryset
+        from config.middleware import request_context
+
+        articles = AuditSoftDeleteQueryset(Article).filter(pk=self.article.pk)
+        with request_context(self.request(self.editor)):
+            articles.delete()
+            self.article.refresh_from_db()
+            self.assertEqual(self.article.deleted_by, self.editor)
+            articles.restore()
+        self.article.refresh_from_db()
+        self.assertEqual((self.article.deleted_by, self.article.updated_by), (None, self.editor))
+
+    async def test_concurrent_requests_see_their_own_user(self):
+        import asyncio
+        from config.middleware import get_current_user, request_context
+
+        other = User(pk=self.editor.pk + 1, username='other')
+
+        async def serve(user):
+            with request_context(self.request(user)):
+                await asyncio.sleep(0)
+                return get_current_user()
+
+        self.assertEqual(await asyncio.gather(serve(self.editor), serve(other)), [self.editor, other])
+
+
+class ArticleRenderingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.article = Article.objects.create(
+            title='Rendered once', slug='rendered-once', author=cls.author,
+            content='First <paragraph>.\n\n' + 'word ' * 400, meta_description='About </script> tags',
+            status=Article.Status.PUBLISHED, published_at=timezone.now(),
+        )
+
+    def test_save_renders_the_source_fields(self):
+        import json
+
+        article = Article.objects.get(pk=self.article.pk)
+        self.assertIn('<p>First &lt;paragraph&gt;.</p>', article.body_html)
+        self.assertEqual((article.word_count, article.reading_time), (402, 3))
+        self.assertEqual(len(article.excerpt.split()), 50)
+        self.assertNotIn('</script>', article.json_ld)
+        self.assertEqual(json.loads('{%s}' % article.json_ld)['description'], 'About </script> tags')
+
+        response = self.client.get(reverse('blog:article_detail', args=['rendered-once']))
+        self.assertContains(response, '3 min read')
+        self.assertContains(response, '<p>First &lt;paragraph&gt;.</p>', html=False)
+
+    def test_only_changed_sources_are_rendered_again(self):
+        from unittest import mock
+        from . import rendering
+
+        article = Article.objects.get(pk=self.article.pk)
+        with mock.patch.object(rendering, 'linebreaks', wraps=rendering.linebreaks) as linebreaks:
+            article.views = 10
+            article.save()
+            article.save(update_fields=['views'])
+            self.assertEqual(linebreaks.call_count, 0)
+
+            article.title = 'Rendered twice'
+            article.save(update_fields=['title'])
+            self.assertEqual(linebreaks.call_count, 1)
+        self.assertIn('Rendered twice', Article.objects.get(pk=article.pk).json_ld)
+
+    def test_backfill_renders_stale_articles(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        Article.objects.update(body_html='', json_ld='', render_hash='')
+        call_command('render_articles', stdout=StringIO())
+        article = Article.objects.get(pk=self.article.pk)
+        self.assertIn('<p>First &lt;paragraph&gt;.</p>', article.body_html)
+        self.assertTrue(article.render_hash)
+
+    def test_pages_and_feeds_fall_back_for_rows_not_backfilled(self):
+        Article.objects.update(meta_description='', excerpt='', reading_time=0, render_hash='')
+        cache.clear()
+
+        response = self.client.get(reverse('blog:article_detail', args=[self.article.slug]))
+        self.assertContains(response, '3 min read')
+        feed = self.client.get(reverse('blog:feed_rss')).content.decode()
+        self.assertIn('<description>First . word word', feed)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    def serve(self, method='get', cookies=None, write=False, primary=False):
+        from django.db import router
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from config.replicas import ReplicaRoutingMiddleware, use_primary
+
+        reads = []
+
+        def view(request):
+            if primary:
+                with use_primary():
+                    reads.append(router.db_for_read(Article))
+            reads.append(router.db_for_read(Article))
+            if write:
+                router.db_for_write(Article)
+                reads.append(router.db_for_read(Article))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        response = ReplicaRoutingMiddleware(view)(request)
+        return reads, response
+
+    def test_reads_go_to_a_replica_until_the_request_writes(self):
+        from django.db import router
+
+        reads, response = self.serve(write=True)
+        self.assertEqual(reads, ['replica_1', 'default'])
+        self.assertNotIn('use_primary', response.cookies)
+        self.assertEqual(router.db_for_read(Article), 'default')
+
+    def test_writes_stick_the_client_to_the_primary(self):
+        reads, response = self.serve('post', write=True)
+        self.assertEqual(reads, ['default', 'default'])
+        self.assertEqual(response.cookies['use_primary']['max-age'], 10)
+
+        reads, response = self.serve(cookies={'use_primary': '1'})
+        self.assertEqual(reads, ['default'])
+
+    def test_views_can_pin_the_primary(self):
+        reads, response = self.serve(primary=True)
+        self.assertEqual(reads, ['default', 'replica_1'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_reads_the_primary(self):
+        reads, response = self.serve()
+        self.assertEqual(reads, ['default'])
+
+
+@override_settings(DATABASE_REPLICAS=['lagging_replica'])
+class CachedReadsFromPrimaryTests(TestCase):
+    """
+    Real views behind ReplicaRoutingMiddleware, with a replica alias that
+    is not configured at all: a cache entry rebuilt from the replica fails
+    here instead of silently storing what a lagging replica returned.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        cls.article = Article.objects.create(
+            title='Primary article', slug='primary-article', content='Lorem ipsum.', author=cls.author,
+            status=Article.Status.PUBLISHED, published_at=datetime(2024, 5, 10, tzinfo=dt_timezone.utc),
+        )
+        Comment.objects.create(article=cls.article, user=cls.author, text='From the primary', is_approved=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        from unittest import mock
+
+        # the router keeps reads on the primary inside a transaction, and
+        # every TestCase runs in one
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            return self.client.get(url)
+
+    def test_uncached_reads_use_the_replica(self):
+        from django.utils.connection import ConnectionDoesNotExist
+
+        with self.assertRaises(ConnectionDoesNotExist):
+            self.get(reverse('blog:home'))
+
+    def test_cache_misses_are_built_from_the_primary(self):
+        detail = reverse('blog:article_detail', args=['primary-article'])
+        for url, text in (
+            (detail, 'From the primary'),
+            (detail, 'From the primary'),
+            (reverse('blog:article_comments', args=['primary-article']), 'From the primary'),
+            (reverse('blog:feed_rss'), 'Primary article'),
+        ):
+            self.assertContains(self.get(url), text)
+
+        shard = self.get(reverse('blog:sitemap_shard', args=['articles', 0]))
+        self.assertIn(b'/post/primary-article/', b''.join(shard.streaming_content))
+        with self.assertNumQueries(0):
+            self.assertContains(self.get(detail), 'From the primary')
+
+
+class ImportArticlesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', 'author@example.com', 'password')
+        Category.objects.create(name='Python', slug='python', description='Python')
+
+    def import_rows(self, rows, **options):
+        import json
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'articles.jsonl')
+            with open(path, 'w') as source:
+                source.writelines(json.dumps(row) + '\n' for row in rows)
+            if 'resume_after' in options:
+                with open(f'{path}.checkpoint', 'w') as checkpoint:
+                    json.dump({'path': path, 'line': options.pop('resume_after')}, checkpoint)
+            call_command('import_articles', path, skip_rebuild=True, stdout=StringIO(), stderr=StringIO(), **options)
+            self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+    def test_import_upserts_taxonomy_and_bulk_creates_articles(self):
+        self.import_rows([
+            {'title': 'Imported one', 'content': 'Lorem ipsum.', 'author': 'author', 'status': 'published',
+             'published_at': '2024-03-01T10:00:00Z', 'categories': ['python', {'slug': 'go', 'name': 'Go'}],
+             'tags': ['django'], 'comments': [{'user': 'author', 'text': 'First', 'created_at': '2024-03-02T10:00:00Z'}]},
+            {'title': 'Imported two', 'content': 'Lorem ipsum.', 'author': 'nobody'},
+            {'title': 'Imported three', 'content': 'Lorem ipsum.', 'author': 'author', 'categories': ['go']},
+        ])
+        self.assertEqual(sorted(Article.objects.values_list('slug', flat=True)), ['imported-one', 'imported-three'])
+        article = Article.objects.get(slug='imported-one')
+        self.assertEqual(article.status, Article.Status.PUBLISHED)
+        self.assertEqual(sorted(article.categories.values_list('slug', flat=True)), ['go', 'python'])
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(Tag.objects.get().slug, 'django')
+        self.assertEqual(article.comments.get().created_at, datetime(2024, 3, 2, 10, tzinfo=dt_timezone.utc))
+
+    def test_import_resumes_after_the_checkpoint(self):
+        rows = [{'title': f'Resumed {i}', 'content': 'Lorem ipsum.', 'author': 'author'} for i in range(4)]
+        self.import_rows(rows, resume_after=2, batch_size=1)
+        self.assertEqual(sorted(Article.objects.values_list('slug', flat=True)), ['resumed-2', 'resumed-3'])
+
+        # rows already imported are skipped when the whole file is run again
+        self.import_rows(rows, restart=True)
+        self.assertEqual(Article.objects.count(), 4)
+
+    def test_import_skips_malformed_rows(self):
+        self.import_rows([
+            {'title': 'Imported first', 'content': 'Lorem ipsum.', 'author': 'author'},
+            ['not', 'an', 'object'],
+            {'title': 'Impossible date', 'content': 'Lorem ipsum.', 'author': 'author', 'published_at': '2024-13-45T00:00:00'},
+            {'title': 'Numeric date', 'content': 'Lorem ipsum.', 'author': 'author', 'published_at': 20240301},
+            {'title': 'Bad comment', 'content': 'Lorem ipsum.', 'author': 'author', 'comments': ['First']},
+            {'title': '!!!', 'content': 'Lorem ipsum.', 'author': 'author'},
+            {'title': 'Empty category', 'content': 'Lorem ipsum.', 'author': 'author', 'categories': [{}]},
+            {'title': 'Numeric tag', 'content': 'Lorem ipsum.', 'author': 'author', 'tags': [{'slug': 5}]},
+            {'title': 'Imported last', 'content': 'Lorem ipsum.', 'author': 'author'},
+        ])
+        self.assertEqual(sorted(Article.objects.values_list('slug', flat=True)), ['imported-first', 'imported-last'])
+        self.assertEqual(list(Category.objects.values_list('slug', flat=True)), ['python'])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_images_are_copied_once_the_batch_commits(self):
+        import os
+        import tempfile
+        from unittest import mock
+        from django.core.files.storage import default_storage
+        from blog.management.commands.import_articles import Command
+
+        with tempfile.TemporaryDirectory() as images, tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT=media):
+            with open(os.path.join(images, 'cover.jpg'), 'wb') as image:
+                image.write(b'not really a jpeg')
+            rows = [{'title': 'Imported image', 'content': 'Lorem ipsum.', 'author': 'author', 'featured_image': 'cover.jpg'}]
+
+            with mock.patch.object(Command, 'import_comments', side_effect=RuntimeError), \
+                    self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+                self.import_rows(rows, images=images)
+            self.assertEqual(os.listdir(media), [])
+
+            # the variants are rendered in the background; not needed here
+            with mock.patch('blog.management.commands.import_articles.generate_derivatives_on_commit'), \
+                    self.captureOnCommitCallbacks(execute=True):
+                self.import_rows(rows, images=images, restart=True)
+            name = Article.objects.get().featured_image.name
+            self.assertTrue(default_storage.exists(name))
+
+
+class AdminExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        for i in range(3):
+            Article.objects.create(
+                title=f'Exported {i}', slug=f'exported-{i}', content='Lorem ipsum.', author=cls.admin_user,
+                status=Article.Status.PUBLISHED if i else Article.Status.DRAFT,
+                published_at=datetime(2024, 1, 1 + i, tzinfo=dt_timezone.utc) if i else None,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def test_csv_export_streams_the_filtered_changelist(self):
+        import csv
+
+        response = self.client.get(reverse('admin:blog_article_export', args=['csv']), {'status__exact': 'PB'})
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:5], ['ID', 'Title', 'Slug', 'Status', 'Author username'])
+        self.assertEqual([row[1] for row in rows[1:]], ['Exported 2', 'Exported 1'])
+        self.assertEqual(rows[1][3], 'Published')
+
+    def test_xlsx_export_of_selected_rows(self):
+        from io import BytesIO
+        from openpyxl import load_workbook
+
+        article = Article.objects.get(slug='exported-1')
+        response = self.client.post(reverse('admin:blog_article_changelist'), {
+            'action': 'export_xlsx', '_selected_action': [article.pk],
+        })
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.values)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1], 'Exported 1')
+        self.assertEqual(rows[1][5], datetime(2024, 1, 2))
+
+    def test_export_neutralizes_formulas(self):
+        import csv
+        from io import BytesIO
+        from openpyxl import load_workbook
+
+        text = '=HYPERLINK("http://example.com","Click")'
+        Comment.objects.create(article=Article.objects.get(slug='exported-1'), user=self.admin_user, text=text)
+
+        response = self.client.get(reverse('admin:blog_comment_export', args=['csv']))
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[1][3], f"'{text}")
+
+        response = self.client.get(reverse('admin:blog_comment_export', args=['xlsx']))
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        cell = sheet.cell(row=2, column=4)
+        self.assertEqual(cell.value, f"'{text}")
+        self.assertNotEqual(cell.data_type, 'f')
+
+    def test_changelist_links_to_the_export(self):
+        response = self.client.get(reverse('admin:accounts_contact_changelist'))
+        self.assertContains(response, reverse('admin:accounts_contact_export', args=['xlsx']))
+        response = self.client.get(reverse('admin:accounts_contact_export', args=['pdf']))
+        self.assertEqual(response.status_code, 404)
@@ -1,17 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, feeds, sitemaps, views
+
+# under ASGI the read-only pages run natively async; under WSGI each async
+# view would need its own event loop, so the sync ones stay in place
+read_views = async_views if settings.BLOG_ASYNC_VIEWS else views
 
 app_name = 'blog'
 
 urlpatterns = [
-    path('', views.ArticleListView.as_view(), name='home'),
-    path('search/', views.SearchView.as_view(), name='search'),
+    path('', read_views.ArticleListView.as_view(), name='home'),
+    path('search/', read_views.SearchView.as_view(), name='search'),
     path('archive/<int:year>/<int:month>/', views.ArticleMonthArchiveView.as_view(month_format='%m'),name='archive'),
     path('post/add/', views.ArticleAddView.as_view(), name='article_add'),
-    path('post/<slug:slug>/', views.ArticleDetailView.as_view(), name='article_detail'),
+    path('post/<slug:slug>/', read_views.ArticleDetailView.as_view(), name='article_detail'),
     path('post/<slug:slug>/edit/', views.ArticleEditView.as_view(), name='article_edit'),
     path('post/<slug:slug>/delete/', views.ArticleDeleteView.as_view(), name='article_delete'),
-    path('category/<slug:slug>/', views.CategoryDetailView.as_view(), name='category'),
-    path('tag/<slug:slug>/', views.TagDetailView.as_view(), name='tag'),
+    path('category/<slug:slug>/', read_views.CategoryDetailView.as_view(), name='category'),
+    path('tag/<slug:slug>/', read_views.TagDetailView.as_view(), name='tag'),
     path('post/<slug:slug>/comment/', views.CommentCreateView.as_view(), name='add_comment'),
-]
\ No newline at end of file
+    path('post/<slug:slug>/comments/', views.ArticleCommentsView.as_view(), name='article_comments'),
+    path('sitemap.xml', sitemaps.index, name='sitemap'),
+    path('sitemap-<str:section>-<int:shard>.xml', sitemaps.shard, name='sitemap_shard'),
+    path('feed/rss/', feeds.cached_feed(feeds.LatestArticlesFeed()), name='feed_rss'),
+    path('feed/atom/', feeds.cached_feed(feeds.LatestArticlesAtomFeed()), name='feed_atom'),
+    path('category/<slug:slug>/feed/rss/', feeds.cached_feed(feeds.CategoryFeed()), name='category_feed_rss'),
+    path('category/<slug:slug>/feed/atom/', feeds.cached_feed(feeds.CategoryAtomFeed()), name='category_feed_atom'),
+    path('tag/<slug:slug>/feed/rss/', feeds.cached_feed(feeds.TagFeed()), name='tag_feed_rss'),
+    path('tag/<slug:slug>/feed/atom/', feeds.cached_feed(feeds.TagAtomFeed()), name='tag_feed_atom'),
+]
@@ -0,0 +1,113 @@
+import atexit
+import hashlib
+import logging
+import threading
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Case, F, Value, When
+from .models import Article
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Collects article hits in memory and adds them to Article.views from a
+    background thread, one UPDATE per batch of articles. The thread and its
+    exit hook only start with the first hit and a non-zero flush interval;
+    otherwise hits wait for an explicit flush(). Unset arguments follow the
+    ARTICLE_VIEWS_* settings as they are when read.
+    """
+
+    def __init__(self, flush_interval=None, dedupe_window=None, batch_size=None):
+        self._flush_interval = flush_interval
+        self._dedupe_window = dedupe_window
+        self._batch_size = batch_size
+        self._buffer = Counter()
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stopped = threading.Event()
+
+    @property
+    def flush_interval(self):
+        return settings.ARTICLE_VIEWS_FLUSH_INTERVAL if self._flush_interval is None else self._flush_interval
+
+    @property
+    def dedupe_window(self):
+        return settings.ARTICLE_VIEWS_DEDUPE_WINDOW if self._dedupe_window is None else self._dedupe_window
+
+    @property
+    def batch_size(self):
+        return self._batch_size or settings.ARTICLE_VIEWS_BATCH_SIZE
+
+    def visitor_fingerprint(self, request):
+        session = getattr(request, 'session', None)
+        if session is not None and session.session_key:
+            return session.session_key
+
+        raw = f"{request.META.get('REMOTE_ADDR', '')}|{request.META.get('HTTP_USER_AGENT', '')}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def is_duplicate(self, request, article_pk):
+        if not self.dedupe_window:
+            return False
+
+        key = f'article:viewed:{article_pk}:{self.visitor_fingerprint(request)}'
+        return not cache.add(key, 1, timeout=self.dedupe_window)
+
+    def record(self, request, article_pk):
+        if self.is_duplicate(request, article_pk):
+            return
+
+        with self._lock:
+            self._buffer[article_pk] += 1
+        self._ensure_flusher()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._buffer)
+
+    def flush(self):
+        with self._lock:
+            pending, self._buffer = self._buffer, Counter()
+
+        items = list(pending.items())
+        batch_size = self.batch_size
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            try:
+                Article.objects.filter(pk__in=[pk for pk, hits in batch]).update(
+                    views=F('views') + Case(
+                        *[When(pk=pk, then=Value(hits)) for pk, hits in batch],
+                        default=Value(0),
+                    )
+                )
+            except DatabaseError:
+                logger.exception('Could not flush %d article view counts', len(batch))
+                with self._lock:
+                    self._buffer.update(dict(batch))
+        return len(items)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None or not self.flush_interval:
+            return
+
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name='article-view-flusher', daemon=True)
+                self._flusher.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+            close_old_connections()
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+
+view_counter = ViewCounter()
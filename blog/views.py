@@ -1,30 +1,43 @@
 from datetime import date
 from django.views import generic
-from django.db.models import Q
 from .models import Article, Category, Tag, Comment
-from django.core.paginator import Paginator
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from .forms import CommentForm, ArticleForm
+from .templatetags.image_tags import variant_url
+from .services import article_cards, archive_months, comment_page
+from .search import get_search_backend
+from .pagination import KeysetPaginationMixin, KeysetPaginator
+from .view_counter import view_counter
+from .page_cache import SLUG_KEY, ArticlePageCacheMixin, article_namespace
 from django.contrib import messages
 from django.shortcuts import get_object_or_404
-from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.http import Http404, HttpResponse, JsonResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.template.loader import render_to_string
+from config.cache import get_version
+from config.metrics import record_cache
+from django.contrib.auth.mixins import LoginRequiredMixin
+from config.mixins import CachedPermissionRequiredMixin, UsePrimaryMixin
+from config.replicas import use_primary
 from django.utils import timezone
 from django.contrib.messages.views import SuccessMessageMixin
 
-class ArticleListView(generic.ListView):
+class ArticleListView(KeysetPaginationMixin, generic.ListView):
     model = Article
     template_name = 'blog/article_list.html'
     paginate_by = 5
 
     def get_queryset(self):
-        return Article.alive_objects.all()
+        return article_cards(Article.alive_objects.all())
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Home'
         return context
 
-class ArticleDetailView(generic.DetailView):
+class ArticleDetailView(ArticlePageCacheMixin, generic.DetailView):
     model = Article
     template_name = 'blog/article_detail.html'
     slug_field = 'slug'
@@ -32,16 +45,30 @@ class ArticleDetailView(generic.DetailView):
 
     def get_queryset(self):
         return Article.alive_objects.filter(status=Article.Status.PUBLISHED, published_at__isnull=False)
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        view_counter.record(request, self.object.pk)
+        return response
     
+    def get_related_links(self):
+        return self.object.related_links.filter(
+            related__status=Article.Status.PUBLISHED, related__is_deleted=False
+        ).select_related('related').only('related__title', 'related__slug', 'related__published_at')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = self.object.title
-        context['comments'] = self.object.comments.filter(is_approved=True)
+        # the async view passes these in, already fetched
+        if 'comment_page' not in context:
+            context['comment_page'] = comment_page(self.object.pk)
+        if 'related_articles' not in context:
+            context['related_articles'] = [link.related for link in self.get_related_links()]
         context['alive_tags'] = self.object.tags.filter(is_deleted=False)
         context['form'] = CommentForm()
         return context
     
-class ArticleEditView(LoginRequiredMixin, PermissionRequiredMixin, generic.UpdateView):
+class ArticleEditView(UsePrimaryMixin, LoginRequiredMixin, CachedPermissionRequiredMixin, generic.UpdateView):
     model = Article
     form_class = ArticleForm
     template_name = 'blog/article_form.html'
@@ -57,11 +84,10 @@ class ArticleEditView(LoginRequiredMixin, PermissionRequiredMixin, generic.Updat
         return context
     
     def form_valid(self, form):
-        form.instance.updated_by = self.request.user
         messages.success(self.request, f'Article "{self.object.title}" updated successfully.')
         return super().form_valid(form)
 
-class ArticleDeleteView(LoginRequiredMixin, PermissionRequiredMixin, SuccessMessageMixin, generic.DeleteView):
+class ArticleDeleteView(UsePrimaryMixin, LoginRequiredMixin, CachedPermissionRequiredMixin, SuccessMessageMixin, generic.DeleteView):
     model = Article
     success_url = reverse_lazy('blog:home')
     template_name = 'blog/article_confirm_delete.html'
@@ -85,7 +111,7 @@ class ArticleDeleteView(LoginRequiredMixin, PermissionRequiredMixin, SuccessMess
         return super().delete(request, *args, **kwargs)
 
 
-class ArticleAddView(LoginRequiredMixin, PermissionRequiredMixin, generic.CreateView):
+class ArticleAddView(UsePrimaryMixin, LoginRequiredMixin, CachedPermissionRequiredMixin, generic.CreateView):
     model = Article
     form_class = ArticleForm
     template_name = 'blog/article_form.html'
@@ -101,7 +127,6 @@ class ArticleAddView(LoginRequiredMixin, PermissionRequiredMixin, generic.Create
         return context
     
     def form_valid(self, form):
-        form.instance.created_by = self.request.user
         form.instance.author = self.request.user
         if form.instance.status == Article.Status.PUBLISHED:
             form.instance.published_at = timezone.now()
@@ -109,7 +134,7 @@ class ArticleAddView(LoginRequiredMixin, PermissionRequiredMixin, generic.Create
         return super().form_valid(form)
     
     
-class CategoryDetailView(generic.DetailView):
+class CategoryDetailView(KeysetPaginationMixin, generic.DetailView):
     model = Category
     template_name = 'blog/category_detail.html'
     slug_field = 'slug'
@@ -122,19 +147,17 @@ class CategoryDetailView(generic.DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = self.object.name
-        article_list = self.object.articles.filter(published_at__isnull=False)
+        article_list = article_cards(self.object.articles.filter(published_at__isnull=False))
 
-        paginator = Paginator(article_list, self.paginate_by)
-        page_number = self.request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        paginator, page_obj, object_list, is_paginated = self.paginate_queryset(article_list, self.paginate_by)
 
-        context['article_list'] = page_obj
+        context['article_list'] = object_list
         context['page_obj'] = page_obj
-        context['is_paginated'] = page_obj.has_other_pages()
+        context['is_paginated'] = is_paginated
         context['paginator'] = paginator
         return context
     
-class TagDetailView(generic.DetailView):
+class TagDetailView(KeysetPaginationMixin, generic.DetailView):
     model = Tag
     template_name = 'blog/tag_detail.html'
     slug_field = 'slug'
@@ -147,15 +170,13 @@ class TagDetailView(generic.DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = f'#{self.object.name}'
-        article_list = self.object.articles.filter(published_at__isnull=False)
+        article_list = article_cards(self.object.articles.filter(published_at__isnull=False))
 
-        paginator = Paginator(article_list, self.paginate_by)
-        page_number = self.request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        paginator, page_obj, object_list, is_paginated = self.paginate_queryset(article_list, self.paginate_by)
 
-        context['article_list'] = page_obj
+        context['article_list'] = object_list
         context['page_obj'] = page_obj
-        context['is_paginated'] = page_obj.has_other_pages()
+        context['is_paginated'] = is_paginated
         context['paginator'] = paginator
         return context
 
@@ -168,13 +189,7 @@ class SearchView(generic.ListView):
     def get_queryset(self):
         query = self.request.GET.get('q')
         if query:
-            return Article.alive_objects.filter(
-                Q(title__icontains=query) |
-                Q(slug__icontains=query) |
-                Q(author__username__icontains=query) |
-                Q(content__icontains=query),
-                status=Article.Status.PUBLISHED
-            )
+            return get_search_backend().search(query)
         return Article.alive_objects.none()
     
     def get_context_data(self, **kwargs):
@@ -183,7 +198,7 @@ class SearchView(generic.ListView):
         context['title'] = f'Search result for "{context['query']}"'
         return context
     
-class CommentCreateView(LoginRequiredMixin, generic.CreateView):
+class CommentCreateView(UsePrimaryMixin, LoginRequiredMixin, generic.CreateView):
     model = Comment
     form_class = CommentForm
     template_name = 'blog/article_detail.html'
@@ -202,7 +217,6 @@ class CommentCreateView(LoginRequiredMixin, generic.CreateView):
     def form_valid(self, form):
         form.instance.article = self.article
         form.instance.user = self.request.user
-        form.instance.created_by = self.request.user
         form.instance.is_approved = True
         messages.success(self.request, 'Thank you for your comment!')
         return super().form_valid(form)
@@ -211,9 +225,79 @@ class CommentCreateView(LoginRequiredMixin, generic.CreateView):
         context = super().get_context_data(**kwargs)
         context['title'] = self.article.title
         context['article'] = self.article
+        context['comment_page'] = comment_page(self.article.pk)
         context['form'] = CommentForm()
         return context 
 
+class ArticleCommentsView(generic.View):
+    """
+    Later pages of an article's comments, as an HTML fragment or, with
+    ?format=json, as data. Pages are cached under the article's version,
+    which every comment change bumps.
+    """
+
+    template_name = 'blog/comment_page.html'
+
+    def get_article(self, slug):
+        queryset = Article.alive_objects.filter(status=Article.Status.PUBLISHED, published_at__isnull=False)
+        return get_object_or_404(queryset.only('id', 'slug'), slug=slug)
+
+    def get(self, request, slug):
+        cursor = request.GET.get('cursor', '')
+        as_json = request.GET.get('format') == 'json'
+        # keyed by the decoded position, so junk cursors cannot fill the cache
+        position = KeysetPaginator.cursor_key(cursor)
+
+        pk = cache.get(SLUG_KEY.format(slug))
+        version = get_version(article_namespace(pk)) if pk is not None else None
+        key = f'comments:{pk}:{version}:{int(as_json)}:{position}'
+        entry = cache.get(key) if pk is not None else None
+        record_cache(entry is not None)
+        if entry is not None:
+            return HttpResponse(entry['content'], content_type=entry['content_type'])
+
+        # the page is cached for everyone, so it is read from the primary
+        with use_primary():
+            article = self.get_article(slug)
+            if article.pk != pk:
+                cache.set(SLUG_KEY.format(slug), article.pk, settings.ARTICLE_PAGE_CACHE_TIMEOUT)
+                # the version must be read before the comments are
+                version = get_version(article_namespace(article.pk))
+                key = f'comments:{article.pk}:{version}:{int(as_json)}:{position}'
+            response = self.render_page(request, article, cursor, as_json)
+
+        cache.set(key, {'content': response.content, 'content_type': response['Content-Type']}, settings.ARTICLE_PAGE_CACHE_TIMEOUT)
+        return response
+
+    def render_page(self, request, article, cursor, as_json):
+        page = comment_page(article.pk, cursor)
+        html = render_to_string(self.template_name, {'article': article, 'comment_page': page}, request)
+        if as_json:
+            return JsonResponse({
+                'html': html,
+                'comments': [self.serialize(comment) for comment in page],
+                'next': self.next_url(article, page),
+            })
+        return HttpResponse(html)
+
+    def next_url(self, article, page):
+        if not page.has_next():
+            return None
+        return f"{reverse('blog:article_comments', args=[article.slug])}?format=json&cursor={page.next_cursor}"
+
+    def serialize(self, comment):
+        try:
+            avatar = variant_url(comment.user.profile.avatar, 'avatar')
+        except ObjectDoesNotExist:
+            avatar = ''
+        return {
+            'id': comment.pk,
+            'user': comment.user.username,
+            'avatar': avatar,
+            'text': comment.text,
+            'created_at': comment.created_at.isoformat(),
+        }
+
 class ArticleMonthArchiveView(generic.MonthArchiveView):
     queryset = Article.alive_objects.filter(status=Article.Status.ARCHIVE)
     date_field = 'published_at'
@@ -221,6 +305,30 @@ class ArticleMonthArchiveView(generic.MonthArchiveView):
     template_name = 'blog/post_archive_month.html'
     paginate_by = 5
 
+    def get_queryset(self):
+        return article_cards(super().get_queryset())
+
+    # month navigation comes from the ArchiveMonth rollup (cached with the
+    # archive menu) instead of date queries against the articles table
+    def get_archive_months(self):
+        today = timezone.localdate().replace(day=1)
+        return [
+            item['month'] for item in archive_months()
+            if self.get_allow_future() or item['month'] <= today
+        ]
+
+    def get_date_list(self, queryset, date_type=None, ordering='ASC'):
+        month = date(int(self.get_year()), int(self.get_month()), 1)
+        if month not in self.get_archive_months() and not self.get_allow_empty():
+            raise Http404(f'No archived articles for {month:%B %Y}.')
+        return []
+
+    def get_next_month(self, date):
+        return min((month for month in self.get_archive_months() if month > date), default=None)
+
+    def get_previous_month(self, date):
+        return max((month for month in self.get_archive_months() if month < date), default=None)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['year'] = self.kwargs['year']
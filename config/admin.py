@@ -1,3 +1,7 @@
+import csv
+import datetime
+import logging
+import tempfile
 from django.contrib.admin.models import LogEntry, ADDITION, CHANGE, DELETION
 from django.contrib.contenttypes.models import ContentType
 from django.contrib import admin
@@ -5,38 +9,91 @@ from django.utils.html import format_html
 from django.urls import path, reverse
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.db import router, transaction
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.text import capfirst
+from .managers import AuditSoftDeleteQueryset
+from .signals import bulk_soft_deleted, bulk_restored
+
+logger = logging.getLogger(__name__)
+
+# leading characters that make Excel and LibreOffice evaluate a cell
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
 
 
 class AuditAdminMixin:
     
+    # selections are processed in pk-ordered chunks: one UPDATE/DELETE, one
+    # SELECT for the log reprs and one LogEntry insert per chunk
+    bulk_chunk_size = 1000
+    bulk_select_related = ()
+
+    def iter_pk_chunks(self, queryset):
+        pks = queryset.order_by('pk').values_list('pk', flat=True)
+        last_pk = None
+        while True:
+            chunk = list((pks if last_pk is None else pks.filter(pk__gt=last_pk))[:self.bulk_chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1]
+
+    def bulk_apply(self, request, queryset, apply, action_flag, change_message):
+        """
+        Run apply(chunk_queryset) over the selection chunk by chunk and log
+        every affected object. Returns the number of rows changed.
+        """
+        model = queryset.model
+        using = router.db_for_write(model)
+        content_type_id = ContentType.objects.get_for_model(model).pk
+        total = queryset.count()
+        done = 0
+
+        for chunk in self.iter_pk_chunks(queryset):
+            objects = model._base_manager.using(using).filter(pk__in=chunk)
+            if self.bulk_select_related:
+                objects = objects.select_related(*self.bulk_select_related)
+            entries = [
+                LogEntry(
+                    user_id=request.user.pk,
+                    content_type_id=content_type_id,
+                    object_id=str(obj.pk),
+                    object_repr=str(obj)[:200],
+                    action_flag=action_flag,
+                    change_message=change_message,
+                )
+                for obj in objects
+            ]
+
+            with transaction.atomic(using=using):
+                apply(AuditSoftDeleteQueryset(model, using=using).filter(pk__in=chunk), chunk, using)
+                LogEntry.objects.using(using).bulk_create(entries)
+
+            done += len(chunk)
+            if total > self.bulk_chunk_size:
+                logger.info('%s: %d/%d %s by %s', change_message, done, total, model._meta.verbose_name_plural, request.user)
+        return done
+
     @admin.action(description='Hard delete selected items')
     def hard_delete(self, request, queryset):
-        count = 0
-        for obj in queryset:
-            count += 1
-            obj.hard_delete()
-        
+        def apply(chunk_queryset, pks, using):
+            # QuerySet.delete still sends pre/post_delete per object, so file
+            # cleanup receivers run for each batch
+            chunk_queryset.hard_delete()
+
+        count = self.bulk_apply(request, queryset, apply, DELETION, 'Hard deleted via admin')
         self.message_user(request, f'{count} items hard deleted successfully.')
 
     @admin.action(description="Restore selected items")
     def restore_selected(self, request, queryset):
-        restored_count = 0
-        for obj in queryset.filter(is_deleted=True):
-            obj.is_deleted = False
-            obj.deleted_at = None
-            obj.deleted_by = None
-            obj.save()
-
-            LogEntry.objects.log_action(
-                user_id=request.user.pk,
-                content_type_id=ContentType.objects.get_for_model(obj).pk,
-                object_id=obj.pk,
-                object_repr=str(obj),
-                action_flag=CHANGE,
-                change_message="Restored via admin"
-            )
-            restored_count += 1
+        def apply(chunk_queryset, pks, using):
+            chunk_queryset.restore()
+            bulk_restored.send(sender=queryset.model, pks=pks, using=using)
 
+        restored_count = self.bulk_apply(request, queryset.filter(is_deleted=True), apply, CHANGE, 'Restored via admin')
         self.message_user(
             request,
             f"{restored_count} item(s) restored successfully.",
@@ -88,12 +145,6 @@ class AuditAdminMixin:
     restore_button.short_description = "Restore"
     restore_button.allow_tags = True
 
-    def save_model(self, request, obj, form, change):
-        if not obj.pk:
-            obj.created_by = request.user
-        obj.updated_by = request.user
-        super().save_model(request, obj, form, change)
-
     def delete_model(self, request, obj):
         obj.delete(user=request.user)
         LogEntry.objects.log_action(
@@ -106,13 +157,129 @@ class AuditAdminMixin:
         )
 
     def delete_queryset(self, request, queryset):
-        for obj in queryset:
-            obj.delete(user=request.user)
-            LogEntry.objects.log_action(
-                user_id=request.user.pk,
-                content_type_id=ContentType.objects.get_for_model(obj).pk,
-                object_id=obj.pk,
-                object_repr=str(obj),
-                action_flag=DELETION,
-                change_message="Soft deleted via admin"
-            )
\ No newline at end of file
+        def apply(chunk_queryset, pks, using):
+            chunk_queryset.delete(user=request.user)
+            bulk_soft_deleted.send(sender=queryset.model, pks=pks, using=using)
+
+        # rows that are already deleted keep their original deletion stamp
+        self.bulk_apply(request, queryset.filter(is_deleted=False), apply, DELETION, 'Soft deleted via admin')
+
+
+class Echo:
+    """A file-like sink whose write() hands back what it was given."""
+
+    def write(self, value):
+        return value
+
+
+class ExportAdminMixin:
+    """
+    CSV and XLSX export of the changelist: an action for the selected rows
+    and an export/<format>/ endpoint for everything the current filters and
+    search match. Rows are read as export_fields tuples with
+    iterator(chunk_size=...), so no model instances are built and memory
+    stays flat however many rows go out. CSV is streamed as it is read;
+    XLSX is written by openpyxl's write-only workbook to a temporary file
+    and sent once the workbook is closed.
+    """
+
+    change_list_template = 'admin/export_change_list.html'
+    # ORM paths, related fields included ('author__username')
+    export_fields = ()
+    export_chunk_size = 2000
+    # rows per chunk of the CSV stream
+    export_flush_rows = 500
+
+    def export_columns(self):
+        columns = []
+        for name in self.export_fields:
+            fields = get_fields_from_path(self.model, name)
+            header = capfirst(' '.join(str(field.verbose_name) for field in fields))
+            choices = dict(fields[-1].flatchoices) if fields[-1].choices else None
+            columns.append((header, choices))
+        return columns
+
+    def export_rows(self, queryset, naive=False):
+        columns = self.export_columns()
+        yield [header for header, choices in columns]
+        rows = queryset.values_list(*self.export_fields).iterator(chunk_size=self.export_chunk_size)
+        for row in rows:
+            yield [self.export_value(value, choices, naive) for value, (header, choices) in zip(row, columns)]
+
+    def export_value(self, value, choices, naive):
+        if value is None:
+            return ''
+        if choices is not None:
+            return str(choices.get(value, value))
+        if isinstance(value, datetime.datetime):
+            # Excel has no timezones
+            return timezone.make_naive(value) if naive and timezone.is_aware(value) else value
+        if isinstance(value, (int, float, datetime.date)):
+            return value
+        value = str(value)
+        # quoted so user text such as =HYPERLINK(...) is shown, not evaluated
+        return f"'{value}" if value.startswith(FORMULA_PREFIXES) else value
+
+    def export_filename(self, extension):
+        return f'{self.model._meta.model_name}-{timezone.now():%Y%m%d-%H%M%S}.{extension}'
+
+    def export_csv_response(self, queryset):
+        def stream():
+            writer = csv.writer(Echo())
+            buffer = []
+            for row in self.export_rows(queryset):
+                buffer.append(writer.writerow(row))
+                if len(buffer) == self.export_flush_rows:
+                    yield ''.join(buffer)
+                    buffer = []
+            yield ''.join(buffer)
+
+        response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{self.export_filename("csv")}"'
+        return response
+
+    def export_xlsx_response(self, queryset):
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(str(self.model._meta.verbose_name_plural)[:31])
+        for row in self.export_rows(queryset, naive=True):
+            sheet.append(row)
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return FileResponse(
+            output, as_attachment=True, filename=self.export_filename('xlsx'),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+    @admin.action(description='Export selected as CSV')
+    def export_csv(self, request, queryset):
+        return self.export_csv_response(queryset)
+
+    @admin.action(description='Export selected as Excel')
+    def export_xlsx(self, request, queryset):
+        return self.export_xlsx_response(queryset)
+
+    def export_view(self, request, format):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if format not in ('csv', 'xlsx'):
+            raise Http404(f'No export format "{format}".')
+        queryset = self.get_changelist_instance(request).get_queryset(request)
+        if format == 'xlsx':
+            return self.export_xlsx_response(queryset)
+        return self.export_csv_response(queryset)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if self.has_view_permission(request):
+            actions['export_csv'] = (self.__class__.export_csv, 'export_csv', 'Export selected as CSV')
+            actions['export_xlsx'] = (self.__class__.export_xlsx, 'export_xlsx', 'Export selected as Excel')
+        return actions
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('export/<str:format>/', self.admin_site.admin_view(self.export_view), name='%s_%s_export' % info),
+        ] + super().get_urls()
@@ -0,0 +1,58 @@
+import threading
+import time
+from django.core.cache import cache
+from .metrics import record_cache
+from .replicas import use_primary
+
+CHROME_NAMESPACE = 'chrome'
+VERSION_KEY = 'version:{}'
+MISSING = object()
+
+_local_cache = {}
+_local_lock = threading.Lock()
+
+def get_version(namespace):
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is None:
+        # start from the clock so a lost version key never reuses an old number
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+def get_versions(*namespaces):
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    return [found.get(key) or get_version(namespace) for key, namespace in zip(keys, namespaces)]
+
+def bump_version(namespace):
+    key = VERSION_KEY.format(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(key, version, timeout=None)
+        return version
+
+def get_versioned(namespace, name, builder, timeout=None):
+    version = get_version(namespace)
+    local_key = (namespace, name)
+
+    hit = _local_cache.get(local_key)
+    if hit is not None and hit[0] == version:
+        record_cache(True)
+        return hit[1]
+
+    key = f'{namespace}:{name}:{version}'
+    value = cache.get(key, MISSING)
+    record_cache(value is not MISSING)
+    if value is MISSING:
+        # stored under the current version for every reader, so never built
+        # from a replica that may not have the write that bumped it yet
+        with use_primary():
+            value = builder()
+        cache.set(key, value, timeout)
+
+    with _local_lock:
+        _local_cache[local_key] = (version, value)
+    return value
@@ -1,8 +1,10 @@
 from django.db import models
 from django.utils import timezone
+from .middleware import get_current_user
 
 class AuditSoftDeleteQueryset(models.QuerySet):
     def delete(self, user=None):
+        user = user or get_current_user()
         update_data = {
             'is_deleted': True,
             'deleted_at': timezone.now()
@@ -12,12 +14,18 @@ class AuditSoftDeleteQueryset(models.QuerySet):
 
         return super().update(**update_data)
     
-    def restore(self):
-        return super().update(
-            is_deleted=False,
-            deleted_at=None,
-            deleted_by=None
-        )
+    def restore(self, user=None):
+        user = user or get_current_user()
+        update_data = {
+            'is_deleted': False,
+            'deleted_at': None,
+            'deleted_by': None
+        }
+        if user:
+            update_data['updated_by'] = user
+            update_data['updated_at'] = timezone.now()
+
+        return super().update(**update_data)
     
     def hard_delete(self):
         return super().delete()
@@ -0,0 +1,233 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+# Prometheus' default latency buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestStats:
+    """Counters for one request; also the execute_wrapper that times its SQL."""
+
+    __slots__ = ('queries', 'query_time', 'template_time', 'template_started', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.template_started = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - started
+
+
+class RouteMetrics:
+    __slots__ = ('buckets', 'count', 'duration', 'statuses', 'queries', 'query_time',
+                 'template_time', 'cache_hits', 'cache_misses', 'response_bytes')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.duration = 0.0
+        self.statuses = {}
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_bytes = 0
+
+
+class Registry:
+    """
+    Per-route totals for this process. Each worker keeps its own, so a
+    scrape sees the worker that answered it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, duration, status, stats, size):
+        status = f'{status // 100}xx'
+        with self._lock:
+            metrics = self._routes.get(route)
+            if metrics is None:
+                metrics = self._routes[route] = RouteMetrics()
+            metrics.buckets[bisect.bisect_left(BUCKETS, duration)] += 1
+            metrics.count += 1
+            metrics.duration += duration
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.queries += stats.queries
+            metrics.query_time += stats.query_time
+            metrics.template_time += stats.template_time
+            metrics.cache_hits += stats.cache_hits
+            metrics.cache_misses += stats.cache_misses
+            metrics.response_bytes += size
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                '# HELP django_http_request_duration_seconds Request latency by route.',
+                '# TYPE django_http_request_duration_seconds histogram',
+            ]
+            for route, metrics in routes:
+                cumulative = 0
+                for bound, n in zip(BUCKETS + ('+Inf',), metrics.buckets):
+                    cumulative += n
+                    lines.append(f'django_http_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+                lines.append(f'django_http_request_duration_seconds_sum{{route="{route}"}} {metrics.duration:.6f}')
+                lines.append(f'django_http_request_duration_seconds_count{{route="{route}"}} {metrics.count}')
+
+            lines += ['# HELP django_http_responses_total Responses by route and status class.',
+                      '# TYPE django_http_responses_total counter']
+            for route, metrics in routes:
+                for status, n in sorted(metrics.statuses.items()):
+                    lines.append(f'django_http_responses_total{{route="{route}",status="{status}"}} {n}')
+
+            for name, attr, help_text in (
+                ('django_db_queries_total', 'queries', 'SQL queries run while serving the route.'),
+                ('django_db_query_seconds_total', 'query_time', 'Time spent in SQL.'),
+                ('django_template_render_seconds_total', 'template_time', 'Time spent rendering template responses.'),
+                ('django_cache_hits_total', 'cache_hits', 'Application cache lookups that hit.'),
+                ('django_cache_misses_total', 'cache_misses', 'Application cache lookups that missed.'),
+                ('django_http_response_bytes_total', 'response_bytes', 'Response body bytes (streamed bodies are not counted).'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for route, metrics in routes:
+                    value = getattr(metrics, attr)
+                    lines.append(f'{name}{{route="{route}"}} {value:.6f}' if isinstance(value, float) else f'{name}{{route="{route}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def count_queries(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection; times SQL for the current request."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    # connections belong to the thread that opened them, which under ASGI
+    # is not the one running the middleware, so the wrapper stays installed
+    # and finds the request through the context variable instead
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+for connection in connections.all(initialized_only=True):
+    install_query_counter(None, connection)
+
+
+def record_cache(hit):
+    """Count an application cache lookup against the current request, if any."""
+    stats = _current.get()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+class MetricsMiddleware:
+    """
+    Time every request and attribute its SQL, template rendering and cache
+    lookups to the resolved URL name. Install it first so the latency
+    covers the other middleware too. The stats live in a context variable,
+    which follows the request into the threads sync code runs in under
+    ASGI; count_queries reads it from whichever connection runs the SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def observe(self, request, response, stats, started):
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(route, time.perf_counter() - started, response.status_code, stats, size)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self.observe(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self.observe(request, response, stats, started)
+        return response
+
+    def process_template_response(self, request, response):
+        # the last template response hook to run, just before render()
+        stats = _current.get()
+        if stats is not None and not response.is_rendered:
+            stats.template_started = time.perf_counter()
+            response.add_post_render_callback(self.rendered)
+        return response
+
+    def rendered(self, response):
+        stats = _current.get()
+        if stats is not None and stats.template_started is not None:
+            stats.template_time += time.perf_counter() - stats.template_started
+            stats.template_started = None
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = (
+        (token and constant_time_compare(authorization, f'Bearer {token}')) or
+        (request.user.is_authenticated and request.user.is_superuser)
+    )
+    if not allowed:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
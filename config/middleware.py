@@ -1,18 +1,53 @@
-# core/middleware.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
-import threading
+# A context variable rather than a thread-local: under ASGI one thread
+# interleaves many requests, and sync_to_async carries the context into the
+# threads sync code runs in.
+_current_request = ContextVar('current_request', default=None)
+
+
+@contextmanager
+def request_context(request):
+    token = _current_request.set(request)
+    try:
+        yield request
+    finally:
+        _current_request.reset(token)
+
+
+def get_current_request():
+    return _current_request.get()
 
-_local = threading.local()
 
 def get_current_user():
-    return getattr(_local, "user", None)
+    """
+    The authenticated user of the current request, or None. Only a user the
+    request has already loaded counts, so stamping never costs an untouched
+    lazy request.user its session and user queries.
+    """
+    user = getattr(_current_request.get(), '_cached_user', None)
+    if user is None or not user.is_authenticated:
+        return None
+    return user
 
 
 class CurrentUserMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        _local.user = request.user
-        response = self.get_response(request)
-        return response
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_context(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with request_context(request):
+            return await self.get_response(request)
@@ -1,8 +1,20 @@
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from .permissions import has_perms
+from .replicas import use_primary
 
-class AuditViewMixin:
+class CachedPermissionRequiredMixin(PermissionRequiredMixin):
 
-    def form_valid(self, form):
-        if not form.instance.pk:
-            form.instance.created_by = self.request.user
-        form.instance.updated_by = self.request.user
-        return super().form_valid(form)
+    def has_permission(self):
+        return has_perms(self.request.user, self.get_permission_required())
+
+
+class UsePrimaryMixin:
+    """Read from the primary database, for views that show what was just written."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with use_primary():
+            response = super().dispatch(request, *args, **kwargs)
+            # render here so the template's queries are pinned too
+            if hasattr(response, 'render'):
+                response.render()
+        return response
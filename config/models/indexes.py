@@ -0,0 +1,18 @@
+from copy import copy
+from django.db import models
+
+class DescNullsLastIndex(models.Index):
+    """
+    An Index whose descending columns keep NULLs at the end, matching
+    ORDER BY ... DESC NULLS LAST. SQLite already sorts them that way (and
+    rejects the modifier in CREATE INDEX); PostgreSQL needs it spelled out.
+    """
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        index = self
+        if schema_editor.connection.vendor == 'postgresql':
+            index = copy(self)
+            index.fields_orders = [
+                (field, 'DESC NULLS LAST' if order == 'DESC' else order) for field, order in self.fields_orders
+            ]
+        return super(DescNullsLastIndex, index).create_sql(model, schema_editor, using=using, **kwargs)
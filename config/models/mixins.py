@@ -3,9 +3,55 @@ from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from ..managers import AuditSoftDeleteManager
+from ..middleware import get_current_user
 from services.image_validator import image_validation
 from services.upload_path import seo_upload_path
 
+NOT_LOADED = object()
+
+class TrackedFieldsMixin(models.Model):
+    # Fields whose loaded values are snapshotted so changes can be detected
+    # on save without re-reading the row. File fields are tracked by name.
+    tracked_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.snapshot_tracked_fields()
+
+    def _tracked_value(self, name):
+        field = self._meta.get_field(name)
+        if field.attname not in self.__dict__:
+            return NOT_LOADED
+
+        value = self.__dict__[field.attname]
+        if isinstance(field, models.FileField):
+            return getattr(value, 'name', value) or ''
+        return value
+
+    def snapshot_tracked_fields(self):
+        self._original_values = {name: self._tracked_value(name) for name in self.tracked_fields}
+
+    def get_original_value(self, name):
+        return self._original_values.get(name, NOT_LOADED)
+
+    def has_field_changed(self, name):
+        original = self.get_original_value(name)
+        current = self._tracked_value(name)
+        if original is NOT_LOADED or current is NOT_LOADED:
+            return False
+        return original != current
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.snapshot_tracked_fields()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.snapshot_tracked_fields()
+
 class AuditSoftDeleteMixin(models.Model):
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -41,19 +87,33 @@ class AuditSoftDeleteMixin(models.Model):
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        # saves limited to update_fields stamp only the fields they name
+        user = get_current_user()
+        if user is not None and kwargs.get("update_fields") is None:
+            if self._state.adding and self.created_by_id is None:
+                self.created_by = user
+            self.updated_by = user
+        super().save(*args, **kwargs)
+
     @transaction.atomic
     def delete(self, using=None, keep_parents=False, user=None):
         self.is_deleted = True
         self.deleted_at = timezone.now()
-        self.deleted_by = user
+        self.deleted_by = user or get_current_user()
         self.save(update_fields=["is_deleted", "deleted_at", "deleted_by"])
 
     @transaction.atomic
-    def restore(self):
+    def restore(self, user=None):
+        user = user or get_current_user()
+        update_fields = ["is_deleted", "deleted_at", "deleted_by"]
         self.is_deleted = False
         self.deleted_at = None
         self.deleted_by = None
-        self.save(update_fields=["is_deleted", "deleted_at", "deleted_by"])
+        if user is not None:
+            self.updated_by = user
+            update_fields += ["updated_by", "updated_at"]
+        self.save(update_fields=update_fields)
 
     def hard_delete(self, using=None, keep_parents=False):
         return super().delete(using=using, keep_parents=keep_parents)
@@ -0,0 +1,56 @@
+from django.contrib.auth.context_processors import PermWrapper, PermLookupDict
+
+GROUP_CACHE_ATTR = '_resolved_group_names'
+PERM_CACHE_ATTR = '_resolved_permissions'
+
+def get_group_names(user):
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    names = getattr(user, GROUP_CACHE_ATTR, None)
+    if names is None:
+        names = frozenset(user.groups.values_list('name', flat=True))
+        setattr(user, GROUP_CACHE_ATTR, names)
+    return names
+
+def get_permissions(user):
+    if not user or not user.is_active:
+        return frozenset()
+
+    perms = getattr(user, PERM_CACHE_ATTR, None)
+    if perms is None:
+        perms = frozenset(user.get_all_permissions())
+        setattr(user, PERM_CACHE_ATTR, perms)
+    return perms
+
+def has_any_group(user, group_names):
+    if isinstance(group_names, str):
+        group_names = [g.strip() for g in group_names.split(',')]
+    return not get_group_names(user).isdisjoint(group_names)
+
+def has_perm(user, perm):
+    if user and user.is_active and user.is_superuser:
+        return True
+    return perm in get_permissions(user)
+
+def has_perms(user, perm_list):
+    return all(has_perm(user, perm) for perm in perm_list)
+
+def has_module_perms(user, app_label):
+    if user and user.is_active and user.is_superuser:
+        return True
+    prefix = f'{app_label}.'
+    return any(perm.startswith(prefix) for perm in get_permissions(user))
+
+
+class CachedPermLookupDict(PermLookupDict):
+    def __getitem__(self, perm_name):
+        return has_perm(self.user, f'{self.app_label}.{perm_name}')
+
+    def __bool__(self):
+        return has_module_perms(self.user, self.app_label)
+
+
+class CachedPermWrapper(PermWrapper):
+    def __getitem__(self, app_label):
+        return CachedPermLookupDict(self.user, app_label)
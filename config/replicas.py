@@ -0,0 +1,126 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PRIMARY_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class RoutingState:
+    """Where the current request reads from, and whether it has written."""
+
+    __slots__ = ('replica', 'pinned', 'wrote')
+
+    def __init__(self, replica, pinned=False):
+        self.replica = replica
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def use_primary():
+    """Send the reads in this block to the primary."""
+    state = _state.get()
+    if state is None:
+        # outside a routed request every read goes to the primary already
+        yield
+        return
+    pinned = state.pinned
+    state.pinned = True
+    try:
+        yield
+    finally:
+        state.pinned = pinned
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the primary. Reads go to one of settings.DATABASE_REPLICAS
+    only while serving a request through ReplicaRoutingMiddleware, and not
+    once the request has written, inside a transaction on the primary, or
+    within REPLICA_STICKY_SECONDS of the client's last write. Everything
+    else (commands, signal handlers run outside requests) reads the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.pinned or state.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas are copies of the primary, never migrated on their own
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pick a replica for the request, and keep a client that has just
+    written (or that sends an unsafe request) on the primary: a write sets
+    a cookie for REPLICA_STICKY_SECONDS so its author reads their own
+    edits. Does nothing while no replicas are configured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def routing_state(self, request):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return None
+        pinned = request.method not in SAFE_METHODS or PRIMARY_COOKIE in request.COOKIES
+        return RoutingState(random.choice(replicas), pinned)
+
+    def finish(self, request, response, state):
+        if state.wrote and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PRIMARY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.routing_state(request)
+        if state is None:
+            return self.get_response(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.routing_state(request)
+        if state is None:
+            return await self.get_response(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
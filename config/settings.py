@@ -2,6 +2,7 @@
 
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,11 +50,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
+    'config.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.middleware.CurrentUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "allauth.account.middleware.AccountMiddleware",
@@ -75,6 +79,7 @@ TEMPLATES = [
                 'blog.context_processors.navbar_categories',
                 'blog.context_processors.archive_menu',
                 'accounts.context_processors.company_data',
+                'accounts.context_processors.user_permissions',
             ],
         },
     },
@@ -93,6 +98,41 @@ DATABASES = {
     }
 }
 
+# Read replicas: comma-separated database names on the default engine, each
+# reachable as the alias replica_<n> (see config.replicas)
+DATABASE_REPLICAS = []
+for n, name in enumerate(filter(None, os.getenv('DATABASE_REPLICA_NAMES', '').split(',')), 1):
+    DATABASES[f'replica_{n}'] = {**DATABASES['default'], 'NAME': name, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{n}')
+
+DATABASE_ROUTERS = ['config.replicas.PrimaryReplicaRouter']
+
+# Seconds a client keeps reading from the primary after it writes
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
+# Cache. The version keys in config.cache, the page cache and the view
+# dedupe keys must be shared by every worker, so deployments set
+# CACHE_URL to redis://host:port/db (needs the redis package) or
+# memcached://host:port (needs pymemcache). Without it each process gets
+# its own LocMem cache, which is only right for a single dev server.
+CACHE_BACKENDS = {
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+CACHE_URL = os.getenv('CACHE_URL', '')
+if CACHE_URL:
+    scheme, _, address = CACHE_URL.partition('://')
+    if scheme not in CACHE_BACKENDS:
+        raise ImproperlyConfigured(f'CACHE_URL scheme must be one of {", ".join(CACHE_BACKENDS)}.')
+    CACHES = {'default': {
+        'BACKEND': CACHE_BACKENDS[scheme],
+        'LOCATION': CACHE_URL if scheme.startswith('redis') else address,
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'blog'),
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -140,6 +180,47 @@ MEDIA_ROOT = os.getenv('MEDIA_ROOT', 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Full-text search: 'auto' picks SQLite FTS5 or PostgreSQL tsvector from the database vendor
+BLOG_SEARCH_BACKEND = os.getenv('BLOG_SEARCH_BACKEND', 'auto')
+BLOG_SEARCH_CONFIG = os.getenv('BLOG_SEARCH_CONFIG', 'english')
+
+# Serve the home, article, category, tag and search pages from async views (turn on under ASGI)
+BLOG_ASYNC_VIEWS = os.getenv('BLOG_ASYNC_VIEWS') == 'True'
+
+# Article view counting: hits are buffered in memory and flushed in bulk every N seconds
+ARTICLE_VIEWS_FLUSH_INTERVAL = int(os.getenv('ARTICLE_VIEWS_FLUSH_INTERVAL', 10))
+ARTICLE_VIEWS_DEDUPE_WINDOW = int(os.getenv('ARTICLE_VIEWS_DEDUPE_WINDOW', 1800))
+ARTICLE_VIEWS_BATCH_SIZE = int(os.getenv('ARTICLE_VIEWS_BATCH_SIZE', 500))
+
+# The suite runs with the view counter's background flusher turned off
+TEST_RUNNER = 'config.test_runner.TestRunner'
+
+# Seconds an anonymous article page stays in the page cache (content changes retire it sooner)
+ARTICLE_PAGE_CACHE_TIMEOUT = int(os.getenv('ARTICLE_PAGE_CACHE_TIMEOUT', 3600))
+
+# Comments shown per page on an article; later pages load from post/<slug>/comments/
+COMMENTS_PER_PAGE = int(os.getenv('COMMENTS_PER_PAGE', 20))
+
+# Worker processes that render resized WebP/JPEG variants of uploads (0 renders them in a background thread)
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', 2))
+
+# Uploads are checked from their header first; full decoding runs 'pool' (in the worker processes above), 'inline' or 'off'
+IMAGE_MAX_UPLOAD_SIZE = int(os.getenv('IMAGE_MAX_UPLOAD_SIZE', 2 * 1024 * 1024))
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 40_000_000))
+IMAGE_VERIFY_MODE = os.getenv('IMAGE_VERIFY_MODE', 'pool')
+IMAGE_VERIFY_TIMEOUT = float(os.getenv('IMAGE_VERIFY_TIMEOUT', 10))
+
+# Seconds sitemap shards and RSS/Atom feeds stay cached (publishing, edits and deletes retire them sooner)
+SITEMAP_CACHE_TIMEOUT = int(os.getenv('SITEMAP_CACHE_TIMEOUT', 86400))
+SYNDICATION_CACHE_TIMEOUT = int(os.getenv('SYNDICATION_CACHE_TIMEOUT', 86400))
+
+# Related articles kept per article, and the age in days at which a candidate's score halves
+RELATED_ARTICLES_LIMIT = int(os.getenv('RELATED_ARTICLES_LIMIT', 5))
+RELATED_ARTICLES_HALF_LIFE_DAYS = float(os.getenv('RELATED_ARTICLES_HALF_LIFE_DAYS', 365))
+
+# Bearer token for /metrics (superusers can always read it)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
@@ -0,0 +1,13 @@
+from django.dispatch import Signal
+
+# Sent by set-based admin actions, which change many rows with one UPDATE
+# and therefore never fire post_save. Receivers get sender (the model),
+# pks (the primary keys affected in this batch) and using.
+bulk_soft_deleted = Signal()
+bulk_restored = Signal()
+bulk_published = Signal()
+
+# Sent from the image derivative worker once every variant of a file is
+# stored. Receivers get sender (the model of the row the file belongs to),
+# pk and name.
+derivatives_generated = Signal()
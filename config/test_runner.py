@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Keeps article views buffered while the suite runs: no background flusher
+    writes into test transactions, and nothing is flushed at exit, after the
+    test database is gone. Tests call view_counter.flush() when they need it.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.ARTICLE_VIEWS_FLUSH_INTERVAL = 0
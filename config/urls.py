@@ -3,9 +3,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('blog.urls')),
     path('accounts/', include('accounts.urls')),
     path('accounts/', include('allauth.urls')),
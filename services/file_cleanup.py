@@ -0,0 +1,25 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.core.files.storage import default_storage
+from django.db import transaction
+from .image_derivatives import clear_derivatives
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-cleanup')
+
+def _delete(storage, name):
+    try:
+        if storage.exists(name):
+            storage.delete(name)
+        clear_derivatives(name, storage)
+    except Exception:
+        logger.exception('Could not delete %s', name)
+
+def delete_file_on_commit(file=None, storage=None, using=None):
+    name = getattr(file, 'name', file)
+    if not name:
+        return
+
+    storage = storage or getattr(file, 'storage', None) or default_storage
+    transaction.on_commit(lambda: _executor.submit(_delete, storage, name), using=using)
@@ -0,0 +1,162 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+from config.signals import derivatives_generated
+
+logger = logging.getLogger(__name__)
+
+# name: (width, height, crop). Cropped variants are cut to the exact box,
+# the others are shrunk to fit inside it.
+VARIANTS = {
+    'thumb': (160, 160, True),
+    'card': (480, 270, True),
+    'card-2x': (960, 540, True),
+    'large': (1280, 1280, False),
+    'og': (1200, 630, True),
+    'avatar': (200, 200, True),
+    'logo': (240, 80, False),
+}
+
+FIELD_VARIANTS = {
+    'featured_image': ('thumb', 'card', 'card-2x', 'large', 'og'),
+    'og_image': ('og',),
+    'twitter_image': ('og',),
+    'avatar': ('thumb', 'avatar'),
+    'logo': ('logo',),
+}
+
+# extension: (Pillow format, save options)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+READY_KEY = 'image:derivatives:{}'
+
+_dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-derivatives')
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def derivative_name(name, variant, ext):
+    stem, _ = os.path.splitext(name)
+    return f'{stem}__{variant}.{ext}'
+
+def derivative_names(name, variants=None):
+    for variant in variants or VARIANTS:
+        for ext in FORMATS:
+            yield derivative_name(name, variant, ext)
+
+def variants_for(file):
+    field = getattr(file, 'field', None)
+    return FIELD_VARIANTS.get(getattr(field, 'name', None), ())
+
+
+def render_variants(data, variants):
+    """
+    Decode the original once and encode every requested variant. Runs in a
+    worker process, so it only deals in bytes and never touches Django.
+    """
+    rendered = {}
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    for variant in variants:
+        width, height, crop = VARIANTS[variant]
+        if crop:
+            resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail((width, height), Image.LANCZOS)
+
+        for ext, (image_format, options) in FORMATS.items():
+            output = resized
+            if image_format == 'JPEG' and output.mode != 'RGB':
+                output = Image.new('RGB', resized.size, 'white')
+                output.paste(resized, mask=resized.getchannel('A') if 'A' in resized.getbands() else None)
+            elif output.mode not in ('RGB', 'RGBA'):
+                output = output.convert('RGBA')
+
+            buffer = io.BytesIO()
+            output.save(buffer, image_format, **options)
+            rendered[(variant, ext)] = buffer.getvalue()
+    return rendered
+
+
+def get_pool():
+    global _pool
+    workers = settings.IMAGE_DERIVATIVE_WORKERS
+    if not workers:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+def generate_derivatives(name, storage=None, variants=None, sender=None, pk=None):
+    storage = storage or default_storage
+    variants = variants or tuple(VARIANTS)
+
+    with storage.open(name, 'rb') as original:
+        data = original.read()
+
+    pool = get_pool()
+    if pool is None:
+        rendered = render_variants(data, variants)
+    else:
+        rendered = pool.submit(render_variants, data, variants).result()
+
+    for (variant, ext), content in rendered.items():
+        target = derivative_name(name, variant, ext)
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(content))
+
+    cache.set(READY_KEY.format(name), True, None)
+    if sender is not None:
+        derivatives_generated.send(sender=sender, pk=pk, name=name)
+    return len(rendered)
+
+def _generate(name, storage, variants, sender, pk):
+    try:
+        generate_derivatives(name, storage, variants, sender, pk)
+    except Exception:
+        logger.exception('Could not generate image derivatives for %s', name)
+
+def generate_derivatives_on_commit(file, using=None):
+    variants = variants_for(file)
+    if not file or not variants:
+        return
+
+    name, storage = file.name, file.storage
+    instance = getattr(file, 'instance', None)
+    sender, pk = (type(instance), instance.pk) if instance is not None else (None, None)
+    transaction.on_commit(lambda: _dispatcher.submit(_generate, name, storage, variants, sender, pk), using=using)
+
+
+def derivatives_ready(file):
+    key = READY_KEY.format(file.name)
+    ready = cache.get(key)
+    if ready is None:
+        variants = variants_for(file)
+        ready = bool(variants) and file.storage.exists(derivative_name(file.name, variants[-1], 'jpg'))
+        cache.set(key, ready, None if ready else 60)
+    return ready
+
+def clear_derivatives(name, storage=None):
+    storage = storage or default_storage
+    for target in derivative_names(name):
+        if storage.exists(target):
+            storage.delete(target)
+    cache.delete(READY_KEY.format(name))
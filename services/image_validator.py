@@ -1,22 +1,74 @@
-
+import io
+import warnings
+from concurrent.futures import TimeoutError
 from PIL import Image
+from django.conf import settings
 from django.core.exceptions import ValidationError
+from .image_derivatives import get_pool
 
-def image_validation(file):
-    max_size = 1024 * 1024 * 2
-    if file.size > max_size:
-        raise ValidationError("Image file must be under 2MB.")
-    
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+def read_header(file):
+    # Image.open only parses the header; pixel data is decoded lazily, so
+    # format and dimensions cost a few KB of reads whatever the upload is.
+    file.seek(0)
     try:
-        im = Image.open(file)
-        im.verify()
-    except Exception as e:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(file) as im:
+                return im.format, im.size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ValidationError('Image dimensions are too large.')
+    except Exception:
         raise ValidationError('Invalid or corrupted image file.')
-    
-    allow_format = {'JPEG', 'PNG', 'WEBP'}
-    if im.format not in allow_format:
-        raise ValidationError(f"Unsupported image formate. Allow formats: {', '.join(allow_format)}")
-    
+    finally:
+        file.seek(0)
+
+def verify_image(data):
+    """Fully decode an image held in memory; False if it is damaged."""
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            im.verify()
+        with Image.open(io.BytesIO(data)) as im:
+            im.load()
+    except Exception:
+        return False
+    return True
+
+def full_verify(file):
+    mode = settings.IMAGE_VERIFY_MODE
+    if mode == 'off':
+        return
+
+    file.seek(0)
+    data = file.read()
     file.seek(0)
-    
 
+    pool = get_pool() if mode == 'pool' else None
+    if pool is None:
+        valid = verify_image(data)
+    else:
+        try:
+            valid = pool.submit(verify_image, data).result(timeout=settings.IMAGE_VERIFY_TIMEOUT)
+        except TimeoutError:
+            valid = False
+
+    if not valid:
+        raise ValidationError('Invalid or corrupted image file.')
+
+def image_validation(file):
+    max_size = settings.IMAGE_MAX_UPLOAD_SIZE
+    if file.size > max_size:
+        raise ValidationError(f'Image file must be under {max_size // (1024 * 1024)}MB.')
+
+    image_format, (width, height) = read_header(file)
+
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError(f"Unsupported image formate. Allow formats: {', '.join(sorted(ALLOWED_FORMATS))}")
+
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Image is {width}x{height} pixels; the limit is {settings.IMAGE_MAX_PIXELS // 1_000_000} megapixels.'
+        )
+
+    full_verify(file)
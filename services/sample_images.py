@@ -0,0 +1,26 @@
+import io
+import struct
+import zlib
+
+# Synthetic image files shared by the image validation benchmark and tests
+
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+def png_bomb(width, height):
+    # a 1-bit black PNG: a few hundred KB on disk, width * height bytes once decoded
+    row = b'\x00' + b'\x00' * ((width + 7) // 8)
+    compressor = zlib.compressobj(9)
+    idat = b''.join(compressor.compress(row) for _ in range(height)) + compressor.flush()
+    return (
+        b'\x89PNG\r\n\x1a\n' +
+        png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 1, 0, 0, 0, 0)) +
+        png_chunk(b'IDAT', idat) +
+        png_chunk(b'IEND', b'')
+    )
+
+def encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()